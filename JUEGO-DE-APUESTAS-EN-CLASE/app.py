@@ -11,8 +11,21 @@ import os
 warnings.filterwarnings('ignore')
 
 # Importar módulos personalizados
-from utils.data_loader import load_csv_with_encoding, get_basic_info
-from utils.statistics import get_descriptive_stats, detect_outliers, clean_data
+from utils.data_loader import load_csv_with_encoding, load_csv_streaming, sniff_dialect, compact_dtypes, get_basic_info, get_column_info, LazyCSV
+from utils.data_cache import load_csv_cached, get_cache_stats, clear_cache
+from utils.sketches import sketch_csv
+from utils.row_index import get_row_index
+from utils.dataset_profile import get_dataset_profile, get_quantiles
+from utils.correlation_pairs import correlation_pairs
+from utils.correlation_matrix import get_correlation_matrix
+from utils.outliers import get_outlier_masks
+from utils.survey_weights import detect_weight_column, get_weighted_profile
+from utils.enaho_modules import load_and_join_modules
+from utils.incremental_stats import IncrementalDescriptiveStats, save_stats_state, load_stats_state, list_stats_states, delete_stats_state
+from utils.grouped_stats import available_group_keys
+from utils.sparse_design import get_categorical_columns
+from utils.predictor_selection import BEST_SUBSET_MAX_PREDICTORS
+from utils.statistics import get_descriptive_stats, get_grouped_descriptive_stats, detect_outliers, clean_data
 from utils.visualizations import create_visualizations
 from utils.advanced_analytics import perform_advanced_analysis
 from utils.report_generator import generate_report
@@ -53,6 +66,26 @@ if 'cleaned_data' not in st.session_state:
     st.session_state.cleaned_data = None
 if 'analysis_results' not in st.session_state:
     st.session_state.analysis_results = {}
+if 'weight_column' not in st.session_state:
+    st.session_state.weight_column = None
+if 'csv_source' not in st.session_state:
+    st.session_state.csv_source = None
+
+# Factor de expansión: se elige una vez por dataset y lo usan todas las secciones
+if st.session_state.data is not None:
+    weight_options = [None] + st.session_state.data.select_dtypes(include=[np.number]).columns.tolist()
+    # Un dataset nuevo (otras columnas) vuelve a detectar FACTOR07; la limpieza conserva la elección
+    dataset_columns = tuple(st.session_state.data.columns)
+    if st.session_state.get('weight_dataset_columns') != dataset_columns or st.session_state.weight_column not in weight_options:
+        st.session_state.weight_column = detect_weight_column(st.session_state.data)
+        st.session_state.weight_dataset_columns = dataset_columns
+    st.session_state.weight_column = st.sidebar.selectbox(
+        "⚖️ Factor de expansión:",
+        weight_options,
+        index=weight_options.index(st.session_state.weight_column),
+        format_func=lambda col: "Sin ponderar" if col is None else col,
+        help="Con un factor de expansión (FACTOR07 en ENAHO) las estadísticas, frecuencias, correlaciones y análisis avanzados se ponderan para representar a la población."
+    )
 
 # Sección de Inicio
 if selected_section == "🏠 Inicio":
@@ -94,14 +127,156 @@ elif selected_section == "📂 Carga y Exploración":
         help="Sube tu archivo CSV. El sistema detectará automáticamente la codificación."
     )
     
+    streaming_mode = st.checkbox(
+        "Carga por bloques (archivos grandes)",
+        help="Lee el archivo por bloques de filas sin copias completas del texto del archivo; al unir los bloques la memoria pico ronda el doble del dataset."
+    )
+    compact_mode = st.checkbox(
+        "Compactar tipos de datos",
+        help="Reduce la memoria: enteros y decimales más pequeños, códigos con nulos como enteros anulables y texto repetitivo como categorías."
+    )
+    projection_mode = st.checkbox(
+        "Cargar solo columnas seleccionadas (archivos anchos)",
+        help="Lee primero solo la cabecera; cada columna se carga la primera vez que se selecciona."
+    )
+    approximate_mode = st.checkbox(
+        "Perfil aproximado sin cargar el archivo (archivos que no caben en memoria)",
+        help="Recorre el archivo por bloques y estima únicos, cuantiles y valores frecuentes con sketches. No carga el dataset para las demás secciones."
+    )
+    
+    with st.expander("📦 Unir varios módulos ENAHO"):
+        module_files = st.file_uploader(
+            "Selecciona los módulos a unir:",
+            type=['csv'],
+            accept_multiple_files=True,
+            help="Cada módulo se carga en paralelo con la misma detección de formato y tipos; luego se unen por CONGLOME, VIVIENDA y HOGAR."
+        )
+        join_how = st.selectbox(
+            "Tipo de unión:",
+            ['inner', 'left', 'outer'],
+            format_func=lambda how: {'inner': 'Solo hogares presentes en todos los módulos', 'left': 'Todos los hogares del primer módulo', 'outer': 'Todos los hogares'}[how]
+        )
+        
+        if module_files and len(module_files) >= 2 and st.button("🔗 Cargar y unir módulos"):
+            try:
+                sources = [(os.path.splitext(file.name)[0], file.getvalue()) for file in module_files]
+                with st.spinner('Cargando módulos en paralelo...'):
+                    data, ingestion_report = load_and_join_modules(sources, how=join_how, compact=compact_mode)
+                    st.session_state.data = data
+                    st.session_state.csv_source = None
+                
+                st.success(f"✅ {len(module_files)} módulos unidos: {data.shape[0]} filas y {data.shape[1]} columnas")
+                st.dataframe(ingestion_report, use_container_width=True)
+            except Exception as e:
+                st.error(f"❌ Error al unir los módulos: {str(e)}")
+        elif module_files and len(module_files) < 2:
+            st.info("Selecciona al menos dos módulos para unirlos.")
+    
     if uploaded_file is not None:
         try:
+            dialect = sniff_dialect(uploaded_file)
+            
+            if approximate_mode:
+                with st.spinner('Recorriendo el archivo por bloques...'):
+                    sketch = sketch_csv(uploaded_file, dialect=dialect)
+                    basic_info = get_basic_info(sketch)
+                    column_profile = get_column_info(sketch)
+                
+                st.success(f"✅ Perfil aproximado calculado: {uploaded_file.name}")
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("Filas", basic_info['rows'])
+                with col2:
+                    st.metric("Columnas", basic_info['columns'])
+                with col3:
+                    st.metric("Valores nulos", basic_info['null_values'])
+                with col4:
+                    st.metric("Duplicados (aprox.)", f"{basic_info['duplicates']} ± {basic_info['duplicates_error']}")
+                
+                st.subheader("📋 Información de Columnas (aproximada)")
+                st.dataframe(column_profile, use_container_width=True)
+                st.caption(
+                    "Filas, nulos, mínimo, máximo, media, desviación, asimetría y curtosis son exactos. "
+                    "Los valores únicos tienen el error relativo indicado en 'unique_error_pct', "
+                    "la mediana el error de rango de 'median_rank_error_pct' y el conteo del valor "
+                    "más frecuente puede subestimarse como máximo en 'most_frequent_count_error'."
+                )
+                st.info("En modo aproximado el dataset no se carga en memoria; desactívalo para usar las demás secciones.")
+                st.stop()
+            
+            if projection_mode:
+                # Mantener la fuente perezosa entre recargas para reutilizar columnas ya leídas
+                source_key = (uploaded_file.name, uploaded_file.size)
+                if st.session_state.get('lazy_source_key') != source_key:
+                    st.session_state.lazy_source = LazyCSV(uploaded_file, dialect)
+                    st.session_state.lazy_source_key = source_key
+                lazy_source = st.session_state.lazy_source
+                
+                selected_columns = st.multiselect(
+                    "Columnas a cargar:",
+                    lazy_source.columns,
+                    default=lazy_source.columns[:10]
+                )
+                if not selected_columns:
+                    st.info("Selecciona al menos una columna para cargar.")
+                    st.stop()
+            
             # Cargar datos con detección automática de codificación
             with st.spinner('Cargando y procesando archivo...'):
-                data = load_csv_with_encoding(uploaded_file)
+                if projection_mode:
+                    data = lazy_source.load(selected_columns)
+                    from_cache = False
+                else:
+                    loader = load_csv_streaming if streaming_mode else load_csv_with_encoding
+                    data, from_cache = load_csv_cached(uploaded_file, loader, dialect=dialect)
+                compaction_report = None
+                if compact_mode:
+                    data, compaction_report = compact_dtypes(data)
                 st.session_state.data = data
+                # En la carga por bloques el archivo queda disponible para el PCA por bloques
+                st.session_state.csv_source = ({'file': uploaded_file, 'dialect': dialect, 'name': uploaded_file.name}
+                                               if streaming_mode and not projection_mode else None)
             
             st.success(f"✅ Archivo cargado exitosamente: {uploaded_file.name}")
+            if from_cache:
+                st.caption("⚡ Archivo recuperado de la caché local (ya había sido procesado)")
+            if projection_mode:
+                st.caption(f"📑 {len(lazy_source.loaded_columns)} de {len(lazy_source.columns)} columnas cargadas en memoria ({lazy_source.memory_usage() / 1024 / 1024:.2f} MB)")
+            
+            with st.expander("🔎 Formato detectado del archivo"):
+                separator_names = {',': 'Coma (,)', ';': 'Punto y coma (;)', '\t': 'Tabulación', '|': 'Barra vertical (|)'}
+                dialect_df = pd.DataFrame({
+                    'Elemento': ['Codificación', 'Separador', 'Comillas', 'Separador decimal', 'Fila de cabecera'],
+                    'Valor detectado': [
+                        dialect['encoding'],
+                        separator_names.get(dialect['sep'], dialect['sep']),
+                        dialect['quotechar'],
+                        dialect['decimal'],
+                        'Primera fila' if dialect['header'] == 0 else 'Sin cabecera'
+                    ],
+                    'Confianza': [
+                        dialect['confidence']['encoding'],
+                        dialect['confidence']['sep'],
+                        dialect['confidence']['quotechar'],
+                        dialect['confidence']['decimal'],
+                        dialect['confidence']['header']
+                    ]
+                })
+                st.dataframe(dialect_df, use_container_width=True)
+                st.caption(f"Detectado a partir de los primeros {dialect['sample_bytes'] / 1024:.0f} KB ({dialect['sample_rows']} filas)")
+            
+            if compaction_report is not None:
+                with st.expander("🗜️ Compactación de tipos de datos"):
+                    bytes_before = compaction_report['Bytes antes'].sum()
+                    bytes_after = compaction_report['Bytes después'].sum()
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        st.metric("Memoria original", f"{bytes_before / 1024 / 1024:.2f} MB")
+                    with col2:
+                        st.metric("Memoria compactada", f"{bytes_after / 1024 / 1024:.2f} MB")
+                    with col3:
+                        st.metric("Reducción", f"{(1 - bytes_after / bytes_before) * 100:.1f}%" if bytes_before > 0 else "0%")
+                    st.dataframe(compaction_report, use_container_width=True)
             
             # Mostrar información básica
             basic_info = get_basic_info(data)
@@ -118,13 +293,14 @@ elif selected_section == "📂 Carga y Exploración":
             
             # Información detallada de columnas
             st.subheader("📋 Información de Columnas")
+            column_profile = get_column_info(data)
             col_info = pd.DataFrame({
-                'Columna': data.columns,
-                'Tipo de Dato': data.dtypes,
-                'Valores Nulos': data.isnull().sum(),
-                'Valores Únicos': data.nunique(),
-                'Porcentaje Nulos': (data.isnull().sum() / len(data) * 100).round(2)
-            })
+                'Columna': column_profile['column'].values,
+                'Tipo de Dato': column_profile['dtype'].values,
+                'Valores Nulos': column_profile['null_count'].values,
+                'Valores Únicos': column_profile['unique_values'].values,
+                'Porcentaje Nulos': column_profile['null_percentage'].round(2).values
+            }, index=data.columns)
             st.dataframe(col_info, use_container_width=True)
             
             # Primeras y últimas filas
@@ -155,7 +331,7 @@ elif selected_section == "📂 Carga y Exploración":
                     st.write(categorical_cols)
                 else:
                     st.info("No se encontraron variables categóricas")
-                    
+        
         except Exception as e:
             st.error(f"❌ Error al cargar el archivo: {str(e)}")
             st.info("Verifica que el archivo sea un CSV válido.")
@@ -166,9 +342,12 @@ elif selected_section == "📈 Estadísticas Descriptivas":
     
     if st.session_state.data is not None:
         data = st.session_state.data
+        weight_column = st.session_state.weight_column
+        if weight_column:
+            st.info(f"⚖️ Estadísticas ponderadas por {weight_column}")
         
         # Obtener estadísticas descriptivas
-        stats_results = get_descriptive_stats(data)
+        stats_results = get_descriptive_stats(data, weight_column)
         
         # Variables numéricas
         if 'numeric_stats' in stats_results:
@@ -179,13 +358,28 @@ elif selected_section == "📈 Estadísticas Descriptivas":
             numeric_cols = data.select_dtypes(include=[np.number]).columns
             if len(numeric_cols) > 0:
                 st.subheader("📊 Medidas Adicionales")
+                profile = get_weighted_profile(data, weight_column) if weight_column else get_dataset_profile(data)
                 additional_stats = pd.DataFrame({
-                    'Varianza': data[numeric_cols].var(),
-                    'Desviación Estándar': data[numeric_cols].std(),
-                    'Rango': data[numeric_cols].max() - data[numeric_cols].min(),
-                    'Coeficiente de Variación': (data[numeric_cols].std() / data[numeric_cols].mean() * 100).round(2)
+                    'Varianza': profile.stats['var'],
+                    'Desviación Estándar': profile.stats['std'],
+                    'Rango': profile.range(),
+                    'Coeficiente de Variación': profile.coefficient_of_variation().round(2)
                 })
                 st.dataframe(additional_stats, use_container_width=True)
+                
+                # Percentiles a elección (se calculan juntos y quedan guardados por versión)
+                selected_percentiles = st.multiselect(
+                    "Percentiles adicionales:",
+                    [1, 2.5, 5, 10, 20, 25, 30, 40, 50, 60, 70, 75, 80, 90, 95, 97.5, 99],
+                    default=[5, 25, 50, 75, 95]
+                )
+                if selected_percentiles:
+                    quantiles = [p / 100 for p in sorted(selected_percentiles)]
+                    percentile_table = get_quantiles(data, quantiles).T
+                    percentile_table.columns = [f"P{p:g}" for p in sorted(selected_percentiles)]
+                    st.dataframe(percentile_table, use_container_width=True)
+                    if weight_column:
+                        st.caption("Los percentiles adicionales no están ponderados.")
         
         # Variables categóricas
         if 'categorical_stats' in stats_results:
@@ -194,8 +388,8 @@ elif selected_section == "📈 Estadísticas Descriptivas":
             
             for col in categorical_cols:
                 with st.expander(f"Análisis de: {col}"):
-                    value_counts = data[col].value_counts()
-                    percentages = (data[col].value_counts(normalize=True) * 100).round(2)
+                    value_counts = stats_results['categorical_stats'][col]['value_counts']
+                    percentages = stats_results['categorical_stats'][col]['percentages'].round(2)
                     
                     col1, col2 = st.columns(2)
                     with col1:
@@ -209,7 +403,7 @@ elif selected_section == "📈 Estadísticas Descriptivas":
         numeric_data = data.select_dtypes(include=[np.number])
         if len(numeric_data.columns) > 1:
             st.subheader("🔗 Matriz de Correlación")
-            corr_matrix = numeric_data.corr()
+            corr_matrix = get_correlation_matrix(data, weight_column=weight_column)
             
             fig = px.imshow(
                 corr_matrix,
@@ -223,21 +417,107 @@ elif selected_section == "📈 Estadísticas Descriptivas":
             
             # Correlaciones más fuertes
             st.subheader("🏆 Correlaciones Más Significativas")
-            corr_pairs = []
-            for i in range(len(corr_matrix.columns)):
-                for j in range(i+1, len(corr_matrix.columns)):
-                    corr_pairs.append({
-                        'Variable 1': corr_matrix.columns[i],
-                        'Variable 2': corr_matrix.columns[j],
-                        'Correlación': corr_matrix.iloc[i, j]
-                    })
-            
-            corr_df = pd.DataFrame(corr_pairs)
-            corr_df = corr_df.sort_values('Correlación', key=abs, ascending=False)
-            st.dataframe(corr_df.head(10), use_container_width=True)
+            corr_df = correlation_pairs(corr_matrix, top_k=10)
+            st.dataframe(corr_df, use_container_width=True)
     
     else:
         st.warning("⚠️ Primero debes cargar un archivo CSV en la sección 'Carga y Exploración'.")
+    
+    # Estadísticas por grupos (DOMINIO, ESTRATO, MES, DEPARTAMENTO...)
+    if st.session_state.data is not None:
+        with st.expander("👥 Estadísticas por grupos"):
+            data = st.session_state.data
+            enaho_keys = available_group_keys(data)
+            group_keys = st.multiselect(
+                "Agrupar por:",
+                enaho_keys + [col for col in data.columns if col not in enaho_keys],
+                default=enaho_keys[:1],
+                help="DEPARTAMENTO se obtiene de los dos primeros dígitos del UBIGEO."
+            )
+            
+            if group_keys:
+                try:
+                    grouped_results = get_grouped_descriptive_stats(data, group_keys)
+                    st.metric("Número de grupos", len(grouped_results['group_sizes']))
+                    st.dataframe(grouped_results['group_sizes'], use_container_width=True)
+                    
+                    if 'numeric_stats' in grouped_results:
+                        grouped_numeric = grouped_results['numeric_stats']
+                        variable = st.selectbox("Variable numérica:", grouped_numeric.index.unique('Variable'))
+                        st.dataframe(grouped_numeric.xs(variable, level='Variable'), use_container_width=True)
+                    
+                    if 'categorical_stats' in grouped_results:
+                        grouped_categorical = grouped_results['categorical_stats']
+                        cat_variable = st.selectbox("Variable categórica:", grouped_categorical.index.unique('Variable'))
+                        st.dataframe(grouped_categorical.xs(cat_variable, level='Variable').astype({'most_frequent': str}), use_container_width=True)
+                except Exception as e:
+                    st.error(f"❌ Error al calcular las estadísticas por grupos: {str(e)}")
+    
+    # Estadísticas acumuladas por lotes (por ejemplo, entregas mensuales de ENAHO)
+    with st.expander("📅 Estadísticas acumuladas por lotes"):
+        saved_states = list_stats_states()
+        state_name = st.text_input(
+            "Nombre del acumulado:",
+            value=saved_states[0] if saved_states else "enaho",
+            help="El estado se guarda en disco con este nombre y se puede continuar en otra sesión."
+        )
+        
+        if st.session_state.get('stats_state_name') != state_name:
+            st.session_state.stats_state = load_stats_state(state_name) or IncrementalDescriptiveStats()
+            st.session_state.stats_state_name = state_name
+        stats_state = st.session_state.stats_state
+        
+        batch_file = st.file_uploader("Nuevo lote (CSV):", type=['csv'], key='stats_batch_file')
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            add_batch = st.button("➕ Agregar lote", disabled=batch_file is None)
+        with col2:
+            add_current = st.button("➕ Agregar dataset actual", disabled=st.session_state.data is None)
+        with col3:
+            reset_state = st.button("🗑️ Reiniciar acumulado")
+        
+        try:
+            if add_batch:
+                batch_file.seek(0)
+                batch = load_csv_with_encoding(batch_file, dialect=sniff_dialect(batch_file))
+                stats_state.append(batch, label=batch_file.name)
+                save_stats_state(stats_state, state_name)
+                st.success(f"✅ Lote agregado: {len(batch)} filas")
+            elif add_current:
+                stats_state.append(st.session_state.data, label="Dataset actual")
+                save_stats_state(stats_state, state_name)
+                st.success(f"✅ Dataset actual agregado: {len(st.session_state.data)} filas")
+            elif reset_state:
+                delete_stats_state(state_name)
+                stats_state = st.session_state.stats_state = IncrementalDescriptiveStats()
+                st.info("Acumulado reiniciado.")
+        except Exception as e:
+            st.error(f"❌ Error al agregar el lote: {str(e)}")
+        
+        if stats_state.batches:
+            st.metric("Filas acumuladas", f"{stats_state.rows:,}")
+            st.dataframe(pd.DataFrame(stats_state.batches), use_container_width=True)
+            
+            accumulated = stats_state.descriptive_stats()
+            if 'numeric_stats' in accumulated:
+                st.write("**Variables numéricas:**")
+                st.dataframe(accumulated['numeric_stats'], use_container_width=True)
+                st.caption(f"Percentiles, mediana y moda aproximados (error de rango ≈ {accumulated['percentile_rank_error']:.2%}); conteos, media, varianza, asimetría y curtosis exactos.")
+            if 'categorical_stats' in accumulated:
+                st.write("**Variables categóricas:**")
+                st.dataframe(pd.DataFrame({
+                    col: {
+                        'Valores únicos': cat['unique_values'],
+                        'Más frecuente': str(cat['most_frequent']),
+                        'Frecuencia': cat['most_frequent_count']
+                    }
+                    for col, cat in accumulated['categorical_stats'].items()
+                }).T, use_container_width=True)
+                approximate = [col for col, cat in accumulated['categorical_stats'].items() if cat['approximate']]
+                if approximate:
+                    st.caption(f"Valores únicos y frecuencias aproximados (demasiados valores distintos): {', '.join(approximate)}")
+        else:
+            st.info("Todavía no hay lotes acumulados.")
 
 # Sección 3: Detección y Limpieza
 elif selected_section == "🧹 Detección y Limpieza":
@@ -263,8 +543,8 @@ elif selected_section == "🧹 Detección y Limpieza":
             
             # Visualización de valores nulos
             fig = px.bar(
-                null_df, 
-                x='Columna', 
+                null_df,
+                x='Columna',
                 y='Porcentaje',
                 title="Porcentaje de Valores Nulos por Columna",
                 color='Porcentaje',
@@ -274,11 +554,25 @@ elif selected_section == "🧹 Detección y Limpieza":
         else:
             st.success("✅ No se encontraron valores nulos en el dataset.")
         
+        # Filas duplicadas
+        st.subheader("👯 Filas Duplicadas")
+        row_index = get_row_index(data)
+        duplicate_count = row_index.duplicate_count(data)
+        if duplicate_count > 0:
+            st.metric("Filas duplicadas", duplicate_count)
+            with st.expander("Ver grupos de filas duplicadas"):
+                st.dataframe(row_index.duplicate_groups(data), use_container_width=True)
+        else:
+            st.success("✅ No se encontraron filas duplicadas en el dataset.")
+        
         # Detección de valores atípicos
         st.subheader("🎯 Detección de Valores Atípicos")
         numeric_cols = data.select_dtypes(include=[np.number]).columns.tolist()
         
         if numeric_cols:
+            with st.expander("Resumen de valores atípicos de todas las variables"):
+                st.dataframe(get_outlier_masks(data).summary(), use_container_width=True)
+            
             selected_col = st.selectbox("Selecciona una variable para analizar:", numeric_cols)
             
             if selected_col:
@@ -292,7 +586,7 @@ elif selected_section == "🧹 Detección y Limpieza":
                 
                 # Visualización de boxplot
                 fig = px.box(
-                    data, 
+                    data,
                     y=selected_col,
                     title=f"Boxplot para {selected_col} - Detección de Valores Atípicos"
                 )
@@ -323,9 +617,36 @@ elif selected_section == "🧹 Detección y Limpieza":
                 ["No aplicar", "Eliminar valores atípicos", "Transformar con log", "Winsorización"]
             )
         
+        drop_duplicates = st.checkbox("Eliminar filas duplicadas", value=False)
+        
+        if st.button("👁️ Vista previa de la limpieza (sin aplicar)"):
+            try:
+                preview = clean_data(data, null_strategy, outlier_strategy, drop_duplicates, dry_run=True)
+                
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("Filas después de limpieza", preview['rows_after'], delta=preview['rows_after'] - preview['rows_before'])
+                with col2:
+                    st.metric("Celdas imputadas", preview['cells_imputed'])
+                with col3:
+                    st.metric("Celdas recortadas", preview['cells_clipped'])
+                with col4:
+                    st.metric("Columnas transformadas", len(preview['columns_transformed']))
+                
+                rows_removed = preview['rows_removed']
+                st.write(
+                    f"**Filas eliminadas:** {rows_removed['duplicates']} duplicadas, "
+                    f"{rows_removed['nulls']} con valores nulos y {rows_removed['outliers']} con valores atípicos"
+                )
+                if len(preview['columns_report']) > 0:
+                    st.dataframe(preview['columns_report'], use_container_width=True)
+            
+            except Exception as e:
+                st.error(f"❌ Error al calcular la vista previa: {str(e)}")
+        
         if st.button("🔄 Aplicar Limpieza de Datos"):
             try:
-                cleaned_data = clean_data(data, null_strategy, outlier_strategy)
+                cleaned_data = clean_data(data, null_strategy, outlier_strategy, drop_duplicates)
                 st.session_state.cleaned_data = cleaned_data
                 
                 st.success("✅ Datos limpiados exitosamente!")
@@ -338,7 +659,7 @@ elif selected_section == "🧹 Detección y Limpieza":
                 with col2:
                     st.metric("Filas después de limpieza", len(cleaned_data))
                     st.metric("Valores nulos después", cleaned_data.isnull().sum().sum())
-                    
+            
             except Exception as e:
                 st.error(f"❌ Error durante la limpieza: {str(e)}")
     
@@ -357,9 +678,9 @@ elif selected_section == "📊 Visualizaciones":
         
         # Pestañas para organizar visualizaciones
         tabs = st.tabs([
-            "📊 Distribuciones", 
-            "📈 Correlaciones", 
-            "📋 Categóricas", 
+            "📊 Distribuciones",
+            "📈 Correlaciones",
+            "📋 Categóricas",
             "🔍 Comparaciones",
             "🎯 Avanzadas"
         ])
@@ -423,17 +744,93 @@ elif selected_section == "🔬 Análisis Avanzado":
             "Selecciona la técnica de análisis:",
             [
                 "Análisis de Correlación Detallado",
-                "Regresión Lineal/Múltiple", 
+                "Regresión Lineal/Múltiple",
                 "Clustering (K-means)",
                 "Análisis de Componentes Principales (PCA)",
                 "Pruebas de Hipótesis"
             ]
         )
         
+        # Opciones de regresión: objetivo, selección de predictores, solver y particiones
+        ols_solver, n_folds, target, selection, categorical, alpha = 'cholesky', 5, None, None, [], 0.0
+        if analysis_type == "Regresión Lineal/Múltiple":
+            automatic_target = "Automática (mayor correlación promedio)"
+            target_options = [col for col in data.select_dtypes(include=[np.number]).columns
+                              if col != st.session_state.weight_column]
+            selection_methods = {
+                "Ninguna (todos los predictores)": None,
+                "Automática": 'auto',
+                "Paso a paso hacia adelante": 'forward',
+                "Paso a paso hacia atrás": 'backward',
+                "Mejor subconjunto": 'best_subset',
+                "Lasso": 'lasso',
+                "ElasticNet": 'elasticnet'
+            }
+            # El mejor subconjunto recorre 2^p subconjuntos: solo se ofrece con pocos predictores
+            n_predictors = len(target_options) - 1
+            if n_predictors > BEST_SUBSET_MAX_PREDICTORS:
+                del selection_methods["Mejor subconjunto"]
+            col1, col2 = st.columns(2)
+            with col1:
+                target = st.selectbox("Variable objetivo:", [automatic_target] + target_options)
+                target = None if target == automatic_target else target
+            with col2:
+                selection = selection_methods[st.selectbox("Selección de predictores:", list(selection_methods))]
+                if n_predictors > BEST_SUBSET_MAX_PREDICTORS:
+                    st.caption(f"Mejor subconjunto disponible hasta {BEST_SUBSET_MAX_PREDICTORS} predictores "
+                               f"(hay {n_predictors}); usa el paso a paso o Lasso")
+            categorical = st.multiselect("Predictores categóricos (indicadoras en matriz dispersa):",
+                                         get_categorical_columns(data, exclude=[st.session_state.weight_column]))
+            if categorical:
+                alpha = float(st.number_input("Penalización ridge (alpha, 0 = MCO):", min_value=0.0, value=0.0, step=1.0))
+                if selection:
+                    st.caption("Con predictores categóricos se usan todos los predictores (la selección automática es solo numérica)")
+                    selection = None
+            col1, col2 = st.columns(2)
+            with col1:
+                ols_solver = {"Cholesky (X'X)": 'cholesky', "QR (más estable)": 'qr'}[
+                    st.selectbox("Solver:", ["Cholesky (X'X)", "QR (más estable)"])]
+            with col2:
+                n_folds = int(st.number_input("Particiones de validación cruzada:", min_value=2, max_value=20, value=5, step=1))
+        
+        # Opciones de clustering: variables no numéricas como indicadoras
+        if analysis_type == "Clustering (K-means)":
+            categorical = st.multiselect("Variables categóricas (indicadoras de todos sus niveles):",
+                                         get_categorical_columns(data, exclude=[st.session_state.weight_column]))
+        
+        # Opciones de PCA: modo de descomposición y número de componentes
+        pca_mode, n_components, pca_source = 'full', None, None
+        if analysis_type == "Análisis de Componentes Principales (PCA)":
+            pca_modes = {
+                "Automático": 'auto',
+                "Completo": 'full',
+                "SVD aleatorizada (datos anchos)": 'randomized',
+                "Incremental por bloques": 'incremental'
+            }
+            if st.session_state.csv_source is not None:
+                pca_modes["Por bloques desde el archivo (sin cargarlo en memoria)"] = 'csv'
+            col1, col2 = st.columns(2)
+            with col1:
+                pca_mode = pca_modes[st.selectbox("Modo de PCA:", list(pca_modes))]
+                if pca_mode == 'csv':
+                    pca_source = st.session_state.csv_source
+                    st.caption(f"Se lee {pca_source['name']} por bloques; no incluye la limpieza aplicada en la aplicación")
+            with col2:
+                criterion = st.radio("Componentes:", ["Varianza objetivo", "Número fijo"], horizontal=True)
+                if criterion == "Varianza objetivo":
+                    n_components = st.slider("Varianza objetivo:", 0.50, 1.00, 0.80, 0.05)
+                    n_components = None if n_components >= 1.0 and pca_mode == 'full' else float(n_components)
+                else:
+                    n_components = int(st.number_input("Número de componentes:", min_value=1, value=3, step=1))
+        
         if st.button("🚀 Ejecutar Análisis Avanzado"):
             with st.spinner(f'Ejecutando {analysis_type}...'):
                 try:
-                    results = perform_advanced_analysis(data, analysis_type)
+                    results = perform_advanced_analysis(data, analysis_type, st.session_state.weight_column,
+                                                        pca_mode=pca_mode, n_components=n_components,
+                                                        ols_solver=ols_solver, n_folds=n_folds,
+                                                        target=target, selection=selection,
+                                                        categorical=categorical, alpha=alpha, pca_source=pca_source)
                     st.session_state.analysis_results[analysis_type] = results
                     
                     # Mostrar resultados según el tipo de análisis
@@ -447,16 +844,43 @@ elif selected_section == "🔬 Análisis Avanzado":
                     
                     elif analysis_type == "Regresión Lineal/Múltiple":
                         st.subheader("📈 Resultados de Regresión")
-                        col1, col2 = st.columns(2)
+                        col1, col2, col3 = st.columns(3)
                         with col1:
-                            st.metric("R² Score", f"{results.get('r2_score', 0):.4f}")
+                            st.metric("R² (validación cruzada)", f"{results.get('r2_score', 0):.4f}")
                         with col2:
-                            st.metric("RMSE", f"{results.get('rmse', 0):.4f}")
+                            st.metric("RMSE (validación cruzada)", f"{results.get('rmse', 0):.4f}")
+                        with col3:
+                            st.metric("R² ajustado", f"{results.get('r2_adjusted', 0):.4f}")
+                        
+                        summary = results.get('model_summary', {})
+                        if results.get('selection') is not None:
+                            selection_result = results['selection']
+                            st.info(f"Objetivo: {summary.get('target_variable')}. Selección ({selection_result['method']}): "
+                                    f"{summary.get('n_features', 0)} de {summary.get('n_candidates', 0)} predictores")
+                            with st.expander("🧭 Proceso de selección"):
+                                st.dataframe(selection_result['steps'], use_container_width=True)
+                                if selection_result['penalized_coefficients'] is not None:
+                                    st.write("Coeficientes penalizados:")
+                                    st.dataframe(selection_result['penalized_coefficients'].rename('Coeficiente'),
+                                                 use_container_width=True)
+                        if summary.get('solver') == 'lsmr':
+                            st.caption(f"{summary.get('n_features', 0)} predictores ({summary.get('n_categorical', 0)} variables "
+                                       f"categóricas como indicadoras dispersas) resueltos con LSMR")
+                        if summary.get('aliased'):
+                            st.warning(f"Predictores colineales excluidos del ajuste: {', '.join(map(str, summary['aliased']))}")
+                        if summary.get('underdetermined'):
+                            st.warning(f"Modelo indeterminado: {summary.get('rank')} parámetros independientes con "
+                                       f"{summary.get('n_samples')} filas, sin grados de libertad residuales; el R² "
+                                       f"ajustado y sigma no están definidos. Reduce los predictores o usa ridge (alpha > 0)")
                         
                         if 'feature_importance' in results:
-                            st.subheader("🎯 Importancia de Variables")
+                            st.subheader("🎯 Coeficientes e Inferencia")
                             st.dataframe(results['feature_importance'], use_container_width=True)
                         
+                        if results.get('cv_folds') is not None:
+                            st.subheader("🔁 Validación Cruzada por Partición")
+                            st.dataframe(results['cv_folds'], use_container_width=True)
+                        
                         if 'predictions_plot' in results:
                             st.plotly_chart(results['predictions_plot'], use_container_width=True)
                     
@@ -468,12 +892,20 @@ elif selected_section == "🔬 Análisis Avanzado":
                         with col2:
                             st.metric("Silhouette Score", f"{results.get('silhouette_score', 0):.4f}")
                         
+                        if 'curves_plot' in results:
+                            st.plotly_chart(results['curves_plot'], use_container_width=True)
+                            if any(results.get('silhouette_errors', [])):
+                                st.caption(f"{results['algorithm']}: silhouette estimado sobre una muestra estratificada "
+                                           f"de {results['silhouette_sample_size']:,} filas (barras: ±1.96 errores estándar)")
+                        
                         if 'cluster_plot' in results:
                             st.plotly_chart(results['cluster_plot'], use_container_width=True)
                         
                         if 'cluster_centers' in results:
                             st.subheader("📍 Centros de Clusters")
                             st.dataframe(results['cluster_centers'], use_container_width=True)
+                            if categorical:
+                                st.caption("En las variables categóricas el centro es la proporción de cada nivel en el cluster")
                     
                     elif analysis_type == "Análisis de Componentes Principales (PCA)":
                         st.subheader("🔍 Resultados de PCA")
@@ -483,6 +915,13 @@ elif selected_section == "🔬 Análisis Avanzado":
                         with col2:
                             st.metric("Varianza Explicada Total", f"{sum(results.get('explained_variance', [])):.2%}")
                         
+                        if 'elapsed_seconds' in results:
+                            st.caption(f"Modo {results['mode']}: {results['elapsed_seconds']:.3f} s, "
+                                       f"memoria pico {results['peak_memory_mb']:.2f} MB")
+                            if results.get('requested_mode') == 'incremental' and results['mode'] != 'incremental':
+                                st.info("IncrementalPCA no admite pesos: con factor de expansión se descompuso la "
+                                        "covarianza ponderada acumulada por bloques (modo completo)")
+                        
                         if 'pca_plot' in results:
                             st.plotly_chart(results['pca_plot'], use_container_width=True)
                         
@@ -492,6 +931,10 @@ elif selected_section == "🔬 Análisis Avanzado":
                     
                     elif analysis_type == "Pruebas de Hipótesis":
                         st.subheader("🧪 Resultados de Pruebas de Hipótesis")
+                        if 'normality_table' in results:
+                            st.write("**Pruebas de normalidad (todas las variables numéricas):**")
+                            st.dataframe(results['normality_table'], use_container_width=True)
+                            st.caption("Las columnas con más de 5000 valores se prueban sobre una submuestra aleatoria reproducible (columna 'Submuestra').")
                         if 'test_results' in results:
                             for test_name, test_result in results['test_results'].items():
                                 with st.expander(f"📋 {test_name}"):
@@ -575,7 +1018,7 @@ elif selected_section == "📋 Conclusiones y Reporte":
 ### HALLAZGOS PRINCIPALES
 {chr(10).join(f'• {finding}' for finding in report.get('key_findings', []))}
 
-### INSIGHTS AUTOMÁTICOS  
+### INSIGHTS AUTOMÁTICOS
 {chr(10).join(f'• {insight}' for insight in report.get('insights', []))}
 
 ### RECOMENDACIONES
@@ -622,7 +1065,7 @@ elif selected_section == "📋 Conclusiones y Reporte":
                                 file_name="informe_enaho_2022.html",
                                 mime="text/html"
                             )
-                    
+                
                 except Exception as e:
                     st.error(f"❌ Error al generar el reporte: {str(e)}")
         
@@ -684,7 +1127,7 @@ elif selected_section == "📊 Análisis Completo ENAHO":
                 try:
                     # Ejecutar el análisis completo
                     import subprocess
-                    result = subprocess.run(['python', 'analisis_completo_enaho.py'], 
+                    result = subprocess.run(['python', 'analisis_completo_enaho.py'],
                                           capture_output=True, text=True, timeout=300)
                     
                     if result.returncode == 0:
@@ -779,6 +1222,16 @@ elif selected_section == "📄 Documentos ENAHO":
     show_download_section()
     create_pdf_instructions()
 
+# Estado de la caché de archivos procesados
+with st.sidebar.expander("💾 Caché de archivos"):
+    cache_stats = get_cache_stats()
+    st.write(f"**Aciertos:** {cache_stats['hits']}  |  **Fallos:** {cache_stats['misses']}")
+    st.write(f"**Tasa de aciertos:** {cache_stats['hit_rate']:.1f}%")
+    st.write(f"**Archivos en caché:** {cache_stats['entries']} ({cache_stats['size_mb']:.1f} / {cache_stats['max_size_mb']:.0f} MB)")
+    if st.button("🗑️ Vaciar caché"):
+        clear_cache()
+        st.success("Caché vaciada")
+
 # Footer
 st.markdown("---")
 st.markdown("**Analizador de CSV** - Herramienta completa para análisis estadístico de datos | Desarrollado con ❤️ usando Streamlit")
@@ -0,0 +1,12 @@
+import pandas as pd
+
+from utils.statistics import clean_data
+
+def test_winsorization_keeps_integer_columns_with_integral_bounds():
+    data = pd.DataFrame({'codigo': [10] * 10 + [20] * 10, 'monto': range(20)})
+    
+    cleaned = clean_data(data, outlier_strategy="Winsorización")
+    
+    assert cleaned['codigo'].dtype == 'int64'
+    assert cleaned['monto'].dtype == 'float64'
+    assert cleaned['monto'].min() == data['monto'].quantile(0.05)
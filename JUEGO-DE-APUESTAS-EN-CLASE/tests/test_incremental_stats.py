@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from utils.incremental_stats import IncrementalDescriptiveStats, CATEGORY_COUNT_MAX_LEVELS
+
+def _category_counts(batches):
+    state = IncrementalDescriptiveStats()
+    for batch in batches:
+        state.append(batch)
+    return state.category_counts['c'].to_dict()
+
+def test_category_counts_do_not_depend_on_batch_order():
+    as_text = pd.DataFrame({'x': [1, 2, 2], 'c': ['1', '2', '2']})
+    as_numbers = pd.DataFrame({'x': [3, 3, 1], 'c': [3, 3, 1]})
+    
+    expected = {'1': 2, '2': 2, '3': 2}
+    assert _category_counts([as_numbers, as_text]) == expected
+    assert _category_counts([as_text, as_numbers]) == expected
+
+def test_category_counts_stop_at_the_distinct_value_cap():
+    rng = np.random.default_rng(0)
+    state = IncrementalDescriptiveStats()
+    for _ in range(3):
+        state.append(pd.DataFrame({'x': rng.normal(size=2000), 'c': rng.choice(['a', 'b'], 2000),
+                                   'texto': rng.integers(0, 10 ** 9, 2000).astype(str)}))
+    
+    assert state.category_counts['x'] is None
+    assert state.category_counts['c'].sum() == 6000
+    texto = state.descriptive_stats()['categorical_stats']['texto']
+    assert texto['approximate'] and len(texto['value_counts']) <= CATEGORY_COUNT_MAX_LEVELS
@@ -0,0 +1,24 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from utils.analysis_matrix import get_analysis_matrix
+from utils.pca_modes import fit_pca, incremental_pca_from_csv
+
+def test_weighted_csv_pca_matches_in_memory_with_constant_columns():
+    rng = np.random.default_rng(0)
+    n = 200
+    data = pd.DataFrame(rng.normal(size=(n, 4)), columns=['a', 'b', 'c', 'd'])
+    data['b'] += data['a']
+    data['anio'] = 2022
+    data['peso'] = rng.uniform(50, 500, n)
+    
+    matrix = get_analysis_matrix(data, 'peso')
+    expected = fit_pca(matrix.scaled(), matrix.weights, mode='full')
+    result = incremental_pca_from_csv(io.BytesIO(data.to_csv(index=False).encode()), n_components=None,
+                                      chunk_rows=37, weight_column='peso')
+    
+    assert list(result['columns']) == list(matrix.columns)
+    np.testing.assert_allclose(result['explained_variance'], expected['explained_variance'], atol=1e-10)
+    np.testing.assert_allclose(np.abs(result['components']), np.abs(expected['components']), atol=1e-8)
@@ -0,0 +1,17 @@
+import numpy as np
+
+from utils.predictor_selection import best_subset
+
+def test_best_subset_considers_columns_collinear_with_earlier_ones():
+    rng = np.random.default_rng(0)
+    n = 200
+    x = rng.normal(size=(n, 3))
+    combined = x[:, 0] + x[:, 1]
+    y = combined + rng.normal(size=n)
+    design = np.column_stack([np.ones(n), x, combined, y])
+    
+    selected, table = best_subset(design.T @ design, n)
+    
+    assert table.loc[1, 'Variables'] == [4]
+    assert selected == [4]
+    assert table['Predictores'].max() == 3
@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+
+from utils.row_index import RowHashIndex
+
+def test_duplicates_match_pandas_for_mixed_objects_and_signed_zero():
+    for data in [pd.DataFrame({'a': [1, '1', 1]}, dtype=object),
+                 pd.DataFrame({'a': [True, 'True', True]}, dtype=object),
+                 pd.DataFrame({'a': [0.0, -0.0, 0.0]}),
+                 pd.DataFrame({'a': [None, np.nan, 'x']}, dtype=object)]:
+        index = RowHashIndex(data)
+        assert index.duplicate_count(data) == data.duplicated().sum()
+        assert index.duplicated_mask(data, keep='last').equals(data.duplicated(keep='last'))
+
+def test_duplicate_groups_are_largest_first_after_append():
+    data = pd.DataFrame({'x': [1, 1, 1, 2, 2, 2, 2, 2, 2, 3]})
+    new_rows = pd.DataFrame({'x': [1, 1, 1, 1]}, index=range(10, 14))
+    
+    index = RowHashIndex(data).append(new_rows)
+    groups = index.duplicate_groups(pd.concat([data, new_rows]))
+    
+    assert groups.groupby('Grupo')['Repeticiones'].first().tolist() == [7, 6]
@@ -0,0 +1,18 @@
+import numpy as np
+import pandas as pd
+
+from utils.sparse_design import one_hot_csr, design_matrix, fit_sparse_regression
+
+def test_degrees_of_freedom_ignore_empty_and_collinear_indicators():
+    rng = np.random.default_rng(0)
+    n = 30
+    levels = pd.DataFrame({'a': rng.choice(['x', 'y', 'z'], n)})
+    levels['b'] = levels['a']
+    encoded, names = one_hot_csr(levels, ['a', 'b'])
+    numeric = np.column_stack([rng.normal(size=n), np.zeros(n)])
+    
+    fit = fit_sparse_regression(design_matrix(numeric, encoded), rng.normal(size=n), ['x0', 'cero'] + names, 'y')
+    
+    assert fit['rank'] == 4
+    assert fit['df_resid'] == n - 4
+    assert fit['aliased'] == ['cero']
@@ -1,76 +1,77 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LinearRegression
-from sklearn.cluster import KMeans
-from sklearn.decomposition import PCA
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import r2_score, mean_squared_error, silhouette_score
 from scipy import stats
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
-def perform_advanced_analysis(data, analysis_type):
+from utils.correlation_pairs import correlation_pairs
+from utils.correlation_matrix import get_correlation_matrix
+from utils.distribution_tests import run_distribution_tests, distribution_tests_table
+from utils.survey_weights import get_weights, weighted_chi2
+from utils.kmeans_sweep import kmeans_sweep
+from utils.analysis_matrix import get_analysis_matrix
+from utils.pca_modes import fit_pca, incremental_pca_from_csv
+from utils.ols_engine import fit_ols, OLS_FOLDS
+from utils.predictor_selection import select_predictors
+from utils.sparse_design import one_hot_csr, design_matrix, fit_sparse_regression, CLUSTER_DUMMY_SCALE
+
+def perform_advanced_analysis(data, analysis_type, weight_column=None, pca_mode='full', n_components=None,
+                              ols_solver='cholesky', n_folds=OLS_FOLDS, target=None, selection=None,
+                              categorical=None, alpha=0.0, pca_source=None):
     """
-    Ejecuta análisis estadístico avanzado según el tipo seleccionado
+    Ejecuta análisis estadístico avanzado según el tipo seleccionado. Con
+    weight_column (factor de expansión) los análisis se ponderan; pca_mode y
+    n_components configuran el PCA (pca_source: archivo CSV a analizar por
+    bloques sin cargarlo); ols_solver, n_folds, target, selection
+    (método de selección de predictores), categorical (predictores no
+    numéricos) y alpha (penalización ridge) la regresión. categorical
+    también agrega variables no numéricas al clustering
     """
     results = {}
     
     try:
         if analysis_type == "Análisis de Correlación Detallado":
-            results = detailed_correlation_analysis(data)
+            results = detailed_correlation_analysis(data, weight_column)
         
         elif analysis_type == "Regresión Lineal/Múltiple":
-            results = regression_analysis(data)
+            results = regression_analysis(data, weight_column, solver=ols_solver, n_folds=n_folds,
+                                          target=target, selection=selection, categorical=categorical, alpha=alpha)
         
         elif analysis_type == "Clustering (K-means)":
-            results = clustering_analysis(data)
+            results = clustering_analysis(data, weight_column, categorical=categorical)
         
         elif analysis_type == "Análisis de Componentes Principales (PCA)":
-            results = pca_analysis(data)
+            results = pca_analysis(data, weight_column, mode=pca_mode, n_components=n_components, source=pca_source)
         
         elif analysis_type == "Pruebas de Hipótesis":
-            results = hypothesis_testing(data)
+            results = hypothesis_testing(data, weight_column)
         
         return results
     
     except Exception as e:
         raise Exception(f"Error en el análisis avanzado: {str(e)}")
 
-def detailed_correlation_analysis(data):
+def detailed_correlation_analysis(data, weight_column=None):
     """
     Análisis de correlación detallado con interpretaciones
     """
     numeric_data = data.select_dtypes(include=[np.number])
     
-    if len(numeric_data.columns) < 2:
+    if len(numeric_data.columns) - (weight_column is not None) < 2:
         raise ValueError("Se necesitan al menos 2 variables numéricas para el análisis de correlación")
     
     # Matriz de correlación
-    corr_matrix = numeric_data.corr()
+    corr_matrix = get_correlation_matrix(numeric_data, weight_column=weight_column)
     
     # Identificar correlaciones significativas
-    significant_correlations = []
-    for i in range(len(corr_matrix.columns)):
-        for j in range(i+1, len(corr_matrix.columns)):
-            corr_value = corr_matrix.iloc[i, j]
-            if not np.isnan(corr_value):
-                significance = interpret_correlation_strength(abs(corr_value))
-                significant_correlations.append({
-                    'Variable 1': corr_matrix.columns[i],
-                    'Variable 2': corr_matrix.columns[j],
-                    'Correlación': round(corr_value, 4),
-                    'Fuerza': significance,
-                    'Interpretación': generate_correlation_interpretation(
-                        corr_matrix.columns[i], 
-                        corr_matrix.columns[j], 
-                        corr_value
-                    )
-                })
-    
-    significant_df = pd.DataFrame(significant_correlations)
-    significant_df = significant_df.sort_values('Correlación', key=abs, ascending=False)
+    significant_df = correlation_pairs(corr_matrix)
+    significant_df['Fuerza'] = significant_df['Correlación'].abs().map(interpret_correlation_strength)
+    significant_df['Interpretación'] = [
+        generate_correlation_interpretation(var1, var2, corr_value)
+        for var1, var2, corr_value in zip(significant_df['Variable 1'], significant_df['Variable 2'], significant_df['Correlación'])
+    ]
+    significant_df['Correlación'] = significant_df['Correlación'].round(4)
     
     return {
         'correlation_matrix': corr_matrix,
@@ -78,98 +79,141 @@ def detailed_correlation_analysis(data):
         'summary': generate_correlation_summary(significant_df)
     }
 
-def regression_analysis(data):
+def regression_analysis(data, weight_column=None, solver='cholesky', n_folds=OLS_FOLDS, target=None, selection=None,
+                        categorical=None, alpha=0.0):
     """
-    Análisis de regresión lineal/múltiple
+    Análisis de regresión lineal/múltiple (mínimos cuadrados ponderados si
+    se indica weight_column) con estadísticas suficientes: coeficientes con
+    errores estándar, t, p-valores y VIF, y validación cruzada k-fold. Con
+    selection se eligen los predictores automáticamente (ver select_predictors).
+    Con categorical (columnas no numéricas) se agregan sus indicadoras en una
+    matriz dispersa y el ajuste (ridge si alpha > 0) se resuelve con LSMR
     """
-    numeric_data = data.select_dtypes(include=[np.number]).dropna()
+    matrix = get_analysis_matrix(data, weight_column)
     
-    if len(numeric_data.columns) < 2:
+    if len(matrix.columns) < 2:
         raise ValueError("Se necesitan al menos 2 variables numéricas para regresión")
     
-    # Seleccionar variable dependiente (la que tenga mayor correlación promedio)
-    corr_matrix = numeric_data.corr()
-    avg_correlations = corr_matrix.abs().mean().sort_values(ascending=False)
+    numeric_data = matrix.frame()
     
-    target_col = avg_correlations.index[0]
+    # Variable dependiente indicada o, por defecto, la de mayor correlación promedio
+    if target is not None:
+        if target not in numeric_data.columns:
+            raise ValueError(f"La variable objetivo '{target}' no es numérica o no existe")
+        target_col = target
+    else:
+        corr_matrix = matrix.correlation()
+        avg_correlations = corr_matrix.abs().mean().sort_values(ascending=False)
+        target_col = avg_correlations.index[0]
     feature_cols = [col for col in numeric_data.columns if col != target_col]
     
     if len(feature_cols) == 0:
         raise ValueError("No hay variables predictoras disponibles")
     
-    X = numeric_data[feature_cols]
-    y = numeric_data[target_col]
-    
-    # Dividir datos
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42)
-    
-    # Entrenar modelo
-    model = LinearRegression()
-    model.fit(X_train, y_train)
-    
-    # Predicciones
-    y_pred_train = model.predict(X_train)
-    y_pred_test = model.predict(X_test)
-    
-    # Métricas
-    r2_train = r2_score(y_train, y_pred_train)
-    r2_test = r2_score(y_test, y_pred_test)
-    rmse_test = np.sqrt(mean_squared_error(y_test, y_pred_test))
+    X = numeric_data[feature_cols].to_numpy()
+    y = numeric_data[target_col].to_numpy()
+    
+    selection_result = None
+    if categorical:
+        if selection:
+            raise ValueError("La selección automática de predictores solo admite predictores numéricos")
+        # Indicadoras de los casos completos en CSR, unidas al bloque numérico sin densificar
+        encoded, dummy_cols = one_hot_csr(data.iloc[matrix.rows], categorical)
+        design = design_matrix(X, encoded)
+        predictors = feature_cols + dummy_cols
+        fit = fit_sparse_regression(design, y, predictors, target_col, weights=matrix.weights, alpha=alpha, n_folds=n_folds)
+        cv = fit['cv']
+        y_pred = cv['predictions'] if cv is not None else fit['intercept'] + design @ fit['coef']
+    else:
+        # Un solo recorrido por bloques acumula X'X y X'y de cada partición
+        accumulator = fit_ols(X, y, feature_cols, target_col, weights=matrix.weights, solver=solver, n_folds=n_folds)
+        
+        # La selección evalúa candidatos sobre la Gram (sin volver a recorrer las filas)
+        if selection:
+            selection_result = select_predictors(accumulator, method=selection)
+            accumulator = selection_result['accumulator']
+            fit = selection_result['fit']
+            X = numeric_data[accumulator.columns].to_numpy()
+        else:
+            fit = accumulator.fit()
+        predictors = accumulator.columns
+        cv = fit['cv']
+        
+        # Predicciones fuera de la partición: cada fila con el modelo que no la usó
+        if cv is not None:
+            y_pred = accumulator.predict_out_of_fold(X, np.arange(len(y)), cv['fold_coefficients'])
+        else:
+            y_pred = fit['intercept'] + X @ np.nan_to_num(fit['coef'])
     
-    # Importancia de características
-    feature_importance = pd.DataFrame({
-        'Variable': feature_cols,
-        'Coeficiente': model.coef_,
-        'Importancia_Abs': np.abs(model.coef_)
-    }).sort_values('Importancia_Abs', ascending=False)
+    # Coeficientes con inferencia, ordenados por magnitud
+    feature_importance = fit['coefficients'].drop(index='Intercepto').rename_axis('Variable').reset_index()
+    feature_importance['Importancia_Abs'] = feature_importance['Coeficiente'].abs()
+    feature_importance = feature_importance.sort_values('Importancia_Abs', ascending=False)
     
     # Gráfico de predicciones vs valores reales
-    predictions_plot = create_regression_plot(y_test, y_pred_test, target_col)
+    predictions_plot = create_regression_plot(y, y_pred, target_col)
     
     return {
-        'r2_score': r2_test,
-        'r2_train': r2_train,
-        'rmse': rmse_test,
+        'r2_score': cv['r2'] if cv is not None else fit['r2'],
+        'r2_train': fit['r2'],
+        'r2_adjusted': fit['r2_adjusted'],
+        'rmse': cv['rmse'] if cv is not None else fit['rmse'],
+        'rmse_train': fit['rmse'],
+        'cv_folds': cv['folds'] if cv is not None else None,
+        'coefficients': fit['coefficients'],
         'feature_importance': feature_importance,
         'predictions_plot': predictions_plot,
+        'selection': selection_result,
         'model_summary': {
             'target_variable': target_col,
-            'n_features': len(feature_cols),
-            'n_samples': len(y),
-            'intercept': model.intercept_
+            'n_features': len(predictors),
+            'n_candidates': len(feature_cols),
+            'n_categorical': len(categorical or []),
+            'n_samples': fit['n_samples'],
+            'intercept': fit['intercept'],
+            'rank': fit['rank'],
+            'df_resid': fit['df_resid'],
+            'underdetermined': fit['df_resid'] <= 0,
+            'sigma': fit['sigma'],
+            'aliased': fit['aliased'],
+            'solver': fit['solver']
         }
     }
 
-def clustering_analysis(data):
+def clustering_analysis(data, weight_column=None, categorical=None):
     """
-    Análisis de clustering usando K-means
+    Análisis de clustering usando K-means (centros ponderados si se indica
+    weight_column; el silhouette se calcula sin ponderar). Con muchas filas
+    usa MiniBatchKMeans y un silhouette estimado sobre una muestra estratificada.
+    Con categorical las variables no numéricas entran como indicadoras de
+    todos sus niveles en una matriz dispersa y sus centros son proporciones
     """
-    numeric_data = data.select_dtypes(include=[np.number]).dropna()
-    
-    if len(numeric_data.columns) < 2:
-        raise ValueError("Se necesitan al menos 2 variables numéricas para clustering")
-    
-    # Estandarizar datos
-    scaler = StandardScaler()
-    scaled_data = scaler.fit_transform(numeric_data)
-    
-    # Determinar número óptimo de clusters (método del codo)
-    inertias = []
-    silhouette_scores = []
-    k_range = range(2, min(11, len(numeric_data) // 2))
-    
-    for k in k_range:
-        kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-        kmeans.fit(scaled_data)
-        inertias.append(kmeans.inertia_)
-        silhouette_scores.append(silhouette_score(scaled_data, kmeans.labels_))
-    
-    # Seleccionar mejor k (mayor silhouette score)
-    best_k = k_range[np.argmax(silhouette_scores)]
-    
-    # Clustering final
-    final_kmeans = KMeans(n_clusters=best_k, random_state=42, n_init=10)
-    clusters = final_kmeans.fit_predict(scaled_data)
+    categorical = categorical or []
+    matrix = get_analysis_matrix(data, weight_column)
+    weights = matrix.weights
+    
+    if len(matrix.columns) == 0 or len(matrix.columns) + len(categorical) < 2:
+        raise ValueError("Se necesitan al menos 2 variables (una numérica) para clustering")
+    
+    # Datos estandarizados (compartidos con los demás análisis)
+    numeric_data = matrix.original(data)
+    scaled_data = matrix.scaled()
+    dummy_cols = []
+    if categorical:
+        encoded, dummy_cols = one_hot_csr(data.iloc[matrix.rows], categorical, drop_first=False)
+        scaled_data = design_matrix(scaled_data, encoded * CLUSTER_DUMMY_SCALE)
+    
+    # Determinar número óptimo de clusters (método del codo y silhouette);
+    # los valores de k se ajustan en paralelo y se conserva cada modelo
+    sweep = kmeans_sweep(scaled_data, range(2, min(11, len(numeric_data) // 2)), weights=weights)
+    inertias = sweep['inertias']
+    silhouette_scores = sweep['silhouette_scores']
+    
+    # Seleccionar mejor k (mayor silhouette score) y reutilizar su ajuste
+    best_index = int(np.argmax(silhouette_scores))
+    best_k = sweep['k_values'][best_index]
+    final_kmeans = sweep['models'][best_k]
+    clusters = final_kmeans.labels_
     
     # Agregar clusters al dataset original
     clustered_data = numeric_data.copy()
@@ -178,56 +222,73 @@ def clustering_analysis(data):
     # Crear visualización
     cluster_plot = create_cluster_plot(clustered_data, numeric_data.columns[:2], best_k)
     
-    # Centros de clusters (en escala original)
+    # Centros de clusters (en escala original; proporción de cada nivel en las indicadoras)
+    n_numeric = len(numeric_data.columns)
     cluster_centers = pd.DataFrame(
-        scaler.inverse_transform(final_kmeans.cluster_centers_),
-        columns=numeric_data.columns,
+        np.column_stack([
+            matrix.scaler.inverse_transform(final_kmeans.cluster_centers_[:, :n_numeric]),
+            final_kmeans.cluster_centers_[:, n_numeric:] / CLUSTER_DUMMY_SCALE
+        ]),
+        columns=list(numeric_data.columns) + dummy_cols,
         index=[f'Cluster {i}' for i in range(best_k)]
     )
     
     return {
         'n_clusters': best_k,
-        'silhouette_score': silhouette_scores[best_k - 2],
+        'silhouette_score': silhouette_scores[best_index],
         'cluster_plot': cluster_plot,
         'cluster_centers': cluster_centers,
         'clustered_data': clustered_data,
         'inertias': inertias,
-        'silhouette_scores': silhouette_scores
+        'silhouette_scores': silhouette_scores,
+        'silhouette_errors': sweep['silhouette_errors'],
+        'silhouette_sample_size': sweep['silhouette_sample_size'],
+        'k_values': sweep['k_values'],
+        'algorithm': sweep['algorithm'],
+        'curves_plot': create_kmeans_curves_plot(sweep)
     }
 
-def pca_analysis(data):
+def pca_analysis(data, weight_column=None, mode='full', n_components=None, source=None):
     """
-    Análisis de Componentes Principales
+    Análisis de Componentes Principales (sobre la covarianza ponderada si se
+    indica weight_column). mode elige la descomposición completa, la SVD
+    aleatorizada o IncrementalPCA por bloques; n_components es un número fijo
+    o una varianza objetivo en (0, 1]. Con source (archivo CSV y su dialecto)
+    se analiza el archivo por bloques sin cargarlo en memoria
     """
-    numeric_data = data.select_dtypes(include=[np.number]).dropna()
-    
-    if len(numeric_data.columns) < 3:
-        raise ValueError("Se necesitan al menos 3 variables numéricas para PCA")
-    
-    # Estandarizar datos
-    scaler = StandardScaler()
-    scaled_data = scaler.fit_transform(numeric_data)
-    
-    # Aplicar PCA
-    pca = PCA()
-    pca_result = pca.fit_transform(scaled_data)
+    if source is not None:
+        pca = incremental_pca_from_csv(source['file'], n_components=n_components, dialect=source['dialect'],
+                                       weight_column=weight_column)
+        columns = pca['columns']
+    else:
+        matrix = get_analysis_matrix(data, weight_column)
+        columns = matrix.columns
+        
+        if len(columns) < 3:
+            raise ValueError("Se necesitan al menos 3 variables numéricas para PCA")
+        
+        # Datos estandarizados (compartidos con los demás análisis); solo se
+        # conservan los puntajes de los componentes graficados
+        pca = fit_pca(matrix.scaled(), matrix.weights, mode=mode, n_components=n_components)
+    explained_variance = pca['explained_variance']
+    components = pca['components']
     
     # Varianza explicada
-    explained_variance = pca.explained_variance_ratio_
     cumulative_variance = np.cumsum(explained_variance)
     
-    # Número de componentes que explican al menos 80% de la varianza
-    n_components_80 = np.argmax(cumulative_variance >= 0.8) + 1
+    # Número de componentes que explican al menos 80% de la varianza (None
+    # si los componentes calculados no la alcanzan)
+    n_components_80 = int(np.argmax(cumulative_variance >= 0.8) + 1) if np.any(cumulative_variance >= 0.8) else None
     
-    # Crear DataFrame con componentes principales
-    pca_columns = [f'PC{i+1}' for i in range(len(explained_variance))]
-    pca_df = pd.DataFrame(pca_result, columns=pca_columns)
+    # Crear DataFrame con los puntajes de los componentes graficados
+    pca_columns = [f'PC{i+1}' for i in range(pca['scores'].shape[1])]
+    pca_df = pd.DataFrame(pca['scores'], columns=pca_columns)
     
     # Cargas de los componentes
     components_df = pd.DataFrame(
-        pca.components_[:3].T,  # Primeras 3 componentes
-        columns=['PC1', 'PC2', 'PC3'],
-        index=numeric_data.columns
+        components[:3].T,  # Primeras 3 componentes
+        columns=pca_columns[:3],
+        index=columns
     )
     
     # Crear visualización
@@ -239,31 +300,27 @@ def pca_analysis(data):
         'n_components_80': n_components_80,
         'pca_plot': pca_plot,
         'components_df': components_df,
-        'pca_data': pca_df
+        'pca_data': pca_df,
+        'mode': pca['mode'],
+        'requested_mode': 'csv' if source is not None else mode,
+        'elapsed_seconds': pca['elapsed_seconds'],
+        'peak_memory_mb': pca['peak_memory_mb']
     }
 
-def hypothesis_testing(data):
+def hypothesis_testing(data, weight_column=None):
     """
-    Realiza pruebas de hipótesis estadísticas
+    Realiza pruebas de hipótesis estadísticas. Con weight_column la prueba
+    chi-cuadrado usa proporciones ponderadas; las pruebas de normalidad
+    describen la forma de la muestra y no se ponderan
     """
     results = {'test_results': {}}
     
     numeric_cols = data.select_dtypes(include=[np.number]).columns.tolist()
     categorical_cols = data.select_dtypes(include=['object', 'category']).columns.tolist()
     
-    # 1. Prueba de normalidad (Shapiro-Wilk)
+    # 1. Pruebas de normalidad de todas las variables numéricas (tabla aparte)
     if len(numeric_cols) > 0:
-        normality_results = {}
-        for col in numeric_cols[:3]:  # Limitar a 3 variables
-            col_data = data[col].dropna()
-            if len(col_data) > 3 and len(col_data) <= 5000:
-                statistic, p_value = stats.shapiro(col_data)
-                normality_results[f'Normalidad - {col}'] = {
-                    'statistic': statistic,
-                    'p_value': p_value,
-                    'interpretation': 'Los datos siguen distribución normal' if p_value > 0.05 else 'Los datos NO siguen distribución normal'
-                }
-        results['test_results'].update(normality_results)
+        results['normality_table'] = distribution_tests_table(run_distribution_tests(data, numeric_cols))
     
     # 2. Prueba t de una muestra (comparar con la media)
     if len(numeric_cols) > 0:
@@ -283,7 +340,10 @@ def hypothesis_testing(data):
         cat1, cat2 = categorical_cols[:2]
         contingency_table = pd.crosstab(data[cat1], data[cat2])
         if contingency_table.size > 1:
-            chi2, p_value, dof, expected = stats.chi2_contingency(contingency_table)
+            if weight_column:
+                chi2, p_value, dof, _ = weighted_chi2(data[cat1], data[cat2], get_weights(data, weight_column))
+            else:
+                chi2, p_value, dof, expected = stats.chi2_contingency(contingency_table)
             results['test_results'][f'Chi-cuadrado - {cat1} vs {cat2}'] = {
                 'statistic': chi2,
                 'p_value': p_value,
@@ -356,6 +416,40 @@ def create_cluster_plot(data, feature_cols, n_clusters):
     
     return None
 
+def create_kmeans_curves_plot(sweep):
+    """
+    Curvas del codo (inercia) y silhouette por k; las barras de error del
+    silhouette son ±1.96 errores estándar del muestreo
+    """
+    fig = make_subplots(
+        rows=1, cols=2,
+        subplot_titles=['Método del Codo (Inercia)', 'Silhouette Score']
+    )
+    
+    fig.add_trace(
+        go.Scatter(x=sweep['k_values'], y=sweep['inertias'], mode='lines+markers', name='Inercia'),
+        row=1, col=1
+    )
+    fig.add_trace(
+        go.Scatter(
+            x=sweep['k_values'],
+            y=sweep['silhouette_scores'],
+            mode='lines+markers',
+            name='Silhouette',
+            error_y=dict(type='data', array=[1.96 * error for error in sweep['silhouette_errors']], visible=True)
+        ),
+        row=1, col=2
+    )
+    
+    fig.update_xaxes(title_text='k', dtick=1)
+    fig.update_layout(
+        title=f"Selección de k ({sweep['algorithm']})",
+        height=400,
+        showlegend=False
+    )
+    
+    return fig
+
 def create_pca_plot(pca_data, explained_variance):
     """
     Crea visualización de PCA
@@ -436,7 +530,7 @@ def generate_correlation_summary(correlations_df):
     
     strong_correlations = correlations_df[correlations_df['Correlación'].abs() >= 0.7]
     moderate_correlations = correlations_df[
-        (correlations_df['Correlación'].abs() >= 0.3) & 
+        (correlations_df['Correlación'].abs() >= 0.3) &
         (correlations_df['Correlación'].abs() < 0.7)
     ]
     
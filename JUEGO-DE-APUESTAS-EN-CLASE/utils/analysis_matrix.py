@@ -0,0 +1,94 @@
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+from utils.dataset_profile import dataset_fingerprint
+from utils.correlation_matrix import compute_correlation_matrix
+from utils.survey_weights import get_weights
+
+# Número de matrices (versión del dataset, pesos y precisión) que se mantienen en memoria
+ANALYSIS_CACHE_SIZE = 4
+
+# Matrices ya preparadas, por huella del contenido, columna de pesos y precisión
+_analysis_cache = OrderedDict()
+
+class AnalysisMatrix:
+    """
+    Bloque numérico de casos completos de una versión del dataset, preparado
+    una sola vez para los análisis avanzados: valores contiguos, pesos,
+    posiciones de las filas y estadísticas del escalador. La versión
+    estandarizada y la correlación se calculan al pedirlas y se reutilizan
+    """
+    
+    def __init__(self, data, weight_column=None, dtype='float64', fingerprint=None):
+        self.fingerprint = dataset_fingerprint(data) if fingerprint is None else fingerprint
+        self.weight_column = weight_column
+        self.dtype = np.dtype(dtype)
+        numeric_data = data.select_dtypes(include=[np.number])
+        
+        # Casos completos (la columna de pesos también cuenta, como en dropna)
+        complete = numeric_data.notna().all(axis=1).to_numpy()
+        self.rows = np.flatnonzero(complete)
+        self.index = data.index[self.rows]
+        
+        self.weights = None
+        if weight_column:
+            self.weights = get_weights(numeric_data.iloc[self.rows], weight_column)
+            numeric_data = numeric_data.drop(columns=[weight_column])
+        self.columns = numeric_data.columns
+        values = numeric_data.to_numpy(dtype=self.dtype, na_value=np.nan)
+        self.values = np.ascontiguousarray(values[self.rows] if len(self.rows) < len(values) else values)
+        
+        self.scaler = None
+        self._scaled = None
+        self._correlation = None
+    
+    def __len__(self):
+        return len(self.rows)
+    
+    def frame(self):
+        """
+        Valores como DataFrame con el índice y las columnas originales
+        """
+        return pd.DataFrame(self.values, index=self.index, columns=self.columns, copy=False)
+    
+    def original(self, data):
+        """
+        Filas y columnas del bloque tomadas del dataset original (conserva los tipos)
+        """
+        return data.iloc[self.rows][self.columns]
+    
+    def scaled(self):
+        """
+        Valores estandarizados (media cero y varianza uno, ponderadas si hay pesos)
+        """
+        if self._scaled is None:
+            self.scaler = StandardScaler().fit(self.values, sample_weight=self.weights)
+            self._scaled = np.ascontiguousarray(self.scaler.transform(self.values))
+        return self._scaled
+    
+    def correlation(self):
+        """
+        Matriz de correlación (ponderada si hay pesos) de las columnas del bloque
+        """
+        if self._correlation is None:
+            self._correlation = compute_correlation_matrix(self.frame(), weights=self.weights)
+        return self._correlation
+
+def get_analysis_matrix(data, weight_column=None, dtype='float64'):
+    """
+    Matriz de análisis de la versión actual del dataset, preparada una sola
+    vez por huella del contenido, columna de pesos y precisión
+    """
+    key = (dataset_fingerprint(data), weight_column, np.dtype(dtype).name)
+    matrix = _analysis_cache.get(key)
+    if matrix is not None:
+        _analysis_cache.move_to_end(key)
+        return matrix
+    
+    matrix = AnalysisMatrix(data, weight_column, dtype=dtype, fingerprint=key[0])
+    _analysis_cache[key] = matrix
+    while len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+        _analysis_cache.popitem(last=False)
+    return matrix
@@ -0,0 +1,245 @@
+import warnings
+import numpy as np
+import pandas as pd
+
+from utils.data_loader import PROFILE_BLOCK_COLUMNS
+from utils.dataset_profile import get_dataset_profile, get_quantiles, multi_quantile
+from utils.row_index import get_row_index, register_row_index
+
+# Estrategias de la interfaz y la regla del plan que generan
+NULL_RULES = {
+    "Eliminar filas": 'drop',
+    "Imputar con media": 'mean',
+    "Imputar con mediana": 'median',
+    "Imputar con moda": 'mode'
+}
+OUTLIER_RULES = {
+    "Eliminar valores atípicos": 'drop',
+    "Transformar con log": 'log',
+    "Winsorización": 'winsorize'
+}
+
+# Factor de las vallas IQR y percentiles de la winsorización
+IQR_FACTOR = 1.5
+WINSOR_QUANTILES = (0.05, 0.95)
+
+def build_cleaning_plan(data, null_strategy="No aplicar", outlier_strategy="No aplicar", drop_duplicates=False):
+    """
+    Traduce las estrategias de limpieza a un plan declarativo con una regla
+    por columna: imputación ('mean', 'median', 'mode') y valores atípicos
+    ('drop', 'log', 'winsorize')
+    """
+    numeric_cols = list(data.select_dtypes(include=[np.number]).columns)
+    null_rule = NULL_RULES.get(null_strategy)
+    outlier_rule = OUTLIER_RULES.get(outlier_strategy)
+    
+    imputation = {}
+    if null_rule in ('mean', 'median'):
+        imputation = {col: null_rule for col in numeric_cols}
+    elif null_rule == 'mode':
+        imputation = {col: 'mode' for col in data.columns}
+    
+    return {
+        'drop_duplicates': drop_duplicates,
+        'drop_null_rows': null_rule == 'drop',
+        'imputation': imputation,
+        'outliers': {col: outlier_rule for col in numeric_cols} if outlier_rule else {}
+    }
+
+def _kept_statistics(data, columns, keep):
+    """
+    Media y percentiles de las columnas numéricas sobre las filas
+    conservadas. Si no se eliminó ninguna fila se usa el perfil compartido
+    """
+    quantiles = [WINSOR_QUANTILES[0], 0.25, 0.50, 0.75, WINSOR_QUANTILES[1]]
+    if keep.all():
+        statistics = get_quantiles(data, quantiles).T
+        statistics['mean'] = get_dataset_profile(data).stats['mean']
+        return statistics.loc[columns]
+    
+    blocks = []
+    for start in range(0, len(columns), PROFILE_BLOCK_COLUMNS):
+        block_columns = columns[start:start + PROFILE_BLOCK_COLUMNS]
+        values = data[block_columns].to_numpy(dtype='float64', na_value=np.nan)[keep]
+        block = pd.DataFrame(multi_quantile(values, quantiles).T, index=block_columns, columns=quantiles)
+        with warnings.catch_warnings():
+            # Columnas sin valores en las filas conservadas: resultado NaN
+            warnings.simplefilter('ignore', RuntimeWarning)
+            block['mean'] = np.nanmean(values, axis=0)
+        blocks.append(block)
+    
+    if not blocks:
+        return pd.DataFrame(columns=quantiles + ['mean'], dtype='float64')
+    return pd.concat(blocks)
+
+def compile_cleaning_plan(data, plan):
+    """
+    Calcula una sola vez todas las estadísticas del plan (sobre las filas que
+    quedan tras eliminar duplicados y filas con nulos) y las convierte en
+    operaciones concretas: máscara de filas, valores de imputación, límites de
+    recorte y columnas a transformar. No modifica ni copia el dataset
+    """
+    n_rows = len(data)
+    keep = np.ones(n_rows, dtype=bool)
+    rows_removed = {'duplicates': 0, 'nulls': 0, 'outliers': 0}
+    
+    if plan['drop_duplicates']:
+        duplicated = get_row_index(data).duplicated_mask(data).to_numpy()
+        rows_removed['duplicates'] = int(duplicated.sum())
+        keep &= ~duplicated
+    
+    if plan['drop_null_rows']:
+        null_rows = data.isnull().any(axis=1).to_numpy() & keep
+        rows_removed['nulls'] = int(null_rows.sum())
+        keep &= ~null_rows
+    
+    imputation_columns = list(plan['imputation'])
+    null_mask = data[imputation_columns].isnull().to_numpy()
+    null_counts = dict(zip(imputation_columns, null_mask[keep].sum(axis=0)))
+    numeric_rules = {col: rule for col, rule in plan['imputation'].items() if rule in ('mean', 'median')}
+    stat_columns = [col for col in data.columns if col in numeric_rules or col in plan['outliers']]
+    statistics = _kept_statistics(data, stat_columns, keep)
+    
+    # Valores de imputación
+    fill_values = {}
+    for col, rule in plan['imputation'].items():
+        if null_counts[col] == 0:
+            continue
+        if rule == 'mean':
+            fill_values[col] = statistics.loc[col, 'mean']
+        elif rule == 'median':
+            fill_values[col] = statistics.loc[col, 0.50]
+        elif rule == 'mode':
+            mode_value = data[col][keep].mode()
+            if len(mode_value) > 0:
+                fill_values[col] = mode_value.iloc[0]
+    fill_values = {col: value for col, value in fill_values.items() if not pd.isna(value)}
+    
+    # Reglas de valores atípicos evaluadas sobre los valores ya imputados
+    clip_bounds = {}
+    log_columns = []
+    outlier_rows = np.zeros(n_rows, dtype=bool)
+    outlier_counts = {}
+    clipped_counts = {}
+    outlier_columns = list(plan['outliers'])
+    for start in range(0, len(outlier_columns), PROFILE_BLOCK_COLUMNS):
+        block_columns = outlier_columns[start:start + PROFILE_BLOCK_COLUMNS]
+        values = data[block_columns].to_numpy(dtype='float64', na_value=np.nan)
+        fills = np.array([fill_values.get(col, np.nan) for col in block_columns], dtype='float64')
+        values = np.where(np.isnan(values), fills, values)
+        kept_values = values[keep]
+        
+        for offset, col in enumerate(block_columns):
+            rule = plan['outliers'][col]
+            column_values = kept_values[:, offset]
+            if rule == 'drop':
+                q1, q3 = statistics.loc[col, 0.25], statistics.loc[col, 0.75]
+                iqr = q3 - q1
+                outside = (values[:, offset] < q1 - IQR_FACTOR * iqr) | (values[:, offset] > q3 + IQR_FACTOR * iqr)
+                outlier_counts[col] = int((outside & keep).sum())
+                outlier_rows |= outside
+            elif rule == 'winsorize':
+                lower, upper = statistics.loc[col, WINSOR_QUANTILES[0]], statistics.loc[col, WINSOR_QUANTILES[1]]
+                if np.isnan(lower):
+                    continue
+                clip_bounds[col] = (lower, upper)
+                clipped_counts[col] = int(((column_values < lower) | (column_values > upper)).sum())
+            elif rule == 'log':
+                # Solo si todos los valores no nulos (imputados incluidos) son positivos
+                present = column_values[~np.isnan(column_values)]
+                if len(present) > 0 and (present > 0).all():
+                    log_columns.append(col)
+    
+    outlier_rows &= keep
+    rows_removed['outliers'] = int(outlier_rows.sum())
+    keep &= ~outlier_rows
+    
+    # Celdas que se imputarán en las filas finales
+    imputed_counts = dict(zip(imputation_columns, null_mask[keep].sum(axis=0)))
+    imputed_counts = {col: int(imputed_counts[col]) for col in fill_values}
+    
+    return {
+        'plan': plan,
+        'keep': keep,
+        'rows_removed': rows_removed,
+        'fill_values': fill_values,
+        'imputed_counts': imputed_counts,
+        'clip_bounds': clip_bounds,
+        'log_columns': log_columns,
+        'outlier_counts': outlier_counts,
+        'clipped_counts': clipped_counts
+    }
+
+def apply_cleaning_plan(data, compiled):
+    """
+    Aplica un plan compilado: selecciona las filas una sola vez y reemplaza
+    solo las columnas que cambian, sin copias intermedias del dataset
+    """
+    keep = compiled['keep']
+    fill_values = compiled['fill_values']
+    clip_bounds = compiled['clip_bounds']
+    log_columns = set(compiled['log_columns'])
+    imputation = compiled['plan']['imputation']
+    
+    cleaned_data = data.copy(deep=False) if keep.all() else data[keep]
+    changed_columns = [col for col in data.columns if col in fill_values or col in clip_bounds or col in log_columns]
+    for col in changed_columns:
+        series = cleaned_data[col]
+        if col in fill_values:
+            # astype(float): la media no cabe en columnas enteras anulables (Int8, Int16...)
+            if imputation[col] in ('mean', 'median'):
+                series = series.astype(float)
+            series = series.fillna(fill_values[col])
+        if col in clip_bounds:
+            lower, upper = clip_bounds[col]
+            # Las columnas enteras conservan su tipo cuando los percentiles son
+            # enteros (códigos como UBIGEO); con límites fraccionarios pasan a float
+            if pd.api.types.is_integer_dtype(series) and float(lower).is_integer() and float(upper).is_integer():
+                series = series.clip(int(lower), int(upper))
+            else:
+                series = series.astype(float).clip(lower, upper)
+        if col in log_columns:
+            # astype(float): con enteros pequeños (int8) numpy devolvería float16
+            series = np.log1p(series.astype(float))
+        cleaned_data[col] = series
+    
+    # Si solo se eliminaron filas, el índice de duplicados se actualiza sin recalcular hashes
+    if not changed_columns:
+        register_row_index(cleaned_data, get_row_index(data).filter(keep))
+    
+    return cleaned_data
+
+def dry_run_cleaning_plan(data, compiled):
+    """
+    Resume el efecto de un plan compilado (filas eliminadas y celdas
+    modificadas) sin construir el dataset limpio
+    """
+    plan = compiled['plan']
+    keep = compiled['keep']
+    columns_report = []
+    for col in data.columns:
+        imputation_rule = plan['imputation'].get(col)
+        outlier_rule = plan['outliers'].get(col)
+        if imputation_rule is None and outlier_rule is None:
+            continue
+        columns_report.append({
+            'Columna': col,
+            'Imputación': imputation_rule,
+            'Valor de imputación': str(compiled['fill_values'][col]) if col in compiled['fill_values'] else None,
+            'Celdas imputadas': compiled['imputed_counts'].get(col, 0),
+            'Valores atípicos': outlier_rule,
+            'Filas con atípicos': compiled['outlier_counts'].get(col, 0),
+            'Celdas recortadas': compiled['clipped_counts'].get(col, 0),
+            'Transformada con log': col in compiled['log_columns']
+        })
+    
+    columns_report = pd.DataFrame(columns_report)
+    return {
+        'rows_before': len(data),
+        'rows_after': int(keep.sum()),
+        'rows_removed': compiled['rows_removed'],
+        'cells_imputed': int(columns_report['Celdas imputadas'].sum()) if len(columns_report) > 0 else 0,
+        'cells_clipped': int(columns_report['Celdas recortadas'].sum()) if len(columns_report) > 0 else 0,
+        'columns_transformed': list(compiled['log_columns']),
+        'columns_report': columns_report
+    }
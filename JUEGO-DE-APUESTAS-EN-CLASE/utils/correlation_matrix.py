@@ -0,0 +1,204 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+from utils.data_loader import iter_csv_chunks, DEFAULT_CHUNK_ROWS
+from utils.dataset_profile import dataset_fingerprint
+from utils.survey_weights import get_weights
+
+# Número de columnas por bloque en los productos cruzados
+CORRELATION_BLOCK_COLUMNS = 128
+
+# Varianza relativa por debajo de la cual una columna se considera constante
+CONSTANT_TOLERANCE = 1e-9
+
+# Número de matrices (versiones del dataset) que se mantienen en memoria
+CORRELATION_CACHE_SIZE = 8
+
+# Matrices ya calculadas, por huella del contenido y precisión
+_correlation_cache = OrderedDict()
+
+class CorrelationAccumulator:
+    """
+    Acumula por bloques de filas las sumas y productos cruzados (matriz de
+    Gram) necesarios para la correlación de Pearson con pares completos.
+    Para cada par (i, j) solo cuentan las filas donde ambas columnas tienen
+    valor, igual que DataFrame.corr()
+    """
+    
+    def __init__(self, columns, dtype='float64', block_columns=CORRELATION_BLOCK_COLUMNS, max_workers=None):
+        self.columns = list(columns)
+        self.dtype = np.dtype(dtype)
+        self.block_columns = block_columns
+        self.max_workers = max_workers
+        n_columns = len(self.columns)
+        
+        # Desplazamiento por columna para evitar cancelación numérica en las sumas
+        self.shift = None
+        self.pair_counts = np.zeros((n_columns, n_columns))
+        self.sums = np.zeros((n_columns, n_columns))
+        self.squares = np.zeros((n_columns, n_columns))
+        self.products = np.zeros((n_columns, n_columns))
+    
+    def _blocks(self):
+        n_columns = len(self.columns)
+        return [slice(start, min(start + self.block_columns, n_columns))
+                for start in range(0, n_columns, self.block_columns)]
+    
+    def _accumulate_block_pair(self, values, valid, weighted, block_a, block_b):
+        """
+        Productos cruzados de un par de bloques de columnas. weighted contiene
+        valores, indicadores y cuadrados multiplicados por el peso de cada fila
+        """
+        weighted_values, weighted_valid, weighted_squared = weighted
+        valid_a, valid_b = valid[:, block_a], valid[:, block_b]
+        self.pair_counts[block_a, block_b] += weighted_valid[:, block_a].T @ valid_b
+        self.products[block_a, block_b] += weighted_values[:, block_a].T @ values[:, block_b]
+        self.sums[block_a, block_b] += weighted_values[:, block_a].T @ valid_b
+        self.squares[block_a, block_b] += weighted_squared[:, block_a].T @ valid_b
+        if block_a != block_b:
+            self.pair_counts[block_b, block_a] = self.pair_counts[block_a, block_b].T
+            self.products[block_b, block_a] = self.products[block_a, block_b].T
+            self.sums[block_b, block_a] += weighted_values[:, block_b].T @ valid_a
+            self.squares[block_b, block_a] += weighted_squared[:, block_b].T @ valid_a
+    
+    def update(self, chunk, weights=None):
+        """
+        Incorpora un bloque de filas (DataFrame con las columnas del acumulador).
+        Con weights (un peso por fila, por ejemplo el factor de expansión) las
+        sumas y productos se ponderan; las filas con peso 0 no cuentan
+        """
+        values = chunk[self.columns].to_numpy(dtype='float64', na_value=np.nan)
+        if len(values) == 0:
+            return self
+        
+        valid = ~np.isnan(values)
+        if weights is not None:
+            weights = np.asarray(weights, dtype='float64')
+            valid &= (weights > 0)[:, None]
+        if self.shift is None:
+            counts = valid.sum(axis=0)
+            self.shift = np.where(counts > 0, np.where(valid, values, 0.0).sum(axis=0) / np.maximum(counts, 1), 0.0)
+        
+        values = np.where(valid, values - self.shift, 0.0).astype(self.dtype)
+        squared = values * values
+        valid = valid.astype(self.dtype)
+        if weights is None:
+            weighted = (values, valid, squared)
+        else:
+            row_weights = weights.astype(self.dtype)[:, None]
+            weighted = (values * row_weights, valid * row_weights, squared * row_weights)
+        
+        # Los productos de cada par de bloques son independientes: NumPy libera
+        # el GIL durante la multiplicación, por lo que se ejecutan en paralelo
+        blocks = self._blocks()
+        pairs = [(a, b) for i, a in enumerate(blocks) for b in blocks[i:]]
+        if len(pairs) == 1:
+            self._accumulate_block_pair(values, valid, weighted, *pairs[0])
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                list(executor.map(lambda pair: self._accumulate_block_pair(values, valid, weighted, *pair), pairs))
+        
+        return self
+    
+    def merge(self, other):
+        """
+        Fusiona otro acumulador de las mismas columnas (por ejemplo de otro archivo)
+        """
+        if other.shift is None:
+            return self
+        if self.shift is None:
+            self.shift = other.shift
+            self.pair_counts, self.sums = other.pair_counts.copy(), other.sums.copy()
+            self.squares, self.products = other.squares.copy(), other.products.copy()
+            return self
+        
+        # Reexpresar las sumas del otro acumulador con el desplazamiento propio
+        delta = other.shift - self.shift
+        sums = other.sums + other.pair_counts * delta[:, None]
+        self.squares += other.squares + 2 * delta[:, None] * other.sums + other.pair_counts * delta[:, None] ** 2
+        self.products += (other.products + delta[:, None] * other.sums.T + other.sums * delta[None, :]
+                          + other.pair_counts * np.outer(delta, delta))
+        self.sums += sums
+        self.pair_counts += other.pair_counts
+        return self
+    
+    def correlation(self):
+        """
+        Matriz de correlación de Pearson con pares completos
+        """
+        n = self.pair_counts
+        with np.errstate(divide='ignore', invalid='ignore'):
+            covariance = self.products - self.sums * self.sums.T / n
+            variance_x = self.squares - self.sums ** 2 / n
+            variance_y = variance_x.T
+            constant = ((variance_x <= CONSTANT_TOLERANCE * self.squares)
+                        | (variance_y <= CONSTANT_TOLERANCE * self.squares.T))
+            correlation = covariance / np.sqrt(variance_x * variance_y)
+        
+        correlation = np.clip(correlation, -1.0, 1.0)
+        correlation[(n < 2) | constant] = np.nan
+        diagonal = np.diag_indices_from(correlation)
+        correlation[diagonal] = np.where(np.isnan(correlation[diagonal]), np.nan, 1.0)
+        
+        return pd.DataFrame(correlation, index=self.columns, columns=self.columns)
+
+def correlation_from_chunks(chunks, columns=None, dtype='float64', max_workers=None):
+    """
+    Correlación a partir de un iterable de bloques de filas. Si no se indican
+    columnas se usan las numéricas del primer bloque; en los siguientes se
+    convierten a número
+    """
+    accumulator = None
+    for chunk in chunks:
+        if accumulator is None:
+            if columns is None:
+                columns = chunk.select_dtypes(include=[np.number]).columns
+            accumulator = CorrelationAccumulator(columns, dtype=dtype, max_workers=max_workers)
+        numeric_chunk = chunk[accumulator.columns].apply(pd.to_numeric, errors='coerce')
+        accumulator.update(numeric_chunk)
+    
+    if accumulator is None:
+        return pd.DataFrame()
+    return accumulator.correlation()
+
+def compute_correlation_matrix(data, chunk_rows=DEFAULT_CHUNK_ROWS, dtype='float64', max_workers=None, weights=None):
+    """
+    Correlación de las columnas numéricas de un DataFrame en memoria,
+    procesado por bloques de filas (ponderada si se indican pesos)
+    """
+    numeric_data = data.select_dtypes(include=[np.number])
+    accumulator = CorrelationAccumulator(numeric_data.columns, dtype=dtype, max_workers=max_workers)
+    for start in range(0, len(numeric_data), chunk_rows):
+        chunk_weights = None if weights is None else weights[start:start + chunk_rows]
+        accumulator.update(numeric_data.iloc[start:start + chunk_rows], weights=chunk_weights)
+    return accumulator.correlation()
+
+def correlation_from_csv(uploaded_file, chunk_rows=DEFAULT_CHUNK_ROWS, dialect=None, dtype='float64', max_workers=None):
+    """
+    Correlación de un CSV leyéndolo por bloques, sin cargarlo completo
+    """
+    chunks = iter_csv_chunks(uploaded_file, chunk_rows=chunk_rows, dialect=dialect)
+    return correlation_from_chunks(chunks, dtype=dtype, max_workers=max_workers)
+
+def get_correlation_matrix(data, dtype='float64', weight_column=None):
+    """
+    Matriz de correlación de la versión actual del dataset, calculada una
+    sola vez por huella del contenido, precisión y columna de pesos. Con
+    weight_column la correlación es ponderada y no incluye la columna de pesos
+    """
+    key = (dataset_fingerprint(data), np.dtype(dtype).name, weight_column)
+    corr_matrix = _correlation_cache.get(key)
+    if corr_matrix is not None:
+        _correlation_cache.move_to_end(key)
+        return corr_matrix
+    
+    if weight_column is None:
+        corr_matrix = compute_correlation_matrix(data, dtype=dtype)
+    else:
+        corr_matrix = compute_correlation_matrix(data.drop(columns=[weight_column]), dtype=dtype, weights=get_weights(data, weight_column))
+    _correlation_cache[key] = corr_matrix
+    while len(_correlation_cache) > CORRELATION_CACHE_SIZE:
+        _correlation_cache.popitem(last=False)
+    return corr_matrix
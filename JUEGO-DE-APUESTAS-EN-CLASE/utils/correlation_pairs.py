@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+def correlation_pairs(corr_matrix, top_k=None, min_abs=None, sign=None):
+    """
+    Extrae los pares de variables del triángulo superior de una matriz de
+    correlación, ordenados por correlación absoluta (de mayor a menor).
+    top_k limita el resultado a los k pares más fuertes, min_abs descarta
+    los pares más débiles y sign ('positive' o 'negative') filtra por signo
+    """
+    columns = np.asarray(corr_matrix.columns)
+    values = corr_matrix.to_numpy(dtype='float64')
+    rows, cols = np.triu_indices(len(columns), k=1)
+    correlations = values[rows, cols]
+    
+    # Filtros vectorizados sobre todos los pares
+    keep = ~np.isnan(correlations)
+    if min_abs is not None:
+        keep &= np.abs(correlations) >= min_abs
+    if sign == 'positive':
+        keep &= correlations > 0
+    elif sign == 'negative':
+        keep &= correlations < 0
+    rows, cols, correlations = rows[keep], cols[keep], correlations[keep]
+    
+    strengths = np.abs(correlations)
+    if top_k is not None and top_k < len(correlations):
+        # Selección parcial de los k más fuertes antes de ordenar; entre
+        # empates en el límite se conservan los primeros del triángulo
+        kth = strengths[np.argpartition(-strengths, top_k - 1)[top_k - 1]]
+        above = np.flatnonzero(strengths > kth)
+        tied = np.flatnonzero(strengths == kth)[:top_k - len(above)]
+        candidates = np.sort(np.concatenate([above, tied]))
+    else:
+        candidates = np.arange(len(correlations))
+    order = candidates[np.argsort(-strengths[candidates], kind='stable')]
+    
+    return pd.DataFrame({
+        'Variable 1': columns[rows[order]],
+        'Variable 2': columns[cols[order]],
+        'Correlación': correlations[order]
+    })
+
+def strongest_pair(corr_matrix):
+    """
+    Par de variables con la mayor correlación absoluta.
+    Devuelve (variable 1, variable 2, |correlación|) o None si no hay pares
+    """
+    top = correlation_pairs(corr_matrix, top_k=1)
+    if len(top) == 0:
+        return None
+    
+    row = top.iloc[0]
+    return row['Variable 1'], row['Variable 2'], abs(row['Correlación'])
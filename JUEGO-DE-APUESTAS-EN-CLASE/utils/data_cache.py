@@ -0,0 +1,181 @@
+import os
+import hashlib
+import pyarrow.feather as feather
+
+# Directorio de la caché local de archivos ya procesados
+CACHE_DIR = os.environ.get(
+    'ANALIZADOR_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'analizador_csv')
+)
+
+# Tamaño máximo de la caché en disco (bytes)
+CACHE_MAX_BYTES = int(os.environ.get('ANALIZADOR_CACHE_MAX_MB', '1024')) * 1024 * 1024
+
+# Versión del formato: cambiarla invalida las entradas anteriores
+CACHE_FORMAT_VERSION = 2
+
+# Elementos del dialecto que cambian el resultado de la lectura
+DIALECT_KEY_FIELDS = ['encoding', 'sep', 'quotechar', 'decimal', 'header']
+
+HASH_BLOCK_BYTES = 1024 * 1024
+
+# Contadores de uso de la caché para el proceso actual
+_cache_stats = {'hits': 0, 'misses': 0, 'errors': 0}
+
+def compute_file_hash(uploaded_file):
+    """
+    Calcula el hash SHA-256 del contenido del archivo leyéndolo por bloques
+    """
+    hasher = hashlib.sha256()
+    uploaded_file.seek(0)
+    while True:
+        block = uploaded_file.read(HASH_BLOCK_BYTES)
+        if not block:
+            break
+        hasher.update(block)
+    uploaded_file.seek(0)
+    
+    return f"v{CACHE_FORMAT_VERSION}-{hasher.hexdigest()}"
+
+def cache_key(file_hash, loader, loader_kwargs):
+    """
+    Clave de una entrada: contenido del archivo, cargador usado y sus
+    opciones (campos del dialecto incluidos), porque cada combinación puede
+    producir un DataFrame distinto
+    """
+    options = dict(loader_kwargs)
+    dialect = options.pop('dialect', None)
+    if dialect is not None:
+        options.update({f"dialect.{field}": dialect.get(field) for field in DIALECT_KEY_FIELDS})
+    description = repr((getattr(loader, '__name__', repr(loader)), sorted(options.items(), key=lambda item: item[0])))
+    return f"{file_hash}-{hashlib.sha256(description.encode('utf-8')).hexdigest()[:16]}"
+
+def _cache_path(file_hash):
+    """
+    Ruta del archivo Feather (Arrow IPC) asociado a un hash
+    """
+    return os.path.join(CACHE_DIR, f"{file_hash}.feather")
+
+def load_from_cache(file_hash):
+    """
+    Lee un DataFrame de la caché usando memory-mapping.
+    Devuelve None si no existe o no se puede leer
+    """
+    path = _cache_path(file_hash)
+    if not os.path.exists(path):
+        return None
+    
+    try:
+        table = feather.read_table(path, memory_map=True)
+        data = table.to_pandas()
+    except Exception:
+        _cache_stats['errors'] += 1
+        return None
+    
+    # Marcar como usado recientemente para la política LRU
+    os.utime(path, None)
+    return data
+
+def save_to_cache(file_hash, data):
+    """
+    Guarda un DataFrame en la caché en formato Feather sin compresión,
+    para que las lecturas posteriores puedan mapearse en memoria
+    """
+    # Feather requiere nombres de columna de texto; renombrarlas cambiaría el resultado
+    if not all(isinstance(col, str) for col in data.columns):
+        return False
+    
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        path = _cache_path(file_hash)
+        tmp_path = f"{path}.tmp"
+        data.reset_index(drop=True).to_feather(tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)
+    except Exception:
+        _cache_stats['errors'] += 1
+        return False
+    
+    evict_cache()
+    return True
+
+def _cache_entries():
+    """
+    Lista las entradas de la caché como (ruta, tamaño, último uso)
+    """
+    if not os.path.isdir(CACHE_DIR):
+        return []
+    
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if not name.endswith('.feather'):
+            continue
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((path, stat.st_size, stat.st_mtime))
+    
+    return entries
+
+def evict_cache(max_bytes=None):
+    """
+    Elimina las entradas usadas hace más tiempo hasta respetar el tamaño máximo
+    """
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = sorted(_cache_entries(), key=lambda entry: entry[2])
+    total_bytes = sum(entry[1] for entry in entries)
+    
+    removed = 0
+    for path, size, _ in entries:
+        if total_bytes <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total_bytes -= size
+            removed += 1
+        except OSError:
+            continue
+    
+    return removed
+
+def load_csv_cached(uploaded_file, loader, **loader_kwargs):
+    """
+    Carga un CSV desde la caché si ya fue procesado; si no, usa el cargador
+    indicado y guarda el resultado. Devuelve (DataFrame, acierto_en_caché)
+    """
+    key = cache_key(compute_file_hash(uploaded_file), loader, loader_kwargs)
+    
+    data = load_from_cache(key)
+    if data is not None:
+        _cache_stats['hits'] += 1
+        return data, True
+    
+    _cache_stats['misses'] += 1
+    data = loader(uploaded_file, **loader_kwargs)
+    save_to_cache(key, data)
+    
+    return data, False
+
+def get_cache_stats():
+    """
+    Obtiene los contadores y el tamaño actual de la caché
+    """
+    entries = _cache_entries()
+    total_requests = _cache_stats['hits'] + _cache_stats['misses']
+    
+    return {
+        'hits': _cache_stats['hits'],
+        'misses': _cache_stats['misses'],
+        'errors': _cache_stats['errors'],
+        'hit_rate': (_cache_stats['hits'] / total_requests * 100) if total_requests > 0 else 0.0,
+        'entries': len(entries),
+        'size_mb': sum(entry[1] for entry in entries) / 1024 / 1024,
+        'max_size_mb': CACHE_MAX_BYTES / 1024 / 1024
+    }
+
+def clear_cache():
+    """
+    Elimina todas las entradas de la caché
+    """
+    return evict_cache(max_bytes=0)
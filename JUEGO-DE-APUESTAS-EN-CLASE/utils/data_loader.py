@@ -1,81 +1,511 @@
 import pandas as pd
-import chardet
+import numpy as np
+import codecs
+import csv
+import re
 import streamlit as st
-from io import StringIO
+from io import StringIO, TextIOWrapper
+from chardet import UniversalDetector
+
+from utils.row_index import count_duplicates
+
+# Tamaño por defecto de cada bloque en la carga por streaming (filas)
+DEFAULT_CHUNK_ROWS = 50000
+
+# Bytes iniciales usados para detectar el dialecto del archivo
+SNIFF_SAMPLE_BYTES = 64 * 1024
+
+# Tamaño de cada bloque entregado al detector incremental de chardet
+ENCODING_BLOCK_BYTES = 4 * 1024
+
+# Candidatos evaluados por el detector de dialecto
+SEPARATOR_CANDIDATES = [',', ';', '\t', '|']
+QUOTECHAR_CANDIDATES = ['"', "'"]
+
+# Proporción máxima de valores únicos para convertir texto a 'category'
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+_DECIMAL_POINT_RE = re.compile(r'^[-+]?\d+\.\d+$')
+_DECIMAL_COMMA_RE = re.compile(r'^[-+]?\d+,\d+$')
+_NUMBER_RE = re.compile(r'^\s*[-+]?(\d+([.,]\d*)?|[.,]\d+)([eE][-+]?\d+)?\s*$')
+
+def _detect_encoding_with_confidence(file_bytes):
+    """
+    Detecta la codificación con el detector incremental de chardet,
+    deteniéndose en cuanto el detector alcanza una decisión
+    """
+    detector = UniversalDetector()
+    for start in range(0, len(file_bytes), ENCODING_BLOCK_BYTES):
+        detector.feed(file_bytes[start:start + ENCODING_BLOCK_BYTES])
+        if detector.done:
+            break
+    detector.close()
+    
+    encoding = detector.result.get('encoding')
+    confidence = detector.result.get('confidence') or 0.0
+    
+    # Si la confianza es baja, intentar con codificaciones comunes. La muestra
+    # puede terminar a mitad de un carácter multibyte: el decodificador
+    # incremental no lo considera un error
+    if confidence < 0.7:
+        common_encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
+        for enc in common_encodings:
+            try:
+                codecs.getincrementaldecoder(enc)().decode(file_bytes, final=False)
+                return enc, confidence
+            except UnicodeDecodeError:
+                continue
+    
+    return (encoding if encoding else 'utf-8'), confidence
 
 def detect_encoding(file_bytes):
     """
     Detecta la codificación de un archivo usando chardet
     """
     try:
-        result = chardet.detect(file_bytes)
-        encoding = result['encoding']
-        confidence = result['confidence']
-        
-        # Si la confianza es baja, intentar con codificaciones comunes
-        if confidence < 0.7:
-            common_encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
-            for enc in common_encodings:
-                try:
-                    file_bytes.decode(enc)
-                    return enc
-                except:
-                    continue
-        
-        return encoding if encoding else 'utf-8'
+        return _detect_encoding_with_confidence(file_bytes)[0]
     except:
         return 'utf-8'
 
-def load_csv_with_encoding(uploaded_file):
+def _is_number(value):
+    """
+    Indica si un campo de texto representa un número
+    """
+    return bool(_NUMBER_RE.match(value))
+
+def _score_separator(lines, separator, quotechar):
     """
-    Carga un archivo CSV con detección automática de codificación
+    Mide qué tan consistente es el número de campos por fila con un separador.
+    Devuelve (consistencia, número de campos más frecuente)
     """
-    # Leer bytes del archivo
-    file_bytes = uploaded_file.read()
+    rows = list(csv.reader(lines, delimiter=separator, quotechar=quotechar))
+    field_counts = pd.Series([len(row) for row in rows if row])
+    if len(field_counts) == 0:
+        return 0.0, 0
     
-    # Detectar codificación
-    encoding = detect_encoding(file_bytes)
+    mode_count = field_counts.mode().iloc[0]
+    consistency = (field_counts == mode_count).mean()
     
-    # Intentar diferentes separadores
-    separators = [',', ';', '\t', '|']
+    # Una sola columna no aporta evidencia sobre el separador
+    if mode_count <= 1:
+        return 0.0, mode_count
+    return float(consistency), int(mode_count)
+
+def _sniff_quotechar(lines, separator):
+    """
+    Elige el carácter de comillas que aparece delimitando campos
+    """
+    counts = {}
+    for quotechar in QUOTECHAR_CANDIDATES:
+        opening = re.escape(separator) + re.escape(quotechar)
+        closing = re.escape(quotechar) + re.escape(separator)
+        pattern = re.compile(f'(^{re.escape(quotechar)}|{opening}|{closing}|{re.escape(quotechar)}$)')
+        counts[quotechar] = sum(len(pattern.findall(line)) for line in lines)
     
-    for separator in separators:
-        try:
-            # Resetear el puntero del archivo
-            uploaded_file.seek(0)
-            
-            # Convertir bytes a string con la codificación detectada
-            string_data = file_bytes.decode(encoding)
-            string_io = StringIO(string_data)
-            
-            # Intentar leer el CSV
-            df = pd.read_csv(string_io, sep=separator, encoding=None)
-            
-            # Verificar que el DataFrame tiene sentido (más de una columna o datos válidos)
-            if len(df.columns) > 1 or (len(df.columns) == 1 and len(df) > 0):
-                return df
-                
-        except Exception as e:
+    total = sum(counts.values())
+    if total == 0:
+        return '"', 1.0
+    
+    best = max(QUOTECHAR_CANDIDATES, key=lambda q: counts[q])
+    return best, counts[best] / total
+
+def _sniff_decimal(rows, separator):
+    """
+    Elige el separador decimal observando los campos numéricos
+    """
+    if separator == ',':
+        return '.', 1.0
+    
+    point_count = 0
+    comma_count = 0
+    for row in rows:
+        for field in row:
+            field = field.strip()
+            if _DECIMAL_POINT_RE.match(field):
+                point_count += 1
+            elif _DECIMAL_COMMA_RE.match(field):
+                comma_count += 1
+    
+    total = point_count + comma_count
+    if total == 0:
+        return '.', 1.0
+    if comma_count > point_count:
+        return ',', comma_count / total
+    return '.', point_count / total
+
+def _sniff_header(rows):
+    """
+    Decide si la primera fila es cabecera: en las columnas numéricas del
+    cuerpo, la cabecera contiene texto
+    """
+    if len(rows) < 2:
+        return 0, 0.5
+    
+    first_row, body = rows[0], rows[1:]
+    votes_header = 0
+    votes_data = 0
+    for position, field in enumerate(first_row):
+        column_values = [row[position].strip() for row in body if position < len(row) and row[position].strip()]
+        if not column_values:
             continue
+        numeric_share = sum(_is_number(value) for value in column_values) / len(column_values)
+        if numeric_share >= 0.8:
+            if _is_number(field):
+                votes_data += 1
+            else:
+                votes_header += 1
+    
+    total = votes_header + votes_data
+    if total == 0:
+        # Sin columnas numéricas no hay evidencia: se asume cabecera, como pandas
+        return 0, 0.5
+    if votes_data > votes_header:
+        return None, votes_data / total
+    return 0, votes_header / total
+
+def sniff_dialect(uploaded_file, sample_bytes=SNIFF_SAMPLE_BYTES):
+    """
+    Detecta codificación, separador, comillas, separador decimal y cabecera
+    leyendo solo los primeros bytes del archivo. Devuelve el dialecto
+    resuelto junto con un reporte de confianza por cada elemento
+    """
+    uploaded_file.seek(0)
+    sample = uploaded_file.read(sample_bytes)
+    uploaded_file.seek(0)
+    
+    encoding, encoding_confidence = _detect_encoding_with_confidence(sample)
+    text_sample = sample.decode(encoding, errors='replace')
+    
+    lines = text_sample.splitlines()
+    # La última línea puede estar cortada si la muestra no cubre todo el archivo
+    if len(sample) == sample_bytes and len(lines) > 1:
+        lines = lines[:-1]
+    lines = [line for line in lines if line.strip()]
+    
+    separator_scores = {}
+    for separator in SEPARATOR_CANDIDATES:
+        separator_scores[separator] = _score_separator(lines, separator, '"')
+    # Mayor consistencia primero; a igualdad, más campos por fila
+    separator = max(SEPARATOR_CANDIDATES, key=lambda sep: separator_scores[sep])
+    separator_confidence = separator_scores[separator][0]
+    if separator_confidence == 0:
+        separator = ','
+    
+    quotechar, quotechar_confidence = _sniff_quotechar(lines, separator)
+    if quotechar != '"' and separator_confidence > 0:
+        separator_confidence = _score_separator(lines, separator, quotechar)[0]
+    rows = list(csv.reader(lines, delimiter=separator, quotechar=quotechar))
+    decimal, decimal_confidence = _sniff_decimal(rows[1:], separator)
+    header, header_confidence = _sniff_header(rows)
+    
+    return {
+        'encoding': encoding,
+        'sep': separator,
+        'quotechar': quotechar,
+        'decimal': decimal,
+        'header': header,
+        'confidence': {
+            'encoding': round(encoding_confidence, 3),
+            'sep': round(separator_confidence, 3),
+            'quotechar': round(quotechar_confidence, 3),
+            'decimal': round(decimal_confidence, 3),
+            'header': round(header_confidence, 3)
+        },
+        'sample_bytes': len(sample),
+        'sample_rows': len(rows)
+    }
+
+def _dialect_read_options(dialect):
+    """
+    Traduce un dialecto detectado a argumentos de pd.read_csv
+    """
+    return {
+        'sep': dialect['sep'],
+        'quotechar': dialect['quotechar'],
+        'decimal': dialect['decimal'],
+        'header': dialect['header']
+    }
+
+def _read_csv_stream(uploaded_file, dialect, **read_kwargs):
+    """
+    Ejecuta un único pd.read_csv sobre el flujo de bytes decodificado.
+    Si read_kwargs incluye chunksize, produce los bloques uno a uno
+    """
+    uploaded_file.seek(0)
+    # errors='replace' evita fallar a mitad del archivo si un byte aislado
+    # no corresponde a la codificación detectada en la muestra
+    text_stream = TextIOWrapper(uploaded_file, encoding=dialect['encoding'], errors='replace', newline='')
+    try:
+        result = pd.read_csv(text_stream, **_dialect_read_options(dialect), **read_kwargs)
+        if 'chunksize' in read_kwargs:
+            for chunk in result:
+                yield chunk
+        else:
+            yield result
+    finally:
+        # Desacoplar para que cerrar el wrapper no cierre el archivo subido
+        text_stream.detach()
+
+def load_csv_with_encoding(uploaded_file, chunksize=None, iterator=False, dialect=None):
+    """
+    Carga un archivo CSV con detección automática de codificación y dialecto.
+    Si se indica chunksize (o iterator=True) se usa la carga por bloques,
+    que no mantiene el archivo completo en memoria
+    """
+    if chunksize is not None or iterator:
+        return load_csv_streaming(uploaded_file, chunk_rows=chunksize or DEFAULT_CHUNK_ROWS, iterator=iterator, dialect=dialect)
+    
+    # Resolver el dialecto con una muestra y hacer una sola lectura completa
+    if dialect is None:
+        dialect = sniff_dialect(uploaded_file)
+    
+    try:
+        return next(_read_csv_stream(uploaded_file, dialect))
+    except Exception:
+        pass
     
     # Si todo falla, intentar con configuración por defecto
     try:
         uploaded_file.seek(0)
-        string_data = file_bytes.decode('utf-8', errors='ignore')
+        string_data = uploaded_file.read().decode('utf-8', errors='ignore')
         string_io = StringIO(string_data)
         return pd.read_csv(string_io)
     except Exception as e:
         raise Exception(f"No se pudo cargar el archivo CSV: {str(e)}")
 
+def iter_csv_chunks(uploaded_file, chunk_rows=DEFAULT_CHUNK_ROWS, dialect=None):
+    """
+    Lee un CSV por bloques de filas decodificando directamente desde el
+    flujo de bytes. La memoria máxima es proporcional a un bloque
+    """
+    # El dialecto se detecta solo con el inicio del archivo
+    if dialect is None:
+        dialect = sniff_dialect(uploaded_file)
+    
+    yield from _read_csv_stream(uploaded_file, dialect, chunksize=chunk_rows)
+
+def number_to_text(value):
+    """
+    Convierte un número a texto como aparecería en el CSV (338.0 -> '338')
+    """
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def _harmonize_chunk_dtypes(chunks, uploaded_file, dialect, chunk_rows):
+    """
+    Unifica los tipos de columnas que cada bloque infirió de forma distinta
+    (por ejemplo numérica en un bloque y texto en otro). Esas columnas se
+    vuelven a leer como texto tal como aparecen en el archivo (sin pasar por
+    números, que perderían los ceros a la izquierda), igual que en la lectura
+    del archivo completo
+    """
+    mixed_cols = []
+    for col in chunks[0].columns:
+        numeric_flags = {pd.api.types.is_numeric_dtype(chunk[col]) for chunk in chunks}
+        if len(numeric_flags) > 1:
+            mixed_cols.append(col)
+    
+    if not mixed_cols:
+        return chunks
+    
+    text_chunks = _read_csv_stream(uploaded_file, dialect, chunksize=chunk_rows, usecols=mixed_cols, dtype=str)
+    for chunk, text_chunk in zip(chunks, text_chunks):
+        for col in mixed_cols:
+            chunk[col] = text_chunk[col]
+    
+    return chunks
+
+def load_csv_streaming(uploaded_file, chunk_rows=DEFAULT_CHUNK_ROWS, iterator=False, dialect=None):
+    """
+    Carga un CSV por bloques. Devuelve un iterador de DataFrames si
+    iterator=True (cada bloque infiere sus propios tipos; memoria acotada a
+    un bloque), o un único DataFrame con todos los bloques: mientras se unen
+    conviven los bloques y el resultado, cerca del doble del DataFrame final
+    """
+    if dialect is None:
+        dialect = sniff_dialect(uploaded_file)
+    chunks = iter_csv_chunks(uploaded_file, chunk_rows=chunk_rows, dialect=dialect)
+    if iterator:
+        return chunks
+    
+    try:
+        chunks = list(chunks)
+        if not chunks:
+            return pd.DataFrame()
+        return pd.concat(_harmonize_chunk_dtypes(chunks, uploaded_file, dialect, chunk_rows), ignore_index=True)
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame()
+    except Exception as e:
+        raise Exception(f"No se pudo cargar el archivo CSV: {str(e)}")
+
+def read_csv_header(uploaded_file, dialect=None):
+    """
+    Lee solo la cabecera del CSV y devuelve la lista de columnas
+    """
+    if dialect is None:
+        dialect = sniff_dialect(uploaded_file)
+    
+    return next(_read_csv_stream(uploaded_file, dialect, nrows=0)).columns.tolist()
+
+class LazyCSV:
+    """
+    Acceso perezoso a las columnas de un CSV: al abrirlo solo se lee la
+    cabecera y cada columna se carga la primera vez que se solicita
+    """
+    
+    def __init__(self, uploaded_file, dialect=None):
+        self.uploaded_file = uploaded_file
+        self.dialect = dialect if dialect is not None else sniff_dialect(uploaded_file)
+        self.columns = read_csv_header(uploaded_file, self.dialect)
+        self._loaded = {}
+    
+    @property
+    def loaded_columns(self):
+        """
+        Columnas ya cargadas en memoria
+        """
+        return [col for col in self.columns if col in self._loaded]
+    
+    def load(self, columns=None):
+        """
+        Devuelve un DataFrame con las columnas pedidas (todas si es None),
+        leyendo del archivo en una sola pasada solo las que faltan
+        """
+        columns = list(self.columns) if columns is None else list(columns)
+        unknown = [col for col in columns if col not in self.columns]
+        if unknown:
+            raise KeyError(f"Columnas no encontradas en el archivo: {unknown}")
+        
+        missing = [col for col in columns if col not in self._loaded]
+        if missing:
+            new_data = next(_read_csv_stream(self.uploaded_file, self.dialect, usecols=missing))
+            for col in missing:
+                self._loaded[col] = new_data[col]
+        
+        if not columns:
+            return pd.DataFrame()
+        return pd.DataFrame({col: self._loaded[col] for col in columns})
+    
+    def __getitem__(self, key):
+        if isinstance(key, (list, tuple)):
+            return self.load(key)
+        return self.load([key])[key]
+    
+    def unload(self, columns):
+        """
+        Libera de memoria columnas ya cargadas
+        """
+        for col in columns:
+            self._loaded.pop(col, None)
+    
+    def memory_usage(self):
+        """
+        Memoria ocupada por las columnas cargadas (bytes)
+        """
+        return sum(series.memory_usage(deep=True, index=False) for series in self._loaded.values())
+
+def _smallest_integer_dtype(min_value, max_value, nullable):
+    """
+    Devuelve el tipo entero con signo más pequeño que contiene el rango dado
+    """
+    for dtype in [np.int8, np.int16, np.int32, np.int64]:
+        info = np.iinfo(dtype)
+        if info.min <= min_value and max_value <= info.max:
+            name = np.dtype(dtype).name
+            return name.capitalize() if nullable else name
+    return None
+
+def _compact_series(series, category_max_unique_ratio):
+    """
+    Devuelve la versión compacta de una columna, o None si no se puede reducir
+    """
+    if pd.api.types.is_bool_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+        return None
+    
+    if pd.api.types.is_integer_dtype(series):
+        non_null = series.dropna()
+        if len(non_null) == 0:
+            return None
+        target = _smallest_integer_dtype(non_null.min(), non_null.max(), series.hasnans)
+        return series.astype(target) if target and target.lower() != series.dtype.name.lower() else None
+    
+    if pd.api.types.is_float_dtype(series):
+        non_null = series.dropna()
+        if len(non_null) == 0:
+            return None
+        values = non_null.to_numpy(dtype='float64')
+        # Códigos enteros con huecos: pandas los lee como float64 por los NaN
+        if np.isfinite(values).all() and (values == np.round(values)).all():
+            target = _smallest_integer_dtype(values.min(), values.max(), series.hasnans)
+            if target:
+                return series.astype(target)
+        # float32 solo si no se pierde precisión
+        as_float32 = series.astype('float32')
+        if series.dtype != np.float32 and np.array_equal(as_float32.to_numpy(dtype='float64'), series.to_numpy(dtype='float64'), equal_nan=True):
+            return as_float32
+        return None
+    
+    if pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+        if len(series) == 0:
+            return None
+        if series.nunique() / len(series) <= category_max_unique_ratio:
+            return series.astype('category')
+    
+    return None
+
+def compact_dtypes(data, category_max_unique_ratio=CATEGORY_MAX_UNIQUE_RATIO):
+    """
+    Reduce la memoria del dataset: enteros y decimales al tipo más pequeño
+    sin pérdida, códigos enteros con nulos a enteros anulables (Int8, Int16...)
+    y texto con pocos valores distintos a 'category'.
+    Devuelve (datos compactados, reporte por columna)
+    """
+    bytes_before = data.memory_usage(deep=True, index=False)
+    compacted_columns = {}
+    report = []
+    
+    for col in data.columns:
+        original = data[col]
+        compacted = _compact_series(original, category_max_unique_ratio)
+        if compacted is None:
+            compacted = original
+        compacted_columns[col] = compacted
+        
+        size_after = compacted.memory_usage(deep=True, index=False)
+        report.append({
+            'Columna': col,
+            'Tipo original': str(original.dtype),
+            'Tipo compacto': str(compacted.dtype),
+            'Bytes antes': int(bytes_before[col]),
+            'Bytes después': int(size_after),
+            'Reducción (%)': round((1 - size_after / bytes_before[col]) * 100, 2) if bytes_before[col] > 0 else 0.0
+        })
+    
+    compacted_data = pd.DataFrame(compacted_columns, index=data.index)
+    
+    return compacted_data, pd.DataFrame(report)
+
+def _is_sketch(data):
+    """
+    Indica si data es un resumen aproximado (DatasetSketch) en lugar de un DataFrame
+    """
+    from utils.sketches import DatasetSketch
+    return isinstance(data, DatasetSketch)
+
 def get_basic_info(data):
     """
-    Obtiene información básica del dataset
+    Obtiene información básica del dataset.
+    Si data es un DatasetSketch (modo aproximado) devuelve su estimación
     """
+    if _is_sketch(data):
+        return data.basic_info()
+    
     info = {
         'rows': len(data),
         'columns': len(data.columns),
         'null_values': data.isnull().sum().sum(),
-        'duplicates': data.duplicated().sum(),
+        'duplicates': count_duplicates(data),
         'memory_usage': f"{data.memory_usage(deep=True).sum() / 1024 / 1024:.2f} MB",
         'numeric_columns': len(data.select_dtypes(include=['number']).columns),
         'categorical_columns': len(data.select_dtypes(include=['object', 'category']).columns)
@@ -97,40 +527,131 @@ def preview_data(data, n_rows=5):
     
     return preview
 
+# Número de columnas numéricas procesadas juntas en cada bloque del perfilador
+PROFILE_BLOCK_COLUMNS = 64
+
+def _is_profiled_as_numeric(series):
+    """
+    Indica si una columna recibe el perfil numérico (los booleanos se tratan como categóricos)
+    """
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+def _profile_numeric_block(block):
+    """
+    Calcula nulos, únicos, mínimo, máximo, media, mediana y desviación de un
+    bloque de columnas numéricas con un único ordenamiento por columna
+    """
+    values = block.to_numpy(dtype='float64', na_value=np.nan)
+    n_rows = values.shape[0]
+    
+    # Al ordenar, los NaN quedan al final de cada columna
+    sorted_values = np.sort(values, axis=0)
+    valid = ~np.isnan(sorted_values)
+    counts = valid.sum(axis=0)
+    has_values = counts > 0
+    
+    if n_rows > 0:
+        changes = valid[1:] & (sorted_values[1:] != sorted_values[:-1])
+        unique_counts = valid[0].astype(int) + changes.sum(axis=0)
+    else:
+        unique_counts = np.zeros(values.shape[1], dtype=int)
+    
+    safe_counts = np.where(has_values, counts, 1)
+    columns_index = np.arange(values.shape[1])
+    
+    minimum = np.where(has_values, sorted_values[0] if n_rows > 0 else np.nan, np.nan)
+    maximum = np.where(has_values, sorted_values[safe_counts - 1, columns_index] if n_rows > 0 else np.nan, np.nan)
+    
+    sums = np.where(valid, sorted_values, 0.0).sum(axis=0)
+    mean = np.where(has_values, sums / safe_counts, np.nan)
+    deviations = np.where(valid, sorted_values - mean, 0.0)
+    std = np.where(counts > 1, np.sqrt((deviations ** 2).sum(axis=0) / np.maximum(counts - 1, 1)), np.nan)
+    
+    if n_rows > 0:
+        lower = sorted_values[(safe_counts - 1) // 2, columns_index]
+        upper = sorted_values[safe_counts // 2, columns_index]
+        median = np.where(has_values, (lower + upper) / 2, np.nan)
+    else:
+        median = np.full(values.shape[1], np.nan)
+    
+    return {
+        'null_count': n_rows - counts,
+        'unique_values': unique_counts,
+        'min': minimum,
+        'max': maximum,
+        'mean': mean,
+        'median': median,
+        'std': std
+    }
+
+def _profile_categorical_column(series):
+    """
+    Calcula nulos, únicos y valor más frecuente con un único conteo por hash
+    """
+    frequencies = series.value_counts(sort=False, dropna=True)
+    
+    if len(frequencies) > 0:
+        top_count = frequencies.max()
+        tied_values = frequencies.index[frequencies.to_numpy() == top_count]
+        try:
+            # Entre empates, el menor valor, igual que mode()
+            most_frequent = tied_values.min()
+        except TypeError:
+            most_frequent = tied_values[0]
+        most_frequent_count = int(top_count)
+    else:
+        most_frequent = None
+        most_frequent_count = 0
+    
+    return {
+        'null_count': int(len(series) - frequencies.sum()),
+        'unique_values': int(len(frequencies)),
+        'most_frequent': most_frequent,
+        'most_frequent_count': most_frequent_count
+    }
+
 def get_column_info(data):
     """
-    Obtiene información detallada de cada columna
+    Obtiene información detallada de cada columna.
+    Las columnas numéricas se procesan por bloques con reducciones de NumPy
+    y las categóricas con un único conteo de frecuencias.
+    Si data es un DatasetSketch (modo aproximado) devuelve su estimación
     """
-    column_info = []
+    if _is_sketch(data):
+        return data.column_info()
     
-    for col in data.columns:
-        col_data = data[col]
-        
+    n_rows = len(data)
+    numeric_positions = [i for i, col in enumerate(data.columns) if _is_profiled_as_numeric(data.iloc[:, i])]
+    numeric_set = set(numeric_positions)
+    
+    profiles = {}
+    for start in range(0, len(numeric_positions), PROFILE_BLOCK_COLUMNS):
+        block_positions = numeric_positions[start:start + PROFILE_BLOCK_COLUMNS]
+        block_profile = _profile_numeric_block(data.iloc[:, block_positions])
+        for offset, position in enumerate(block_positions):
+            profiles[position] = {key: values[offset] for key, values in block_profile.items()}
+    
+    for position in range(len(data.columns)):
+        if position not in numeric_set:
+            profiles[position] = _profile_categorical_column(data.iloc[:, position])
+    
+    column_info = []
+    for position, col in enumerate(data.columns):
+        profile = profiles[position]
         info = {
             'column': col,
-            'dtype': str(col_data.dtype),
-            'null_count': col_data.isnull().sum(),
-            'null_percentage': (col_data.isnull().sum() / len(data)) * 100,
-            'unique_values': col_data.nunique(),
-            'unique_percentage': (col_data.nunique() / len(data)) * 100
+            'dtype': str(data.iloc[:, position].dtype),
+            'null_count': int(profile['null_count']),
+            'null_percentage': (profile['null_count'] / n_rows) * 100 if n_rows > 0 else np.nan,
+            'unique_values': int(profile['unique_values']),
+            'unique_percentage': (profile['unique_values'] / n_rows) * 100 if n_rows > 0 else np.nan
         }
         
         # Información específica según el tipo de dato
-        if col_data.dtype in ['int64', 'float64']:
-            info.update({
-                'min': col_data.min(),
-                'max': col_data.max(),
-                'mean': col_data.mean(),
-                'median': col_data.median(),
-                'std': col_data.std()
-            })
+        if position in numeric_set:
+            info.update({key: profile[key] for key in ['min', 'max', 'mean', 'median', 'std']})
         else:
-            # Para variables categóricas
-            top_value = col_data.mode().iloc[0] if len(col_data.mode()) > 0 else None
-            info.update({
-                'most_frequent': top_value,
-                'most_frequent_count': col_data.value_counts().iloc[0] if len(col_data.value_counts()) > 0 else 0
-            })
+            info.update({key: profile[key] for key in ['most_frequent', 'most_frequent_count']})
         
         column_info.append(info)
     
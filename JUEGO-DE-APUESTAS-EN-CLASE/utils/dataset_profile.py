@@ -0,0 +1,243 @@
+import hashlib
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+from utils.row_index import get_row_index
+from utils.data_loader import PROFILE_BLOCK_COLUMNS
+
+# Percentiles que se calculan siempre junto con el perfil
+PROFILE_QUANTILES = [0.05, 0.10, 0.25, 0.50, 0.75, 0.90, 0.95]
+
+# Número de perfiles (versiones del dataset) que se mantienen en memoria
+PROFILE_CACHE_SIZE = 8
+
+# Perfiles ya calculados, por huella del contenido
+_profile_cache = OrderedDict()
+
+def dataset_fingerprint(data):
+    """
+    Huella del contenido del dataset: nombres y tipos de columnas más los
+    hashes de filas del índice compartido (que se calculan una sola vez)
+    """
+    hasher = hashlib.sha256()
+    for col, dtype in data.dtypes.items():
+        hasher.update(f"{col}\x1f{dtype}\x1e".encode('utf-8'))
+    hasher.update(get_row_index(data).hashes.to_numpy().tobytes())
+    return hasher.hexdigest()
+
+def _column_modes(sorted_values, counts):
+    """
+    Moda de cada columna ya ordenada; entre empates, el menor valor
+    """
+    modes = np.full(sorted_values.shape[1], np.nan)
+    for j, count in enumerate(counts):
+        if count == 0:
+            continue
+        values = sorted_values[:count, j]
+        starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+        lengths = np.diff(np.r_[starts, count])
+        modes[j] = values[starts[np.argmax(lengths)]]
+    return modes
+
+def _partition_quantiles(values, n_values, quantiles):
+    """
+    Percentiles de las columnas de una matriz sin NaN con una sola
+    partición (np.partition con todas las posiciones necesarias)
+    """
+    position = quantiles * (n_values - 1)
+    lower = np.floor(position).astype(int)
+    upper = np.ceil(position).astype(int)
+    partitioned = np.partition(values, np.unique(np.concatenate([lower, upper])), axis=0)
+    lower_values = partitioned[lower]
+    upper_values = partitioned[upper]
+    return lower_values + (upper_values - lower_values) * (position - lower)[:, None]
+
+def multi_quantile(values, quantiles):
+    """
+    Percentiles de cada columna de una matriz con NaN, con interpolación
+    lineal igual que pandas. Todos los percentiles de una columna salen de
+    una sola partición, sin ordenar la columna completa
+    """
+    quantiles = np.asarray(quantiles, dtype='float64')
+    n_rows, n_columns = values.shape
+    result = np.full((len(quantiles), n_columns), np.nan)
+    valid = ~np.isnan(values)
+    counts = valid.sum(axis=0)
+    
+    # Columnas sin nulos: una sola partición para todo el bloque
+    complete = counts == n_rows
+    if n_rows > 0 and complete.any():
+        result[:, complete] = _partition_quantiles(values[:, complete], n_rows, quantiles)
+    # Con nulos: la partición deja los NaN al final, así que basta con
+    # usar las posiciones calculadas sobre los valores presentes
+    for j in np.flatnonzero(~complete & (counts > 0)):
+        result[:, j] = _partition_quantiles(values[:, j:j + 1], counts[j], quantiles)[:, 0]
+    
+    return result
+
+def _profile_block(block, quantiles):
+    """
+    Conteo, momentos, extremos, moda y percentiles de un bloque de columnas
+    numéricas con un único ordenamiento y reducciones de NumPy
+    """
+    values = block.to_numpy(dtype='float64', na_value=np.nan)
+    n_columns = values.shape[1]
+    
+    # Al ordenar, los NaN quedan al final de cada columna
+    sorted_values = np.sort(values, axis=0)
+    valid = ~np.isnan(sorted_values)
+    counts = valid.sum(axis=0)
+    has_values = counts > 0
+    safe_counts = np.where(has_values, counts, 1)
+    columns_index = np.arange(n_columns)
+    
+    if values.shape[0] == 0:
+        sorted_values = np.full((1, n_columns), np.nan)
+        valid = np.zeros((1, n_columns), dtype=bool)
+    
+    sums = np.where(valid, sorted_values, 0.0).sum(axis=0)
+    mean = np.where(has_values, sums / safe_counts, np.nan)
+    deviations = np.where(valid, sorted_values - mean, 0.0)
+    squared = deviations ** 2
+    m2 = squared.sum(axis=0)
+    m3 = (squared * deviations).sum(axis=0)
+    m4 = (squared ** 2).sum(axis=0)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        n = counts.astype('float64')
+        var = np.where(counts > 1, m2 / np.maximum(n - 1, 1), np.nan)
+        skew = np.sqrt(n * (n - 1)) / (n - 2) * (m3 / n) / (m2 / n) ** 1.5
+        skew = np.where(counts < 3, np.nan, np.where(m2 == 0, 0.0, skew))
+        kurtosis = (n * (n + 1) * (n - 1) * m4 / ((n - 2) * (n - 3) * m2 ** 2)
+                    - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3)))
+        kurtosis = np.where(counts < 4, np.nan, np.where(m2 == 0, 0.0, kurtosis))
+    
+    minimum = np.where(has_values, sorted_values[0], np.nan)
+    maximum = np.where(has_values, sorted_values[safe_counts - 1, columns_index], np.nan)
+    
+    # Percentiles con interpolación lineal, igual que pandas
+    quantile_rows = []
+    for q in quantiles:
+        position = q * (safe_counts - 1)
+        lower = np.floor(position).astype(int)
+        upper = np.ceil(position).astype(int)
+        lower_values = sorted_values[lower, columns_index]
+        upper_values = sorted_values[upper, columns_index]
+        interpolated = lower_values + (upper_values - lower_values) * (position - lower)
+        quantile_rows.append(np.where(has_values, interpolated, np.nan))
+    
+    return {
+        'count': counts,
+        'mean': mean,
+        'std': np.sqrt(var),
+        'var': var,
+        'min': minimum,
+        'max': maximum,
+        'skew': skew,
+        'kurtosis': kurtosis,
+        'mode': _column_modes(sorted_values, counts) if values.shape[0] > 0 else np.full(n_columns, np.nan)
+    }, np.array(quantile_rows).reshape(len(quantiles), n_columns)
+
+class DatasetProfile:
+    """
+    Perfil numérico de una versión del dataset: momentos, extremos, moda y
+    percentiles calculados una sola vez para todos los consumidores
+    """
+    
+    def __init__(self, data, fingerprint=None):
+        self.fingerprint = dataset_fingerprint(data) if fingerprint is None else fingerprint
+        numeric_data = data.select_dtypes(include=[np.number])
+        self.numeric_columns = list(numeric_data.columns)
+        
+        stats_blocks = []
+        quantile_blocks = []
+        for start in range(0, len(self.numeric_columns), PROFILE_BLOCK_COLUMNS):
+            block = numeric_data.iloc[:, start:start + PROFILE_BLOCK_COLUMNS]
+            block_stats, block_quantiles = _profile_block(block, PROFILE_QUANTILES)
+            stats_blocks.append(pd.DataFrame(block_stats, index=block.columns))
+            quantile_blocks.append(pd.DataFrame(block_quantiles, index=PROFILE_QUANTILES, columns=block.columns))
+        
+        if stats_blocks:
+            self.stats = pd.concat(stats_blocks)
+            self.quantiles = pd.concat(quantile_blocks, axis=1)
+        else:
+            self.stats = pd.DataFrame(columns=['count', 'mean', 'std', 'var', 'min', 'max', 'skew', 'kurtosis', 'mode'], dtype='float64')
+            self.quantiles = pd.DataFrame(index=PROFILE_QUANTILES, dtype='float64')
+    
+    def quantile(self, q):
+        """
+        Percentil q de cada columna numérica (q debe estar en PROFILE_QUANTILES
+        o haberse pedido antes con get_quantiles)
+        """
+        return self.quantiles.loc[q]
+    
+    def range(self):
+        return self.stats['max'] - self.stats['min']
+    
+    def coefficient_of_variation(self):
+        """
+        Coeficiente de variación en porcentaje
+        """
+        return self.stats['std'] / self.stats['mean'] * 100
+    
+    def describe(self):
+        """
+        Tabla con el mismo formato que DataFrame.describe()
+        """
+        return pd.DataFrame({
+            'count': self.stats['count'].astype('float64'),
+            'mean': self.stats['mean'],
+            'std': self.stats['std'],
+            'min': self.stats['min'],
+            '25%': self.quantile(0.25),
+            '50%': self.quantile(0.50),
+            '75%': self.quantile(0.75),
+            'max': self.stats['max']
+        }).T
+
+def get_dataset_profile(data):
+    """
+    Devuelve el perfil de la versión actual del dataset. Como la clave es
+    la huella del contenido, una versión nueva (por ejemplo la que produce
+    clean_data) obtiene su propio perfil y nunca reutiliza uno desactualizado
+    """
+    fingerprint = dataset_fingerprint(data)
+    profile = _profile_cache.get(fingerprint)
+    if profile is not None:
+        _profile_cache.move_to_end(fingerprint)
+        return profile
+    
+    profile = DatasetProfile(data, fingerprint=fingerprint)
+    _profile_cache[fingerprint] = profile
+    while len(_profile_cache) > PROFILE_CACHE_SIZE:
+        _profile_cache.popitem(last=False)
+    return profile
+
+def get_quantiles(data, quantiles):
+    """
+    Percentiles de todas las columnas numéricas de la versión actual del
+    dataset (filas: percentiles). Los que no están en el perfil se calculan
+    juntos con multi_quantile y quedan guardados en el perfil de esa versión
+    """
+    quantiles = list(quantiles)
+    profile = get_dataset_profile(data)
+    if not profile.numeric_columns:
+        return pd.DataFrame(index=quantiles, dtype='float64')
+    
+    missing = [q for q in dict.fromkeys(quantiles) if q not in profile.quantiles.index]
+    if missing:
+        blocks = []
+        for start in range(0, len(profile.numeric_columns), PROFILE_BLOCK_COLUMNS):
+            block_columns = profile.numeric_columns[start:start + PROFILE_BLOCK_COLUMNS]
+            values = data[block_columns].to_numpy(dtype='float64', na_value=np.nan)
+            blocks.append(pd.DataFrame(multi_quantile(values, missing), index=missing, columns=block_columns))
+        profile.quantiles = pd.concat([profile.quantiles, pd.concat(blocks, axis=1)]).sort_index()
+    
+    return profile.quantiles.loc[quantiles]
+
+def clear_profile_cache():
+    """
+    Elimina todos los perfiles calculados
+    """
+    _profile_cache.clear()
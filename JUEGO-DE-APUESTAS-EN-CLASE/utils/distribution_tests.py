@@ -0,0 +1,141 @@
+import zlib
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from utils.dataset_profile import dataset_fingerprint
+
+# Tamaño máximo de muestra por columna (Shapiro-Wilk pierde precisión por encima de 5000)
+TEST_SAMPLE_SIZE = 5000
+
+# Semilla base de las submuestras; cada columna deriva la suya de su nombre
+TEST_SEED = 42
+
+# Nivel de significancia
+TEST_ALPHA = 0.05
+
+# Con menos valores en total no compensa iniciar procesos
+PARALLEL_MIN_VALUES = 200000
+
+# Número de resultados (columna y versión del dataset) que se mantienen en memoria
+TEST_CACHE_SIZE = 2048
+
+# Resultados ya calculados, por huella del contenido, columna y parámetros de muestreo
+_test_cache = OrderedDict()
+
+def _column_sample(name, values, sample_size, seed):
+    """
+    Submuestra reproducible: la semilla depende del nombre de la columna, no
+    de su posición, para que el resultado no cambie al agregar o quitar columnas
+    """
+    if len(values) <= sample_size:
+        return values
+    rng = np.random.default_rng([seed, zlib.crc32(str(name).encode('utf-8'))])
+    return np.sort(rng.choice(values, size=sample_size, replace=False))
+
+def _anderson(values):
+    """
+    Anderson-Darling para normalidad; devuelve estadístico y p-valor
+    (NaN en versiones de SciPy que solo dan valores críticos)
+    """
+    try:
+        result = stats.anderson(values, dist='norm', method='interpolate')
+        return result.statistic, result.pvalue
+    except TypeError:
+        result = stats.anderson(values, dist='norm')
+        return result.statistic, np.nan
+
+def _test_column(name, values, sample_size, seed):
+    """
+    Ejecuta las pruebas de distribución de una columna (en un proceso del pool)
+    """
+    values = values[~np.isnan(values)]
+    sample = _column_sample(name, values, sample_size, seed)
+    result = {
+        'n': len(values),
+        'n_tested': len(sample),
+        'sampled': len(sample) < len(values)
+    }
+    
+    tests = {
+        'shapiro': (3, lambda x: stats.shapiro(x)),
+        'dagostino': (8, lambda x: stats.normaltest(x)),
+        'anderson': (3, _anderson),
+        # Parámetros estimados de la muestra: p-valor conservador (Lilliefors)
+        'ks': (3, lambda x: stats.kstest(x, 'norm', args=(x.mean(), x.std(ddof=1))))
+    }
+    constant = len(sample) > 0 and sample.min() == sample.max()
+    for test_name, (min_size, test) in tests.items():
+        statistic, p_value = np.nan, np.nan
+        if len(sample) >= min_size and not constant:
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore')
+                    statistic, p_value = test(sample)[:2]
+            except Exception:
+                pass
+        result[f'{test_name}_statistic'] = float(statistic)
+        result[f'{test_name}_p_value'] = float(p_value)
+    
+    return name, result
+
+def run_distribution_tests(data, columns=None, sample_size=TEST_SAMPLE_SIZE, seed=TEST_SEED, max_workers=None):
+    """
+    Pruebas de normalidad (Shapiro-Wilk, D'Agostino K², Anderson-Darling y
+    Kolmogorov-Smirnov) de todas las columnas numéricas. Las columnas con más
+    de sample_size valores se prueban sobre una submuestra reproducible. Los
+    resultados se guardan por versión del dataset y columna
+    """
+    if columns is None:
+        columns = data.select_dtypes(include=[np.number]).columns.tolist()
+    fingerprint = dataset_fingerprint(data)
+    
+    results = {}
+    pending = []
+    for col in columns:
+        key = (fingerprint, col, sample_size, seed)
+        if key in _test_cache:
+            _test_cache.move_to_end(key)
+            results[col] = _test_cache[key]
+        else:
+            pending.append(col)
+    
+    if pending:
+        arrays = [(col, data[col].to_numpy(dtype='float64', na_value=np.nan)) for col in pending]
+        total_values = sum(len(values) for _, values in arrays)
+        if len(arrays) > 1 and total_values >= PARALLEL_MIN_VALUES:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(_test_column, col, values, sample_size, seed) for col, values in arrays]
+                computed = [future.result() for future in futures]
+        else:
+            computed = [_test_column(col, values, sample_size, seed) for col, values in arrays]
+        
+        for col, result in computed:
+            results[col] = result
+            _test_cache[(fingerprint, col, sample_size, seed)] = result
+        while len(_test_cache) > TEST_CACHE_SIZE:
+            _test_cache.popitem(last=False)
+    
+    return {col: results[col] for col in columns}
+
+def distribution_tests_table(results, alpha=TEST_ALPHA):
+    """
+    Tabla resumen de las pruebas por columna
+    """
+    table = pd.DataFrame.from_dict(results, orient='index')
+    if len(table) == 0:
+        return table
+    
+    table = table.rename(columns={
+        'n': 'N', 'n_tested': 'N probado', 'sampled': 'Submuestra',
+        'shapiro_statistic': 'Shapiro-Wilk W', 'shapiro_p_value': 'Shapiro-Wilk p',
+        'dagostino_statistic': "D'Agostino K²", 'dagostino_p_value': "D'Agostino p",
+        'anderson_statistic': 'Anderson-Darling A²', 'anderson_p_value': 'Anderson-Darling p',
+        'ks_statistic': 'KS D', 'ks_p_value': 'KS p'
+    })
+    p_values = table[['Shapiro-Wilk p', "D'Agostino p", 'Anderson-Darling p', 'KS p']]
+    table['Normal (todas las pruebas)'] = (p_values.isna() | (p_values > alpha)).all(axis=1) & p_values.notna().any(axis=1)
+    return table
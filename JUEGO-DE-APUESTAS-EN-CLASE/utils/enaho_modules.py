@@ -0,0 +1,167 @@
+import os
+import io
+import time
+import tracemalloc
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.data_loader import sniff_dialect, load_csv_with_encoding, compact_dtypes
+
+# Llaves que identifican al hogar en todos los módulos de la ENAHO
+ENAHO_HOUSEHOLD_KEYS = ['CONGLOME', 'VIVIENDA', 'HOGAR']
+
+# CSV mínimo (latin-1, con acentos) con el que cada proceso del pool
+# recorre una vez el camino de carga antes de medir
+_WARM_UP_CSV = "CONGLOME;NOMBRE;MONTO\n1;Año señal;1,5\n2;Región;2,5\n".encode('latin-1')
+
+def _warm_up_worker():
+    """
+    Inicializador del pool: la primera carga dispara importaciones diferidas
+    (modelos de chardet, parsers de pandas) que tracemalloc atribuiría al
+    primer módulo de cada proceso
+    """
+    file = io.BytesIO(_WARM_UP_CSV)
+    compact_dtypes(load_csv_with_encoding(file, dialect=sniff_dialect(file)))
+
+def _load_module(name, source, compact):
+    """
+    Carga un módulo (ruta o bytes) midiendo tiempo y memoria.
+    Se ejecuta dentro de un proceso del pool
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        if isinstance(source, (bytes, bytearray)):
+            file = io.BytesIO(source)
+        else:
+            file = open(source, 'rb')
+        with file:
+            dialect = sniff_dialect(file)
+            data = load_csv_with_encoding(file, dialect=dialect)
+        if compact:
+            data, _ = compact_dtypes(data)
+        elapsed = time.perf_counter() - start
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    
+    stats = {
+        'Archivo': name,
+        'Filas': len(data),
+        'Columnas': len(data.columns),
+        'Codificación': dialect['encoding'],
+        'Separador': dialect['sep'],
+        'Tiempo (s)': round(elapsed, 3),
+        'Memoria pico (MB)': round(peak_bytes / 1024 / 1024, 2),
+        'Memoria final (MB)': round(data.memory_usage(deep=True).sum() / 1024 / 1024, 2)
+    }
+    return name, data, stats
+
+def load_modules_parallel(sources, compact=True, max_workers=None):
+    """
+    Carga varios módulos en paralelo en un pool de procesos.
+    sources es una lista de (nombre, ruta o bytes). Devuelve
+    (diccionario nombre -> DataFrame, reporte por archivo)
+    """
+    names = [name for name, _ in sources]
+    if len(set(names)) != len(names):
+        raise ValueError("Los nombres de los módulos deben ser únicos")
+    
+    frames = {}
+    report = []
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_warm_up_worker) as executor:
+        results = executor.map(
+            _load_module,
+            names,
+            [source for _, source in sources],
+            [compact] * len(sources)
+        )
+        for name, data, stats in results:
+            frames[name] = data
+            report.append(stats)
+    
+    return frames, pd.DataFrame(report)
+
+def load_module_directory(directory, compact=True, max_workers=None):
+    """
+    Carga en paralelo todos los CSV de un directorio
+    """
+    paths = sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.lower().endswith('.csv')
+    )
+    if not paths:
+        raise ValueError(f"No se encontraron archivos CSV en {directory}")
+    
+    sources = [(os.path.splitext(os.path.basename(path))[0], path) for path in paths]
+    return load_modules_parallel(sources, compact=compact, max_workers=max_workers)
+
+def _normalize_keys(frames, keys):
+    """
+    Unifica el tipo de las llaves entre módulos: numérico si todos los
+    valores lo permiten, texto en caso contrario
+    """
+    normalized = {}
+    as_numeric = True
+    converted = {}
+    for name, data in frames.items():
+        converted[name] = {}
+        for key in keys:
+            values = pd.to_numeric(data[key], errors='coerce')
+            if (values.isna() & data[key].notna()).any():
+                as_numeric = False
+            converted[name][key] = values
+    
+    for name, data in frames.items():
+        data = data.copy()
+        for key in keys:
+            if as_numeric:
+                data[key] = converted[name][key]
+            else:
+                data[key] = data[key].astype(str).str.strip()
+        normalized[name] = data
+    
+    return normalized
+
+def join_modules(frames, keys=None, how='inner'):
+    """
+    Une los módulos cargados por las llaves del hogar con un hash join
+    (pd.merge). Las columnas repetidas en varios módulos conservan la del
+    primer módulo y las demás reciben el nombre del módulo como sufijo
+    """
+    if not frames:
+        raise ValueError("No hay módulos para unir")
+    
+    keys = ENAHO_HOUSEHOLD_KEYS if keys is None else keys
+    keys = [key for key in keys if all(key in data.columns for data in frames.values())]
+    if not keys:
+        raise ValueError("Los módulos no comparten las llaves del hogar (CONGLOME, VIVIENDA, HOGAR)")
+    
+    frames = _normalize_keys(frames, keys)
+    names = list(frames.keys())
+    joined = frames[names[0]]
+    for name in names[1:]:
+        joined = joined.merge(frames[name], on=keys, how=how, suffixes=('', f'_{name}'))
+    
+    return joined
+
+def load_and_join_modules(sources, keys=None, how='inner', compact=True, max_workers=None):
+    """
+    Carga varios módulos en paralelo y los une por las llaves del hogar.
+    Devuelve (dataset unido, reporte por archivo)
+    """
+    frames, report = load_modules_parallel(sources, compact=compact, max_workers=max_workers)
+    
+    start = time.perf_counter()
+    joined = join_modules(frames, keys=keys, how=how)
+    join_row = {
+        'Archivo': 'Unión por llaves',
+        'Filas': len(joined),
+        'Columnas': len(joined.columns),
+        'Tiempo (s)': round(time.perf_counter() - start, 3),
+        'Memoria final (MB)': round(joined.memory_usage(deep=True).sum() / 1024 / 1024, 2)
+    }
+    report = pd.concat([report, pd.DataFrame([join_row])], ignore_index=True)
+    
+    return joined, report
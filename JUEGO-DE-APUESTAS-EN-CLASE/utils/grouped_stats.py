@@ -0,0 +1,219 @@
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+from utils.data_loader import PROFILE_BLOCK_COLUMNS
+from utils.dataset_profile import dataset_fingerprint
+
+# Llaves de desagregación habituales en ENAHO (DEPARTAMENTO se deriva de UBIGEO)
+ENAHO_GROUP_KEYS = ['DOMINIO', 'ESTRATO', 'MES', 'DEPARTAMENTO']
+
+# Número de resultados (versión del dataset y llaves) que se mantienen en memoria
+GROUPED_CACHE_SIZE = 8
+
+# Resultados ya calculados, por huella del contenido, llaves y columnas
+_grouped_cache = OrderedDict()
+
+def _group_keys(data, by):
+    """
+    Series de agrupación; DEPARTAMENTO se obtiene de los dos primeros
+    dígitos del UBIGEO si no existe como columna
+    """
+    keys = []
+    for key in by:
+        if key in data.columns:
+            keys.append(data[key])
+        elif key == 'DEPARTAMENTO' and 'UBIGEO' in data.columns:
+            keys.append((pd.to_numeric(data['UBIGEO'], errors='coerce') // 10000).rename('DEPARTAMENTO'))
+        else:
+            raise KeyError(f"La columna de agrupación '{key}' no existe")
+    return keys
+
+def _grouped_numeric_block(values, codes, starts, sizes, quantiles):
+    """
+    Perfil numérico por grupo de un bloque de columnas. Las filas vienen
+    ordenadas por grupo; dentro de cada grupo se ordena cada columna (los NaN
+    quedan al final del grupo) y todo se obtiene con reduceat e índices
+    """
+    n_groups = len(starts)
+    n_columns = values.shape[1]
+    
+    # Orden por valor (NaN al final) y luego orden estable por grupo; con
+    # códigos enteros pequeños el segundo ordenamiento es por conteo (radix)
+    # (por columnas en memoria contigua)
+    values = np.asfortranarray(values)
+    sorted_values = np.empty_like(values, order='F')
+    for j in range(n_columns):
+        column = values[:, j]
+        column_order = np.argsort(column)
+        column_order = column_order[np.argsort(codes[column_order], kind='stable')]
+        sorted_values[:, j] = column[column_order]
+    
+    valid = ~np.isnan(sorted_values)
+    counts = np.add.reduceat(valid, starts, axis=0)
+    has_values = counts > 0
+    safe_counts = np.where(has_values, counts, 1)
+    columns_index = np.arange(n_columns)
+    group_starts = starts[:, None]
+    minimum = np.where(has_values, sorted_values[group_starts, columns_index], np.nan)
+    maximum = np.where(has_values, sorted_values[group_starts + safe_counts - 1, columns_index], np.nan)
+    # Grupos constantes: asimetría y curtosis 0 sin depender del redondeo de m2
+    constant = minimum == maximum
+    
+    sums = np.add.reduceat(np.where(valid, sorted_values, 0.0), starts, axis=0)
+    mean = np.where(has_values, sums / safe_counts, np.nan)
+    deviations = np.where(valid, sorted_values - np.repeat(mean, sizes, axis=0), 0.0)
+    squared = deviations ** 2
+    m2 = np.add.reduceat(squared, starts, axis=0)
+    m3 = np.add.reduceat(squared * deviations, starts, axis=0)
+    m4 = np.add.reduceat(squared ** 2, starts, axis=0)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        n = counts.astype('float64')
+        var = np.where(counts > 1, m2 / np.maximum(n - 1, 1), np.nan)
+        skew = np.sqrt(n * (n - 1)) / (n - 2) * (m3 / n) / (m2 / n) ** 1.5
+        skew = np.where(counts < 3, np.nan, np.where(constant, 0.0, skew))
+        kurtosis = (n * (n + 1) * (n - 1) * m4 / ((n - 2) * (n - 3) * m2 ** 2)
+                    - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3)))
+        kurtosis = np.where(counts < 4, np.nan, np.where(constant, 0.0, kurtosis))
+    
+    # Percentiles con interpolación lineal, igual que pandas
+    quantile_values = {}
+    for q in quantiles:
+        position = q * (safe_counts - 1)
+        lower = np.floor(position).astype(int)
+        upper = np.ceil(position).astype(int)
+        lower_values = sorted_values[group_starts + lower, columns_index]
+        upper_values = sorted_values[group_starts + upper, columns_index]
+        interpolated = lower_values + (upper_values - lower_values) * (position - lower)
+        quantile_values[q] = np.where(has_values, interpolated, np.nan)
+    
+    return {
+        'count': counts.reshape(n_groups, n_columns),
+        'mean': mean,
+        'std': np.sqrt(var),
+        'var': var,
+        'min': minimum,
+        'max': maximum,
+        'skew': skew,
+        'kurtosis': kurtosis
+    }, quantile_values
+
+def _grouped_categorical(series, codes, n_groups):
+    """
+    Valores únicos, valor más frecuente y su frecuencia por grupo con un
+    conteo por pares (grupo, categoría). Entre empates gana el menor valor
+    """
+    categories_codes, categories = pd.factorize(series, sort=True)
+    present = categories_codes >= 0
+    pair_codes = codes[present].astype('int64') * max(len(categories), 1) + categories_codes[present]
+    pairs, pair_counts = np.unique(pair_codes, return_counts=True)
+    pair_groups = pairs // max(len(categories), 1)
+    pair_categories = pairs % max(len(categories), 1)
+    
+    unique_values = np.bincount(pair_groups, minlength=n_groups)
+    most_frequent = np.full(n_groups, None, dtype=object)
+    most_frequent_count = np.zeros(n_groups, dtype='int64')
+    if len(pairs) > 0:
+        order = np.lexsort((pair_categories, -pair_counts, pair_groups))
+        first = order[np.r_[True, pair_groups[order][1:] != pair_groups[order][:-1]]]
+        most_frequent[pair_groups[first]] = np.asarray(categories, dtype=object)[pair_categories[first]]
+        most_frequent_count[pair_groups[first]] = pair_counts[first]
+    
+    return unique_values, most_frequent, most_frequent_count
+
+def compute_grouped_stats(data, by, columns=None, quantiles=(0.25, 0.50, 0.75)):
+    """
+    Estadísticas descriptivas por grupo (una o varias llaves). Devuelve un
+    diccionario con el tamaño de cada grupo y tablas largas con una fila por
+    grupo y variable, numéricas y categóricas
+    """
+    keys = _group_keys(data, by)
+    key_names = [key.name for key in keys]
+    grouped = data.groupby(keys, sort=True, dropna=False, observed=True)
+    codes = grouped.ngroup().to_numpy()
+    group_sizes = grouped.size()
+    n_groups = len(group_sizes)
+    
+    if columns is None:
+        columns = [col for col in data.columns if col not in key_names]
+    numeric_columns = [col for col in data[columns].select_dtypes(include=[np.number]).columns]
+    categorical_columns = [col for col in data[columns].select_dtypes(include=['object', 'category', 'string']).columns]
+    
+    # Filas ordenadas por grupo (orden estable) y límites de cada grupo
+    codes = codes.astype(np.min_scalar_type(max(n_groups, 1)))
+    order = np.argsort(codes, kind='stable')
+    sorted_codes = codes[order]
+    sizes = group_sizes.to_numpy()
+    starts = np.r_[0, np.cumsum(sizes)[:-1]].astype(int)
+    
+    results = {'group_sizes': group_sizes.rename('Filas'), 'keys': key_names}
+    
+    if numeric_columns and n_groups > 0:
+        stats_blocks = []
+        quantile_blocks = []
+        for start in range(0, len(numeric_columns), PROFILE_BLOCK_COLUMNS):
+            block_columns = numeric_columns[start:start + PROFILE_BLOCK_COLUMNS]
+            values = data[block_columns].to_numpy(dtype='float64', na_value=np.nan)[order]
+            block_stats, block_quantiles = _grouped_numeric_block(values, sorted_codes, starts, sizes, quantiles)
+            stats_blocks.append(block_stats)
+            quantile_blocks.append(block_quantiles)
+        
+        # Tabla larga: una fila por (grupo, variable)
+        row_index = pd.MultiIndex.from_arrays(
+            [np.repeat(level_values, len(numeric_columns)) for level_values in
+             (group_sizes.index.get_level_values(i) for i in range(group_sizes.index.nlevels))]
+            + [np.tile(np.array(numeric_columns, dtype=object), n_groups)],
+            names=key_names + ['Variable']
+        )
+        table = {}
+        for stat in ['count', 'mean', 'std', 'min']:
+            table[stat] = np.hstack([block[stat] for block in stats_blocks]).ravel()
+        for q in quantiles:
+            table[f"{q * 100:g}%"] = np.hstack([block[q] for block in quantile_blocks]).ravel()
+        for stat in ['max', 'var', 'skew', 'kurtosis']:
+            table[stat] = np.hstack([block[stat] for block in stats_blocks]).ravel()
+        numeric_stats = pd.DataFrame(table, index=row_index)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            numeric_stats['cv'] = numeric_stats['std'] / numeric_stats['mean'] * 100
+        results['numeric_stats'] = numeric_stats
+    
+    if categorical_columns and n_groups > 0:
+        frames = []
+        for col in categorical_columns:
+            unique_values, most_frequent, most_frequent_count = _grouped_categorical(data[col], codes, n_groups)
+            frame = pd.DataFrame({
+                'unique_values': unique_values,
+                'most_frequent': most_frequent,
+                'most_frequent_count': most_frequent_count
+            }, index=group_sizes.index)
+            frame['Variable'] = col
+            frames.append(frame.set_index('Variable', append=True))
+        results['categorical_stats'] = pd.concat(frames).sort_index(level=list(range(len(key_names))), sort_remaining=False)
+    
+    return results
+
+def get_grouped_stats(data, by, columns=None, quantiles=(0.25, 0.50, 0.75)):
+    """
+    Estadísticas por grupo de la versión actual del dataset, calculadas una
+    sola vez por huella del contenido, llaves, columnas y percentiles
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    key = (dataset_fingerprint(data), tuple(by), None if columns is None else tuple(columns), tuple(quantiles))
+    results = _grouped_cache.get(key)
+    if results is not None:
+        _grouped_cache.move_to_end(key)
+        return results
+    
+    results = compute_grouped_stats(data, by, columns=columns, quantiles=quantiles)
+    _grouped_cache[key] = results
+    while len(_grouped_cache) > GROUPED_CACHE_SIZE:
+        _grouped_cache.popitem(last=False)
+    return results
+
+def available_group_keys(data):
+    """
+    Llaves ENAHO disponibles en el dataset (incluye DEPARTAMENTO si hay UBIGEO)
+    """
+    return [key for key in ENAHO_GROUP_KEYS
+            if key in data.columns or (key == 'DEPARTAMENTO' and 'UBIGEO' in data.columns)]
@@ -0,0 +1,234 @@
+import os
+import re
+import pickle
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from utils.data_loader import number_to_text
+from utils.data_cache import CACHE_DIR
+from utils.sketches import DatasetSketch
+
+# Directorio donde se guardan los estados entre sesiones
+STATS_STATE_DIR = os.path.join(CACHE_DIR, 'estadisticas')
+
+# Versión del formato: cambiarla invalida los estados guardados
+STATS_STATE_VERSION = 2
+
+# Percentiles reportados, igual que get_descriptive_stats
+STATS_PERCENTILES = [0.05, 0.10, 0.25, 0.50, 0.75, 0.90, 0.95]
+
+# Máximo de valores distintos con frecuencias exactas por columna; al
+# superarlo la columna usa el sketch de valores frecuentes (Misra-Gries)
+CATEGORY_COUNT_MAX_LEVELS = 1000
+
+def _is_numeric(series):
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+def _merge_counts(current, counts):
+    """
+    Suma de frecuencias exactas; None (demasiados valores distintos) absorbe al resto
+    """
+    if current is None or counts is None:
+        return None
+    counts = current.add(counts, fill_value=0).astype('int64')
+    return counts if len(counts) <= CATEGORY_COUNT_MAX_LEVELS else None
+
+class IncrementalDescriptiveStats:
+    """
+    Estado fusionable de las estadísticas descriptivas. Cada lote agregado
+    actualiza momentos (Chan/Welford), conteos exactos, sketches de
+    cuantiles y frecuencias de categorías en tiempo proporcional al lote
+    """
+    
+    def __init__(self):
+        self.sketch = DatasetSketch()
+        self.category_counts = {}
+        self.batches = []
+    
+    @property
+    def rows(self):
+        return self.sketch.rows
+    
+    def _update_category_counts(self, batch):
+        """
+        Frecuencias exactas de las columnas con pocos valores distintos, también
+        las numéricas: una columna de códigos puede leerse como número en un
+        lote y como texto en otro, y cuáles se muestran como categóricas se
+        decide al generar el reporte. Una columna que supera
+        CATEGORY_COUNT_MAX_LEVELS queda en None y deja de contarse
+        """
+        for col in batch.columns:
+            if col in self.category_counts and self.category_counts[col] is None:
+                continue
+            series = batch[col]
+            counts = series.value_counts(sort=False, dropna=True)
+            if len(counts) > CATEGORY_COUNT_MAX_LEVELS:
+                self.category_counts[col] = None
+                continue
+            if _is_numeric(series):
+                # Claves como texto para que coincidan con lotes donde la columna se leyó como texto
+                counts.index = counts.index.map(number_to_text)
+                counts = counts.groupby(level=0).sum()
+            if col in self.category_counts:
+                counts = _merge_counts(self.category_counts[col], counts)
+            self.category_counts[col] = counts
+    
+    def append(self, batch, label=None):
+        """
+        Agrega un lote de filas. Si el lote tiene columna MES se registran sus meses
+        """
+        self.sketch.update(batch)
+        self._update_category_counts(batch)
+        
+        months = sorted(batch['MES'].dropna().astype(str).unique().tolist()) if 'MES' in batch.columns else []
+        self.batches.append({
+            'Lote': label if label is not None else f"Lote {len(self.batches) + 1}",
+            'Filas': len(batch),
+            'Meses': ', '.join(months),
+            'Agregado': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        })
+        return self
+    
+    def merge(self, other):
+        """
+        Fusiona el estado de otros lotes (por ejemplo calculado en otra sesión)
+        """
+        self.sketch.merge(other.sketch)
+        for col, counts in other.category_counts.items():
+            if col in self.category_counts:
+                counts = _merge_counts(self.category_counts[col], counts)
+            self.category_counts[col] = counts
+        self.batches.extend(other.batches)
+        return self
+    
+    def descriptive_stats(self):
+        """
+        Estadísticas con la misma estructura que get_descriptive_stats.
+        Los percentiles, la mediana y la moda numérica son aproximados
+        (error de rango del sketch KLL en 'percentile_rank_error'), igual que
+        las frecuencias de las categóricas con demasiados valores distintos
+        ('approximate': valores frecuentes y distintos estimados por los sketches)
+        """
+        results = {}
+        
+        numeric_sketches = {col: sketch for col, sketch in self.sketch.columns.items() if sketch.is_numeric}
+        if numeric_sketches:
+            rows = {}
+            percentiles = {}
+            for col, sketch in numeric_sketches.items():
+                moments = sketch.moments
+                quantiles = sketch.quantiles.quantile(STATS_PERCENTILES)
+                top = sketch.heavy_hitters.top(1)
+                mean = moments.mean if moments.n > 0 else np.nan
+                std = moments.std()
+                percentiles[col] = quantiles
+                rows[col] = {
+                    'count': float(moments.n),
+                    'mean': mean,
+                    'std': std,
+                    'min': moments.min,
+                    '25%': quantiles[2],
+                    '50%': quantiles[3],
+                    '75%': quantiles[4],
+                    'max': moments.max,
+                    'Media': mean,
+                    'Mediana': quantiles[3],
+                    'Moda': float(top[0][0]) if top else np.nan,
+                    'Desviación Estándar': std,
+                    'Varianza': moments.var(),
+                    'Rango': moments.max - moments.min,
+                    'Coef. Variación': std / mean * 100 if mean else np.nan,
+                    'Asimetría': moments.skew(),
+                    'Curtosis': moments.kurtosis()
+                }
+            
+            numeric_stats = pd.DataFrame(rows)
+            results['numeric_stats'] = numeric_stats
+            results['percentiles'] = pd.DataFrame(percentiles, index=STATS_PERCENTILES)
+            results['additional_stats'] = numeric_stats.loc['Media':].T
+            results['percentile_rank_error'] = next(iter(numeric_sketches.values())).quantiles.rank_error
+        
+        categorical_columns = [col for col in self.sketch.columns if col not in numeric_sketches and col in self.category_counts]
+        if categorical_columns:
+            cat_stats = {}
+            for col in categorical_columns:
+                sketch = self.sketch.columns[col]
+                value_counts = self.category_counts[col]
+                approximate = value_counts is None
+                if approximate:
+                    value_counts = pd.Series(sketch.heavy_hitters.counts, dtype='int64')
+                value_counts = value_counts.sort_values(ascending=False, kind='stable')
+                # Con el sketch los porcentajes se calculan sobre todos los valores no nulos
+                total = sketch.rows - sketch.nulls if approximate else value_counts.sum()
+                if len(value_counts) > 0:
+                    tied = value_counts.index[value_counts.to_numpy() == value_counts.iloc[0]]
+                    try:
+                        # Entre empates, el menor valor, igual que mode()
+                        most_frequent = tied.min()
+                    except TypeError:
+                        most_frequent = tied[0]
+                else:
+                    most_frequent = None
+                cat_stats[col] = {
+                    'unique_values': sketch.distinct_count() if approximate else len(value_counts),
+                    'approximate': approximate,
+                    'most_frequent': most_frequent,
+                    'most_frequent_count': int(value_counts.iloc[0]) if len(value_counts) > 0 else 0,
+                    'value_counts': value_counts,
+                    'percentages': value_counts / total * 100 if total > 0 else value_counts.astype(float)
+                }
+            results['categorical_stats'] = cat_stats
+        
+        return results
+
+def _state_path(name):
+    """
+    Ruta del archivo de un estado guardado (el nombre se limpia para usarlo como archivo)
+    """
+    safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', name).strip('._') or 'estado'
+    return os.path.join(STATS_STATE_DIR, f"{safe_name}.v{STATS_STATE_VERSION}.pkl")
+
+def save_stats_state(state, name):
+    """
+    Guarda el estado en disco para continuar en otra sesión
+    """
+    os.makedirs(STATS_STATE_DIR, exist_ok=True)
+    path = _state_path(name)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as file:
+        pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    return path
+
+def load_stats_state(name):
+    """
+    Carga un estado guardado; devuelve None si no existe o no se puede leer
+    """
+    path = _state_path(name)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as file:
+            return pickle.load(file)
+    except Exception:
+        return None
+
+def list_stats_states():
+    """
+    Nombres de los estados guardados
+    """
+    if not os.path.isdir(STATS_STATE_DIR):
+        return []
+    suffix = f".v{STATS_STATE_VERSION}.pkl"
+    return sorted(name[:-len(suffix)] for name in os.listdir(STATS_STATE_DIR) if name.endswith(suffix))
+
+def delete_stats_state(name):
+    """
+    Elimina un estado guardado
+    """
+    path = _state_path(name)
+    if os.path.exists(path):
+        os.remove(path)
+        return True
+    return False
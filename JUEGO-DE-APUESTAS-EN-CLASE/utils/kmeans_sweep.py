@@ -0,0 +1,86 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import silhouette_score, silhouette_samples
+
+# A partir de este número de filas se usa MiniBatchKMeans
+MINIBATCH_ROW_THRESHOLD = 20000
+
+# Tamaño del lote de MiniBatchKMeans
+MINIBATCH_BATCH_SIZE = 4096
+
+# Tamaño de la muestra estratificada para el silhouette (costo cuadrático)
+SILHOUETTE_SAMPLE_SIZE = 4000
+
+# Semilla de los ajustes y de las muestras
+KMEANS_SEED = 42
+
+def stratified_silhouette(scaled_data, labels, sample_size=SILHOUETTE_SAMPLE_SIZE, seed=KMEANS_SEED):
+    """
+    Silhouette promedio estimado con una muestra estratificada por cluster
+    (asignación proporcional). Devuelve la estimación, su error estándar y el
+    tamaño de muestra; si los datos caben en la muestra el cálculo es exacto
+    """
+    n_rows = len(labels)
+    if n_rows <= sample_size:
+        return silhouette_score(scaled_data, labels), 0.0, n_rows
+    
+    rng = np.random.default_rng(seed)
+    clusters, sizes = np.unique(labels, return_counts=True)
+    allocation = np.minimum(np.maximum(np.round(sizes / n_rows * sample_size).astype(int), 2), sizes)
+    sample = np.concatenate([
+        rng.choice(np.flatnonzero(labels == cluster), size=size, replace=False)
+        for cluster, size in zip(clusters, allocation)
+    ])
+    values = silhouette_samples(scaled_data[sample], labels[sample])
+    
+    # Estimador estratificado: media de cada cluster ponderada por su tamaño
+    strata = np.repeat(np.arange(len(clusters)), allocation)
+    means = np.bincount(strata, weights=values) / allocation
+    squares = np.bincount(strata, weights=(values - means[strata]) ** 2)
+    variances = np.where(allocation > 1, squares / np.maximum(allocation - 1, 1), 0.0)
+    shares = sizes / n_rows
+    estimate = float((shares * means).sum())
+    error = float(np.sqrt((shares ** 2 * (1 - allocation / sizes) * variances / allocation).sum()))
+    return estimate, error, int(allocation.sum())
+
+def _fit_kmeans(scaled_data, k, weights, minibatch, seed):
+    if minibatch:
+        model = MiniBatchKMeans(n_clusters=k, random_state=seed, n_init=3, batch_size=MINIBATCH_BATCH_SIZE)
+    else:
+        model = KMeans(n_clusters=k, random_state=seed, n_init=10)
+    return model.fit(scaled_data, sample_weight=weights)
+
+def kmeans_sweep(scaled_data, k_values, weights=None, minibatch=None, sample_size=SILHOUETTE_SAMPLE_SIZE,
+                 seed=KMEANS_SEED, max_workers=None):
+    """
+    Ajusta K-means para cada k en paralelo (scikit-learn libera el GIL) y
+    evalúa inercia (sobre todas las filas) y silhouette (muestra estratificada
+    con su error estándar). Guarda los modelos para reutilizar el ganador
+    """
+    k_values = list(k_values)
+    if minibatch is None:
+        minibatch = scaled_data.shape[0] > MINIBATCH_ROW_THRESHOLD
+    
+    def evaluate(k):
+        model = _fit_kmeans(scaled_data, k, weights, minibatch, seed)
+        score, error, n_sample = stratified_silhouette(scaled_data, model.labels_, sample_size, seed + k)
+        return model, score, error, n_sample
+    
+    workers = max_workers or max(1, min(len(k_values), os.cpu_count() or 1))
+    if workers == 1:
+        evaluations = [evaluate(k) for k in k_values]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            evaluations = list(executor.map(evaluate, k_values))
+    
+    return {
+        'k_values': k_values,
+        'models': {k: evaluation[0] for k, evaluation in zip(k_values, evaluations)},
+        'inertias': [evaluation[0].inertia_ for evaluation in evaluations],
+        'silhouette_scores': [evaluation[1] for evaluation in evaluations],
+        'silhouette_errors': [evaluation[2] for evaluation in evaluations],
+        'silhouette_sample_size': max(evaluation[3] for evaluation in evaluations) if evaluations else 0,
+        'algorithm': 'MiniBatchKMeans' if minibatch else 'KMeans'
+    }
@@ -0,0 +1,369 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy import linalg, stats
+
+from utils.data_loader import iter_csv_chunks, sniff_dialect, DEFAULT_CHUNK_ROWS
+
+# Formas de resolver las ecuaciones normales: Cholesky de X'X o QR acumulado por bloques
+OLS_SOLVERS = ['cholesky', 'qr']
+
+# Número de particiones de la validación cruzada
+OLS_FOLDS = 5
+
+# Semilla de la asignación de filas a particiones
+OLS_SEED = 42
+
+# Pivote relativo por debajo del cual un predictor se considera colineal con los anteriores
+ALIAS_TOLERANCE = 1e-10
+
+def fold_ids(rows, n_folds, seed):
+    """
+    Partición de cada fila según su posición global (hash de Fibonacci): no
+    depende del tamaño de los bloques ni del orden en que se procesan
+    """
+    with np.errstate(over='ignore'):
+        hashed = (rows.astype(np.uint64) + np.uint64(seed)) * np.uint64(0x9E3779B97F4A7C15)
+    return ((hashed >> np.uint64(32)) % np.uint64(n_folds)).astype(np.int64)
+
+def _qr_r(matrix, size):
+    """
+    Factor R (cuadrado, size x size) de la descomposición QR de matrix
+    """
+    r = linalg.qr(matrix, mode='r', check_finite=False)[0]
+    if r.shape[0] < size:
+        r = np.vstack([r, np.zeros((size - r.shape[0], size))])
+    return r[:size]
+
+def residual_squares(gram, coefficients):
+    """
+    Suma de cuadrados residual de una partición para unos coeficientes
+    dados (en la escala desplazada) y su suma de cuadrados total
+    """
+    vector = np.r_[-np.nan_to_num(coefficients), 1.0]
+    sse = max(vector @ gram @ vector, 0.0)
+    sst = max(gram[-1, -1] - gram[0, -1] ** 2 / gram[0, 0], 0.0) if gram[0, 0] > 0 else np.nan
+    return sse, sst
+
+class OLSAccumulator:
+    """
+    Acumula por bloques de filas las estadísticas suficientes de una regresión
+    lineal con intercepto: por cada partición de la validación cruzada, la
+    matriz de Gram de [1, X, y] (solver 'cholesky') o su factor R
+    (solver 'qr'). Las filas con algún valor faltante o peso 0 no cuentan
+    """
+    
+    def __init__(self, columns, target, solver='cholesky', n_folds=OLS_FOLDS, seed=OLS_SEED):
+        if solver not in OLS_SOLVERS:
+            raise ValueError(f"Solver desconocido: {solver}")
+        self.columns = list(columns)
+        self.target = target
+        self.solver = solver
+        self.n_folds = max(int(n_folds), 1)
+        self.seed = seed
+        self.size = len(self.columns) + 2
+        
+        # Desplazamiento de predictores y objetivo para evitar cancelación numérica
+        self.shift = None
+        self.factors = [np.zeros((self.size, self.size)) for _ in range(self.n_folds)]
+        self.counts = np.zeros(self.n_folds, dtype='int64')
+        self.rows_seen = 0
+    
+    def update(self, X, y, weights=None, rows=None):
+        """
+        Incorpora un bloque de filas (arreglos de predictores y objetivo).
+        rows son las posiciones globales de las filas, que deciden su
+        partición; por defecto continúan las del bloque anterior
+        """
+        X = np.asarray(X, dtype='float64')
+        y = np.asarray(y, dtype='float64')
+        if rows is None:
+            rows = np.arange(self.rows_seen, self.rows_seen + len(y))
+        self.rows_seen = max(self.rows_seen, int(rows[-1]) + 1) if len(rows) > 0 else self.rows_seen
+        
+        valid = np.isfinite(X).all(axis=1) & np.isfinite(y)
+        weights = np.ones(len(y)) if weights is None else np.asarray(weights, dtype='float64')
+        valid &= weights > 0
+        if not valid.any():
+            return self
+        
+        if self.shift is None:
+            self.shift = np.r_[X[valid].mean(axis=0), y[valid].mean()]
+        augmented = np.empty((int(valid.sum()), self.size))
+        augmented[:, 0] = 1.0
+        augmented[:, 1:-1] = X[valid] - self.shift[:-1]
+        augmented[:, -1] = y[valid] - self.shift[-1]
+        weights = weights[valid]
+        folds = fold_ids(np.asarray(rows)[valid], self.n_folds, self.seed)
+        
+        for fold in range(self.n_folds):
+            selected = folds == fold
+            if not selected.any():
+                continue
+            block = augmented[selected]
+            if self.solver == 'cholesky':
+                self.factors[fold] += (block * weights[selected, None]).T @ block
+            else:
+                scaled = block * np.sqrt(weights[selected])[:, None]
+                self.factors[fold] = _qr_r(np.vstack([self.factors[fold], scaled]), self.size)
+            self.counts[fold] += int(selected.sum())
+        return self
+    
+    def _reshifted(self, factor, delta):
+        """
+        Reexpresa una estadística con otro desplazamiento: cada columna suma
+        delta veces la columna del intercepto (R sigue siendo triangular)
+        """
+        transform = np.eye(self.size)
+        transform[0, 1:] = delta
+        if self.solver == 'cholesky':
+            return transform.T @ factor @ transform
+        return factor @ transform
+    
+    def merge(self, other):
+        """
+        Fusiona otro acumulador de las mismas columnas, solver y particiones
+        """
+        if other.shift is None:
+            return self
+        if self.shift is None:
+            self.shift = other.shift.copy()
+        delta = other.shift - self.shift
+        for fold in range(self.n_folds):
+            factor = self._reshifted(other.factors[fold], delta) if np.any(delta) else other.factors[fold]
+            if self.solver == 'cholesky':
+                self.factors[fold] = self.factors[fold] + factor
+            else:
+                self.factors[fold] = _qr_r(np.vstack([self.factors[fold], factor]), self.size)
+        self.counts += other.counts
+        self.rows_seen = max(self.rows_seen, other.rows_seen)
+        return self
+    
+    def _combined(self, folds):
+        if self.solver == 'cholesky':
+            return sum(self.factors[fold] for fold in folds)
+        return _qr_r(np.vstack([self.factors[fold] for fold in folds]), self.size)
+    
+    def _gram(self, factor):
+        return factor if self.solver == 'cholesky' else factor.T @ factor
+    
+    def gram(self, folds=None):
+        """
+        Matriz de Gram de [1, X, y] (desplazada) de las particiones indicadas (todas por defecto)
+        """
+        return self._gram(self._combined(range(self.n_folds) if folds is None else folds))
+    
+    def subset(self, columns):
+        """
+        Acumulador con solo los predictores indicados, sin volver a leer los datos
+        """
+        positions = [self.columns.index(col) for col in columns]
+        indices = [0] + [position + 1 for position in positions] + [self.size - 1]
+        subset = OLSAccumulator(columns, self.target, solver=self.solver, n_folds=self.n_folds, seed=self.seed)
+        if self.solver == 'cholesky':
+            subset.factors = [factor[np.ix_(indices, indices)] for factor in self.factors]
+        else:
+            subset.factors = [_qr_r(factor[:, indices], len(indices)) for factor in self.factors]
+        subset.shift = None if self.shift is None else np.r_[self.shift[positions], self.shift[-1]]
+        subset.counts = self.counts.copy()
+        subset.rows_seen = self.rows_seen
+        return subset
+    
+    def _solve(self, factor):
+        """
+        Coeficientes de los predictores no colineales a partir de la Gram o de
+        R. Un predictor es colineal si su pivote (suma de cuadrados residual
+        respecto de los anteriores) es despreciable; su coeficiente es NaN.
+        Devuelve coeficientes, columnas conservadas, R de las conservadas y SSE
+        """
+        n_predictors = self.size - 1
+        if self.solver == 'cholesky':
+            gram = factor
+            kept, lower = [], np.zeros((0, 0))
+            for j in range(n_predictors):
+                cross = linalg.solve_triangular(lower, gram[kept, j], lower=True) if kept else np.zeros(0)
+                pivot = gram[j, j] - cross @ cross
+                if pivot > ALIAS_TOLERANCE * gram[j, j] and gram[j, j] > 0:
+                    lower = np.block([[lower, np.zeros((len(kept), 1))], [cross[None, :], np.sqrt(pivot)]])
+                    kept.append(j)
+            r = lower.T
+            r_xy = linalg.solve_triangular(lower, gram[kept, -1], lower=True)
+            sse = max(gram[-1, -1] - r_xy @ r_xy, 0.0)
+        else:
+            column_squares = (factor ** 2).sum(axis=0)
+            diagonal = np.diag(factor) ** 2
+            kept = [j for j in range(n_predictors) if column_squares[j] > 0 and diagonal[j] > ALIAS_TOLERANCE * column_squares[j]]
+            reduced = _qr_r(factor[:, kept + [n_predictors]], len(kept) + 1)
+            r = reduced[:-1, :-1]
+            r_xy = reduced[:-1, -1]
+            sse = reduced[-1, -1] ** 2
+        
+        coefficients = np.full(n_predictors, np.nan)
+        coefficients[kept] = linalg.solve_triangular(r, r_xy) if kept else []
+        return coefficients, kept, r, sse
+    
+    def unshifted(self, coefficients):
+        """
+        Intercepto y pendientes en la escala original (sin desplazamiento)
+        """
+        slopes = np.nan_to_num(coefficients[1:])
+        intercept = coefficients[0] + self.shift[-1] - slopes @ self.shift[:-1]
+        return np.r_[intercept, coefficients[1:]]
+    
+    def fit(self):
+        """
+        Ajuste con todas las filas e inferencia: errores estándar, t, p-valores,
+        VIF, R² y R² ajustado. Los pesos se tratan como pesos analíticos (sin
+        corrección por diseño muestral). La validación cruzada usa las
+        estadísticas de cada partición: el modelo de la partición f se resuelve
+        con el total menos f y se evalúa con las estadísticas de f
+        """
+        if self.shift is None:
+            raise ValueError("No hay filas completas para la regresión")
+        
+        factor = self._combined(range(self.n_folds))
+        gram = self._gram(factor)
+        coefficients, kept, r, sse = self._solve(factor)
+        n = int(self.counts.sum())
+        rank = len(kept)
+        df_resid = n - rank
+        weight_sum = gram[0, 0]
+        
+        # Inversa de X'WX de los predictores conservados a partir de R
+        r_inverse = linalg.solve_triangular(r, np.eye(rank)) if rank else np.zeros((0, 0))
+        sigma2 = sse / df_resid if df_resid > 0 else np.nan
+        standard_errors = np.full(self.size - 1, np.nan)
+        standard_errors[kept] = np.sqrt(sigma2 * (r_inverse ** 2).sum(axis=1))
+        if rank:
+            # El intercepto original es b0 - desplazamiento · b: su varianza es c' (X'WX)⁻¹ c
+            contrast = np.r_[1.0, -self.shift[[j - 1 for j in kept[1:]]]]
+            standard_errors[0] = np.sqrt(sigma2 * np.sum((r_inverse.T @ contrast) ** 2))
+        original = self.unshifted(coefficients)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t_values = original / standard_errors
+            p_values = 2 * stats.t.sf(np.abs(t_values), df_resid) if df_resid > 0 else np.full(self.size - 1, np.nan)
+        
+        # VIF: con el intercepto primero, R sin su primera fila y columna es el
+        # factor de los predictores centrados
+        vif = np.full(self.size - 1, np.nan)
+        if rank > 1:
+            centered = r[1:, 1:]
+            centered_inverse = r_inverse[1:, 1:]
+            vif[kept[1:]] = (centered ** 2).sum(axis=0) * (centered_inverse ** 2).sum(axis=1)
+        
+        _, sst = residual_squares(gram, coefficients)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r2 = 1 - sse / sst if sst > 0 else np.nan
+            r2_adjusted = 1 - (1 - r2) * (n - 1) / df_resid if df_resid > 0 else np.nan
+        
+        names = ['Intercepto'] + self.columns
+        table = pd.DataFrame({
+            'Coeficiente': original,
+            'Error estándar': standard_errors,
+            't': t_values,
+            'p-valor': p_values,
+            'VIF': vif
+        }, index=names)
+        
+        return {
+            'solver': self.solver,
+            'target': self.target,
+            'coefficients': table,
+            'intercept': original[0],
+            'coef': original[1:],
+            'aliased': [name for j, name in enumerate(names) if j not in kept],
+            'n_samples': n,
+            'weight_sum': weight_sum,
+            'rank': rank,
+            'df_resid': df_resid,
+            'sigma': np.sqrt(sigma2),
+            'r2': r2,
+            'r2_adjusted': r2_adjusted,
+            'rmse': np.sqrt(sse / weight_sum),
+            'cv': self.cross_validation()
+        }
+    
+    def cross_validation(self):
+        """
+        Métricas de validación cruzada k-fold sin volver a leer los datos
+        """
+        if self.n_folds < 2 or np.any(self.counts == 0):
+            return None
+        
+        rows = []
+        fold_coefficients = []
+        for fold in range(self.n_folds):
+            train = self._combined([other for other in range(self.n_folds) if other != fold])
+            coefficients, _, _, _ = self._solve(train)
+            sse, sst = residual_squares(self._gram(self.factors[fold]), coefficients)
+            weight_sum = self._gram(self.factors[fold])[0, 0]
+            rows.append({
+                'Partición': fold + 1,
+                'Filas': int(self.counts[fold]),
+                'R²': 1 - sse / sst if sst > 0 else np.nan,
+                'RMSE': np.sqrt(sse / weight_sum),
+                'SSE': sse,
+                'Peso': weight_sum
+            })
+            fold_coefficients.append(self.unshifted(coefficients))
+        
+        folds = pd.DataFrame(rows)
+        return {
+            'folds': folds[['Partición', 'Filas', 'R²', 'RMSE']],
+            'r2': float(folds['R²'].mean()),
+            'rmse': float(np.sqrt(folds['SSE'].sum() / folds['Peso'].sum())),
+            'fold_coefficients': np.array(fold_coefficients)
+        }
+    
+    def predict_out_of_fold(self, X, rows, fold_coefficients):
+        """
+        Predicción de cada fila con el modelo entrenado sin su partición
+        """
+        folds = fold_ids(np.asarray(rows), self.n_folds, self.seed)
+        coefficients = np.nan_to_num(fold_coefficients)
+        return coefficients[folds, 0] + np.einsum('ij,ij->i', np.asarray(X, dtype='float64'), coefficients[folds, 1:])
+
+def fit_ols(X, y, columns, target, weights=None, solver='cholesky', n_folds=OLS_FOLDS, seed=OLS_SEED,
+            chunk_rows=DEFAULT_CHUNK_ROWS, max_workers=None):
+    """
+    Regresión de datos en memoria: los bloques de filas se acumulan en paralelo
+    (NumPy libera el GIL en los productos y en QR) y se fusionan en orden
+    """
+    X = np.asarray(X, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    starts = list(range(0, len(y), chunk_rows)) or [0]
+    
+    def accumulate(start):
+        end = start + chunk_rows
+        accumulator = OLSAccumulator(columns, target, solver=solver, n_folds=n_folds, seed=seed)
+        return accumulator.update(X[start:end], y[start:end], None if weights is None else weights[start:end],
+                                  rows=np.arange(start, min(end, len(y))))
+    
+    if len(starts) == 1:
+        partials = [accumulate(starts[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            partials = list(executor.map(accumulate, starts))
+    
+    accumulator = partials[0]
+    for partial in partials[1:]:
+        accumulator.merge(partial)
+    return accumulator
+
+def ols_from_csv(uploaded_file, target, columns, weight_column=None, solver='cholesky', n_folds=OLS_FOLDS,
+                 seed=OLS_SEED, chunk_rows=DEFAULT_CHUNK_ROWS, dialect=None):
+    """
+    Regresión de un CSV en una sola pasada por bloques, sin cargarlo completo.
+    Devuelve el acumulador; fit() da coeficientes, inferencia y validación cruzada
+    """
+    if dialect is None:
+        dialect = sniff_dialect(uploaded_file)
+    accumulator = OLSAccumulator(columns, target, solver=solver, n_folds=n_folds, seed=seed)
+    for chunk in iter_csv_chunks(uploaded_file, chunk_rows=chunk_rows, dialect=dialect):
+        numeric = chunk[list(columns) + [target]].apply(pd.to_numeric, errors='coerce')
+        weights = None
+        if weight_column is not None:
+            weights = pd.to_numeric(chunk[weight_column], errors='coerce').fillna(0).to_numpy(dtype='float64')
+        accumulator.update(numeric[list(columns)].to_numpy(dtype='float64', na_value=np.nan),
+                           numeric[target].to_numpy(dtype='float64', na_value=np.nan), weights)
+    return accumulator
@@ -0,0 +1,128 @@
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+from utils.data_loader import PROFILE_BLOCK_COLUMNS
+from utils.dataset_profile import get_dataset_profile
+
+# Factor de las vallas de Tukey (Q1 - k·IQR, Q3 + k·IQR)
+IQR_FACTOR = 1.5
+
+# Umbral del valor absoluto del Z-score
+Z_THRESHOLD = 3
+
+# Número de resultados (versiones del dataset) que se mantienen en memoria
+OUTLIER_CACHE_SIZE = 8
+
+# Máscaras ya calculadas, por huella del contenido
+_outlier_cache = OrderedDict()
+
+class OutlierMasks:
+    """
+    Máscaras de valores atípicos (IQR y Z-score) de todas las columnas
+    numéricas, guardadas empaquetadas a un bit por celda, con los límites
+    y conteos por columna
+    """
+    
+    def __init__(self, data, iqr_factor=IQR_FACTOR, z_threshold=Z_THRESHOLD):
+        profile = get_dataset_profile(data)
+        stats = profile.stats
+        self.columns = list(profile.numeric_columns)
+        self.index = data.index
+        self.n_rows = len(data)
+        self.z_threshold = z_threshold
+        
+        # Vallas IQR a partir de los cuartiles del perfil compartido
+        q1, q3 = profile.quantile(0.25), profile.quantile(0.75)
+        iqr = q3 - q1
+        self.lower = q1 - iqr_factor * iqr
+        self.upper = q3 + iqr_factor * iqr
+        
+        # Z-score como scipy.stats.zscore sobre la columna con nulos imputados
+        # por la media: la media no cambia y la suma de cuadrados tampoco
+        sum_squares = stats['var'] * (stats['count'] - 1)
+        z_std = np.sqrt(sum_squares.where(stats['count'] > 1, 0.0) / max(self.n_rows, 1))
+        self.mean = stats['mean']
+        self.z_std = z_std.where(z_std > 0)
+        
+        iqr_blocks = []
+        zscore_blocks = []
+        numeric_data = data[self.columns]
+        for start in range(0, len(self.columns), PROFILE_BLOCK_COLUMNS):
+            block_columns = self.columns[start:start + PROFILE_BLOCK_COLUMNS]
+            values = numeric_data[block_columns].to_numpy(dtype='float64', na_value=np.nan)
+            with np.errstate(invalid='ignore'):
+                iqr_mask = (values < self.lower[block_columns].to_numpy()) | (values > self.upper[block_columns].to_numpy())
+                z_scores = np.abs(values - self.mean[block_columns].to_numpy()) / self.z_std[block_columns].to_numpy()
+                zscore_mask = z_scores > z_threshold
+            iqr_blocks.append(np.packbits(iqr_mask, axis=0))
+            zscore_blocks.append(np.packbits(zscore_mask, axis=0))
+        
+        packed_rows = (self.n_rows + 7) // 8
+        self._iqr_bits = np.hstack(iqr_blocks) if iqr_blocks else np.zeros((packed_rows, 0), dtype=np.uint8)
+        self._zscore_bits = np.hstack(zscore_blocks) if zscore_blocks else np.zeros((packed_rows, 0), dtype=np.uint8)
+        
+        self.iqr_counts = pd.Series(self.iqr_mask().sum(axis=0), index=self.columns)
+        self.zscore_counts = pd.Series(self.zscore_mask().sum(axis=0), index=self.columns)
+    
+    def _unpack(self, bits, column=None):
+        if column is None:
+            return np.unpackbits(bits, axis=0, count=self.n_rows).astype(bool)
+        position = self.columns.index(column)
+        return np.unpackbits(bits[:, position], count=self.n_rows).astype(bool)
+    
+    def iqr_mask(self, column=None):
+        """
+        Máscara booleana IQR de una columna o matriz (filas x columnas) de todas
+        """
+        return self._unpack(self._iqr_bits, column)
+    
+    def zscore_mask(self, column=None):
+        """
+        Máscara booleana Z-score de una columna o matriz (filas x columnas) de todas
+        """
+        return self._unpack(self._zscore_bits, column)
+    
+    def iqr_rows(self, column):
+        """
+        Etiquetas de las filas atípicas de una columna según IQR
+        """
+        return self.index[self.iqr_mask(column)]
+    
+    def zscore_rows(self, column):
+        """
+        Etiquetas de las filas atípicas de una columna según Z-score
+        """
+        return self.index[self.zscore_mask(column)]
+    
+    def summary(self):
+        """
+        Tabla de límites y conteos de valores atípicos por columna
+        """
+        n_rows = max(self.n_rows, 1)
+        return pd.DataFrame({
+            'Límite inferior (IQR)': self.lower,
+            'Límite superior (IQR)': self.upper,
+            'Atípicos (IQR)': self.iqr_counts,
+            '% IQR': (self.iqr_counts / n_rows * 100).round(2),
+            'Atípicos (Z-score)': self.zscore_counts,
+            '% Z-score': (self.zscore_counts / n_rows * 100).round(2)
+        })
+
+def get_outlier_masks(data):
+    """
+    Devuelve las máscaras de valores atípicos de la versión actual del
+    dataset, calculándolas una sola vez por huella del contenido
+    """
+    fingerprint = get_dataset_profile(data).fingerprint
+    masks = _outlier_cache.get(fingerprint)
+    # La huella no incluye el índice: las etiquetas de filas deben coincidir
+    if masks is not None and masks.index.equals(data.index):
+        _outlier_cache.move_to_end(fingerprint)
+        return masks
+    
+    masks = OutlierMasks(data)
+    _outlier_cache[fingerprint] = masks
+    while len(_outlier_cache) > OUTLIER_CACHE_SIZE:
+        _outlier_cache.popitem(last=False)
+    return masks
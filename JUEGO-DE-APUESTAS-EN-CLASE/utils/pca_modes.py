@@ -0,0 +1,320 @@
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from sklearn.decomposition import PCA, IncrementalPCA
+from sklearn.preprocessing import StandardScaler
+from sklearn.utils.extmath import randomized_svd
+
+from utils.data_loader import iter_csv_chunks, sniff_dialect, DEFAULT_CHUNK_ROWS
+
+# Modos disponibles: descomposición completa, SVD aleatorizada e IncrementalPCA por bloques
+PCA_MODES = ['full', 'randomized', 'incremental']
+
+# En modo automático se usa la SVD aleatorizada desde este número de columnas
+RANDOMIZED_MIN_COLUMNS = 50
+
+# Componentes cuyos puntajes se conservan (los que usan los gráficos)
+PCA_PLOT_COMPONENTS = 3
+
+# Varianza objetivo por defecto de los modos que no calculan todos los componentes
+PCA_VARIANCE_TARGET = 0.80
+
+# Semilla de la SVD aleatorizada
+PCA_SEED = 42
+
+def _measure(function):
+    """
+    Ejecuta function midiendo tiempo y memoria pico (tracemalloc). Si ya se
+    estaba midiendo la memoria, el pico se cuenta desde el uso actual
+    """
+    was_tracing = tracemalloc.is_tracing()
+    if was_tracing:
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+    else:
+        baseline = 0
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = function()
+        elapsed = time.perf_counter() - start
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    return result, elapsed, max(peak_bytes - baseline, 0)
+
+def _is_variance_target(n_components):
+    return isinstance(n_components, float) and n_components <= 1
+
+def _components_needed(explained_variance, n_components):
+    """
+    Número de componentes a conservar: todos, un número fijo o los
+    necesarios para alcanzar la varianza objetivo (n_components en (0, 1])
+    """
+    if n_components is None:
+        return len(explained_variance)
+    if _is_variance_target(n_components):
+        cumulative = np.cumsum(explained_variance)
+        return int(min(np.searchsorted(cumulative, n_components) + 1, len(explained_variance)))
+    return int(min(n_components, len(explained_variance)))
+
+def _resolve_mode(mode, scaled_data):
+    if mode == 'auto':
+        return 'randomized' if scaled_data.shape[1] >= RANDOMIZED_MIN_COLUMNS else 'full'
+    if mode not in PCA_MODES:
+        raise ValueError(f"Modo de PCA desconocido: {mode}")
+    return mode
+
+def _weighted_covariance(scaled_data, weights, chunk_rows):
+    """
+    Covarianza ponderada de datos ya centrados, acumulada por bloques de filas
+    """
+    covariance = np.zeros((scaled_data.shape[1], scaled_data.shape[1]))
+    for start in range(0, len(scaled_data), chunk_rows):
+        block = scaled_data[start:start + chunk_rows]
+        covariance += (block * weights[start:start + chunk_rows, None]).T @ block
+    return covariance / weights.sum()
+
+def _eigen_pca(covariance, max_components):
+    """
+    Componentes y proporción de varianza a partir de una covarianza
+    """
+    eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+    eigenvalues = np.clip(eigenvalues, 0, None)
+    order = np.argsort(eigenvalues)[::-1][:max_components]
+    return eigenvectors[:, order].T, eigenvalues[order] / eigenvalues.sum()
+
+def _full_pca(scaled_data, weights, n_components, chunk_rows):
+    max_components = min(scaled_data.shape)
+    if weights is None:
+        pca = PCA().fit(scaled_data)
+        components, explained_variance, mean = pca.components_, pca.explained_variance_ratio_, pca.mean_
+    else:
+        # PCA ponderada: los datos ya tienen media ponderada cero
+        components, explained_variance = _eigen_pca(_weighted_covariance(scaled_data, weights, chunk_rows), max_components)
+        mean = None
+    keep = _components_needed(explained_variance, n_components)
+    return components[:keep], explained_variance[:keep], mean
+
+def _randomized_pca(scaled_data, weights, n_components, seed):
+    """
+    SVD aleatorizada de los datos estandarizados (escalados por la raíz de los
+    pesos). Con varianza objetivo se duplica el número de componentes hasta alcanzarla
+    """
+    matrix = scaled_data if weights is None else scaled_data * np.sqrt(weights)[:, None]
+    total_variance = np.einsum('ij,ij->', matrix, matrix)
+    max_components = min(matrix.shape)
+    target = _is_variance_target(n_components)
+    k = min(10 if target else int(n_components), max_components)
+    
+    while True:
+        _, singular_values, components = randomized_svd(matrix, n_components=k, random_state=seed)
+        explained_variance = singular_values ** 2 / total_variance if total_variance > 0 else np.zeros(k)
+        if not target or explained_variance.sum() >= n_components or k == max_components:
+            break
+        k = min(2 * k, max_components)
+    
+    keep = _components_needed(explained_variance, n_components)
+    return components[:keep], explained_variance[:keep], None
+
+def _row_batches(scaled_data, chunk_rows, min_rows):
+    """
+    Bloques de filas para partial_fit; el último bloque se une al anterior
+    si tiene menos filas que componentes
+    """
+    starts = list(range(0, len(scaled_data), chunk_rows))
+    if len(starts) > 1 and len(scaled_data) - starts[-1] < min_rows:
+        starts.pop()
+    bounds = starts[1:] + [len(scaled_data)]
+    for start, end in zip(starts, bounds):
+        yield scaled_data[start:end]
+
+def _incremental_pca(scaled_data, n_components, chunk_rows):
+    """
+    IncrementalPCA alimentado por bloques de filas (sin pesos)
+    """
+    max_components = min(scaled_data.shape)
+    if _is_variance_target(n_components):
+        k = min(max_components, chunk_rows)
+    else:
+        k = min(int(n_components), max_components)
+    pca = IncrementalPCA(n_components=k)
+    for batch in _row_batches(scaled_data, chunk_rows, k):
+        pca.partial_fit(batch)
+    keep = _components_needed(pca.explained_variance_ratio_, n_components)
+    return pca.components_[:keep], pca.explained_variance_ratio_[:keep], pca.mean_
+
+def fit_pca(scaled_data, weights=None, mode='full', n_components=None, chunk_rows=DEFAULT_CHUNK_ROWS, seed=PCA_SEED):
+    """
+    PCA de datos estandarizados en el modo indicado ('full', 'randomized',
+    'incremental' o 'auto'). n_components es None (todos), un entero (número
+    fijo) o un valor en (0, 1] (varianza objetivo). Solo se conservan los
+    puntajes de los componentes que se grafican. Informa tiempo y memoria pico
+    """
+    mode = _resolve_mode(mode, scaled_data)
+    # IncrementalPCA no admite pesos: con pesos se descompone la covarianza
+    # ponderada acumulada por bloques, que es el modo completo
+    if mode == 'incremental' and weights is not None:
+        mode = 'full'
+    if mode != 'full' and n_components is None:
+        n_components = PCA_VARIANCE_TARGET
+    
+    def run():
+        if mode == 'full':
+            components, explained_variance, mean = _full_pca(scaled_data, weights, n_components, chunk_rows)
+        elif mode == 'randomized':
+            components, explained_variance, mean = _randomized_pca(scaled_data, weights, n_components, seed)
+        else:
+            components, explained_variance, mean = _incremental_pca(scaled_data, n_components, chunk_rows)
+        plotted = components[:PCA_PLOT_COMPONENTS]
+        scores = (scaled_data @ plotted.T) if mean is None else (scaled_data - mean) @ plotted.T
+        return components, explained_variance, scores
+    
+    (components, explained_variance, scores), elapsed, peak_bytes = _measure(run)
+    return {
+        'mode': mode,
+        'components': components,
+        'explained_variance': explained_variance,
+        'scores': scores,
+        'elapsed_seconds': elapsed,
+        'peak_memory_mb': peak_bytes / 1024 / 1024
+    }
+
+def _complete_numeric(chunk, columns, weight_column=None):
+    """
+    Casos completos de las columnas (y pesos positivos si hay columna de pesos)
+    """
+    names = list(columns) + ([weight_column] if weight_column else [])
+    values = chunk[names].apply(pd.to_numeric, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    complete = ~np.isnan(values).any(axis=1)
+    if not weight_column:
+        return values[complete], None
+    complete &= values[:, -1] > 0
+    return values[complete, :-1], values[complete, -1]
+
+def _csv_weighted_pca(chunks, columns, weight_column, n_components):
+    """
+    PCA ponderada de un CSV por bloques: una pasada para las medias
+    ponderadas y otra para la covarianza ponderada (p x p), cuya versión
+    estandarizada se descompone. Devuelve componentes, varianza, media y escala
+    """
+    weight_sum = 0.0
+    sums = np.zeros(len(columns))
+    for chunk in chunks():
+        values, weights = _complete_numeric(chunk, columns, weight_column)
+        weight_sum += weights.sum()
+        sums += weights @ values
+    if weight_sum == 0:
+        raise ValueError("El archivo no tiene filas numéricas completas con peso positivo")
+    mean = sums / weight_sum
+    
+    covariance = np.zeros((len(columns), len(columns)))
+    n_rows = 0
+    for chunk in chunks():
+        values, weights = _complete_numeric(chunk, columns, weight_column)
+        centered = values - mean
+        covariance += (centered * weights[:, None]).T @ centered
+        n_rows += len(values)
+    covariance /= weight_sum
+    scale = np.sqrt(np.clip(np.diag(covariance), 0, None))
+    # Una columna constante deja ruido de redondeo en su varianza: se trata
+    # como constante (escala 1, sin covarianza) con la misma tolerancia
+    # relativa que StandardScaler
+    constant = scale <= 10 * np.finfo(np.float64).eps * np.abs(mean)
+    scale[constant | (scale == 0)] = 1.0
+    covariance[constant, :] = 0.0
+    covariance[:, constant] = 0.0
+    
+    components, explained_variance = _eigen_pca(covariance / np.outer(scale, scale), min(len(columns), n_rows))
+    keep = _components_needed(explained_variance, n_components)
+    return components[:keep], explained_variance[:keep], mean, scale
+
+def _csv_incremental_pca(chunks, columns, n_components, chunk_rows):
+    """
+    PCA sin pesos de un CSV por bloques: una pasada para media y desviación
+    y otra para IncrementalPCA. Devuelve componentes, varianza, media y escala
+    """
+    scaler = StandardScaler()
+    for chunk in chunks():
+        values, _ = _complete_numeric(chunk, columns)
+        if len(values) > 0:
+            scaler.partial_fit(values)
+    if not hasattr(scaler, 'n_samples_seen_'):
+        raise ValueError("El archivo no tiene filas numéricas completas")
+    
+    max_components = min(len(columns), int(scaler.n_samples_seen_))
+    if _is_variance_target(n_components):
+        k = min(max_components, chunk_rows)
+    else:
+        k = min(int(n_components), max_components)
+    pca = IncrementalPCA(n_components=k)
+    
+    # Cada bloque se ajusta cuando llega el siguiente; los bloques con
+    # menos filas que componentes se unen al bloque retenido
+    batch = np.empty((0, len(columns)))
+    for chunk in chunks():
+        values, _ = _complete_numeric(chunk, columns)
+        if len(values) == 0:
+            continue
+        values = scaler.transform(values)
+        if len(batch) >= k and len(values) >= k:
+            pca.partial_fit(batch)
+            batch = values
+        else:
+            batch = np.vstack([batch, values])
+    pca.partial_fit(batch)
+    
+    keep = _components_needed(pca.explained_variance_ratio_, n_components)
+    scale = np.where(scaler.scale_ > 0, scaler.scale_, 1.0)
+    # Los puntajes restan la media de IncrementalPCA (en la escala estandarizada)
+    mean = scaler.mean_ + pca.mean_ * scale
+    return pca.components_[:keep], pca.explained_variance_ratio_[:keep], mean, scale
+
+def incremental_pca_from_csv(uploaded_file, n_components=PCA_VARIANCE_TARGET, chunk_rows=DEFAULT_CHUNK_ROWS, dialect=None,
+                             weight_column=None):
+    """
+    PCA de un CSV sin cargarlo en memoria (casos completos de las columnas
+    numéricas del primer bloque). Sin pesos usa IncrementalPCA; con
+    weight_column acumula la covarianza ponderada por bloques (modo completo).
+    Una última pasada calcula los puntajes de los componentes graficados
+    """
+    if n_components is None and not weight_column:
+        n_components = PCA_VARIANCE_TARGET
+    
+    def run():
+        file_dialect = sniff_dialect(uploaded_file) if dialect is None else dialect
+        
+        def chunks():
+            return iter_csv_chunks(uploaded_file, chunk_rows=chunk_rows, dialect=file_dialect)
+        
+        columns = None
+        for chunk in chunks():
+            columns = chunk.select_dtypes(include=[np.number]).columns.drop(weight_column, errors='ignore')
+            break
+        if columns is None or len(columns) == 0:
+            raise ValueError("El archivo no tiene columnas numéricas")
+        if weight_column and weight_column not in chunk.columns:
+            raise KeyError(f"La columna de pesos '{weight_column}' no existe")
+        
+        if weight_column:
+            components, explained_variance, mean, scale = _csv_weighted_pca(chunks, columns, weight_column, n_components)
+        else:
+            components, explained_variance, mean, scale = _csv_incremental_pca(chunks, columns, n_components, chunk_rows)
+        
+        plotted = components[:PCA_PLOT_COMPONENTS]
+        scores = [((values - mean) / scale) @ plotted.T
+                  for values, _ in (_complete_numeric(chunk, columns, weight_column) for chunk in chunks())]
+        return columns, components, explained_variance, np.vstack(scores)
+    
+    (columns, components, explained_variance, scores), elapsed, peak_bytes = _measure(run)
+    return {
+        'mode': 'full' if weight_column else 'incremental',
+        'columns': columns,
+        'components': components,
+        'explained_variance': explained_variance,
+        'scores': scores,
+        'elapsed_seconds': elapsed,
+        'peak_memory_mb': peak_bytes / 1024 / 1024
+    }
@@ -0,0 +1,327 @@
+import numpy as np
+import pandas as pd
+
+from utils.ols_engine import residual_squares, ALIAS_TOLERANCE
+
+# Métodos de selección de predictores
+SELECTION_METHODS = ['forward', 'backward', 'best_subset', 'lasso', 'elasticnet']
+
+# Hasta este número de predictores el modo automático evalúa todos los subconjuntos
+BEST_SUBSET_MAX_PREDICTORS = 15
+
+# Longitud de la ruta de penalizaciones y cociente entre la menor y la mayor
+PATH_LENGTH = 50
+PATH_MIN_RATIO = 1e-3
+
+# Mezcla L1/L2 de ElasticNet
+ELASTICNET_L1_RATIO = 0.5
+
+# Convergencia del descenso por coordenadas (cambio máximo de un coeficiente
+# estandarizado, relativo a la desviación estándar del objetivo)
+PATH_TOLERANCE = 1e-4
+PATH_MAX_ITER = 1000
+
+def _sweep(matrix, k, reverse=False):
+    """
+    Operador de barrido sobre la posición k (in situ). Es una actualización de
+    rango uno de la Gram, O(p²): tras barrer un conjunto S, la esquina del
+    objetivo es la suma de cuadrados residual y la fila de cada predictor
+    fuera de S su pivote y producto cruzado residuales. reverse deshace el barrido
+    """
+    pivot = matrix[k, k]
+    column = matrix[:, k].copy()
+    matrix -= np.outer(column, column) / pivot
+    sign = -1.0 if reverse else 1.0
+    matrix[:, k] = sign * column / pivot
+    matrix[k, :] = sign * column / pivot
+    matrix[k, k] = -1.0 / pivot
+    return matrix
+
+def _centered(gram):
+    """
+    Gram con el intercepto ya barrido (productos cruzados centrados)
+    """
+    return _sweep(np.array(gram, dtype='float64'), 0)
+
+def _information_criterion(sse, n, weight_sum, n_parameters, criterion):
+    fit_term = n * np.log(max(sse, np.finfo(float).tiny) / weight_sum)
+    penalty = np.log(n) if criterion == 'bic' else 2.0
+    return fit_term + penalty * n_parameters
+
+def _eligible(centered):
+    """
+    Predictores que no son colineales con los anteriores (en orden)
+    """
+    matrix = centered.copy()
+    base = np.diag(centered)
+    eligible = []
+    for j in range(1, len(matrix) - 1):
+        if base[j] > 0 and matrix[j, j] > ALIAS_TOLERANCE * base[j]:
+            _sweep(matrix, j)
+            eligible.append(j)
+    return eligible
+
+def forward_stepwise(gram, n, criterion='bic', max_predictors=None):
+    """
+    Selección hacia adelante: en cada paso entra el predictor que más reduce
+    la suma de cuadrados residual (pivote y producto cruzado tras el barrido),
+    mientras mejore el criterio de información
+    """
+    matrix = _centered(gram)
+    base = np.diag(matrix).copy()
+    weight_sum, sst = gram[0, 0], matrix[-1, -1]
+    limit = min(len(matrix) - 2, n - 2) if max_predictors is None else max_predictors
+    selected = []
+    current = _information_criterion(matrix[-1, -1], n, weight_sum, 1, criterion)
+    steps = [{'Paso': 0, 'Variable': None, 'Predictores': 0, 'SSE': sst, 'R²': 0.0, criterion.upper(): current}]
+    
+    while len(selected) < limit:
+        candidates = np.array([j for j in range(1, len(matrix) - 1)
+                               if j not in selected and base[j] > 0 and matrix[j, j] > ALIAS_TOLERANCE * base[j]])
+        if len(candidates) == 0:
+            break
+        gains = matrix[candidates, -1] ** 2 / matrix[candidates, candidates]
+        best = int(candidates[np.argmax(gains)])
+        sse = matrix[-1, -1] - gains.max()
+        value = _information_criterion(sse, n, weight_sum, len(selected) + 2, criterion)
+        if value >= current:
+            break
+        _sweep(matrix, best)
+        selected.append(best)
+        current = value
+        steps.append({'Paso': len(selected), 'Variable': best, 'Predictores': len(selected),
+                      'SSE': matrix[-1, -1], 'R²': 1 - matrix[-1, -1] / sst, criterion.upper(): value})
+    
+    return selected, pd.DataFrame(steps)
+
+def backward_stepwise(gram, n, criterion='bic'):
+    """
+    Eliminación hacia atrás: parte de todos los predictores no colineales y
+    en cada paso sale el que menos aumenta la suma de cuadrados residual
+    (β² / -pivote), mientras el criterio no empeore
+    """
+    matrix = _centered(gram)
+    weight_sum, sst = gram[0, 0], matrix[-1, -1]
+    selected = _eligible(matrix)
+    for j in selected:
+        _sweep(matrix, j)
+    current = _information_criterion(matrix[-1, -1], n, weight_sum, len(selected) + 1, criterion)
+    steps = [{'Paso': 0, 'Variable': None, 'Predictores': len(selected), 'SSE': matrix[-1, -1],
+              'R²': 1 - matrix[-1, -1] / sst, criterion.upper(): current}]
+    
+    while selected:
+        indices = np.array(selected)
+        costs = matrix[indices, -1] ** 2 / -matrix[indices, indices]
+        worst = int(indices[np.argmin(costs)])
+        sse = matrix[-1, -1] + costs.min()
+        value = _information_criterion(sse, n, weight_sum, len(selected), criterion)
+        if value > current:
+            break
+        _sweep(matrix, worst, reverse=True)
+        selected.remove(worst)
+        current = value
+        steps.append({'Paso': len(steps), 'Variable': worst, 'Predictores': len(selected),
+                      'SSE': matrix[-1, -1], 'R²': 1 - matrix[-1, -1] / sst, criterion.upper(): value})
+    
+    return selected, pd.DataFrame(steps)
+
+def _varying(centered):
+    """
+    Predictores con varianza no nula (candidatos del mejor subconjunto)
+    """
+    return [j for j in range(1, len(centered) - 1) if centered[j, j] > 0]
+
+def best_subset(gram, n, criterion='bic'):
+    """
+    Mejor subconjunto de cada tamaño recorriendo todos los subconjuntos en
+    orden de código Gray: cada paso entra o sale un solo predictor con un
+    barrido. Un predictor cuyo pivote colapsa queda pendiente hasta que salga
+    la variable con la que es colineal, y los subconjuntos con pendientes no
+    se evalúan (no tienen rango completo). Al final se recalcula cada ganador
+    desde cero para evitar la deriva numérica y se elige el tamaño por el
+    criterio de información
+    """
+    centered = _centered(gram)
+    candidates = _varying(centered)
+    if len(candidates) > BEST_SUBSET_MAX_PREDICTORS:
+        raise ValueError(f"El mejor subconjunto admite hasta {BEST_SUBSET_MAX_PREDICTORS} predictores")
+    
+    indices = [0] + candidates + [len(centered) - 1]
+    matrix = centered[np.ix_(indices, indices)].copy()
+    base = np.diag(matrix)[1:-1].copy()
+    weight_sum, sst = gram[0, 0], centered[-1, -1]
+    best_sse = np.full(len(candidates) + 1, np.inf)
+    best_masks = [None] * (len(candidates) + 1)
+    best_sse[0] = sst
+    best_masks[0] = np.zeros(len(candidates), dtype=bool)
+    inside = np.zeros(len(candidates), dtype=bool)
+    swept = np.zeros(len(candidates), dtype=bool)
+    for step in range(1, 2 ** len(candidates)):
+        bit = (step & -step).bit_length() - 1
+        inside[bit] = not inside[bit]
+        if swept[bit]:
+            _sweep(matrix, bit + 1, reverse=True)
+            swept[bit] = False
+        # Barre los pendientes cuyo pivote ya no colapsa
+        for i in np.flatnonzero(inside & ~swept):
+            if matrix[i + 1, i + 1] > ALIAS_TOLERANCE * base[i]:
+                _sweep(matrix, i + 1)
+                swept[i] = True
+        if not np.array_equal(inside, swept):
+            continue
+        size = int(inside.sum())
+        if matrix[-1, -1] < best_sse[size]:
+            best_sse[size] = matrix[-1, -1]
+            best_masks[size] = inside.copy()
+    
+    rows = []
+    for size, mask in enumerate(best_masks):
+        if mask is None:
+            continue
+        subset = [candidates[i] for i in np.flatnonzero(mask)]
+        exact = centered.copy()
+        for j in subset:
+            _sweep(exact, j)
+        rows.append({'Predictores': size, 'Variables': subset, 'SSE': exact[-1, -1], 'R²': 1 - exact[-1, -1] / sst,
+                     criterion.upper(): _information_criterion(exact[-1, -1], n, weight_sum, size + 1, criterion)})
+    table = pd.DataFrame(rows)
+    best = int(table[criterion.upper()].idxmin())
+    return list(table.loc[best, 'Variables']), table
+
+def elastic_net_path(gram, l1_ratio=1.0, lambdas=None, n_lambdas=PATH_LENGTH, min_ratio=PATH_MIN_RATIO):
+    """
+    Ruta Lasso (l1_ratio=1) o ElasticNet por descenso de coordenadas sobre la
+    Gram de los predictores estandarizados: cada actualización cuesta O(p)
+    sobre el vector de productos cruzados residuales, sin recorrer filas, y
+    cada penalización parte de la solución de la anterior. Devuelve las
+    penalizaciones y los coeficientes (intercepto primero, escala desplazada)
+    """
+    centered = _centered(gram)
+    weight_sum = gram[0, 0]
+    variances = np.diag(centered)[1:-1] / weight_sum
+    scales = np.sqrt(np.clip(variances, 0, None))
+    usable = scales > 0
+    safe_scales = np.where(usable, scales, 1.0)
+    correlations = centered[1:-1, 1:-1] / (weight_sum * np.outer(safe_scales, safe_scales))
+    targets = np.where(usable, centered[1:-1, -1] / (weight_sum * safe_scales), 0.0)
+    
+    if lambdas is None:
+        lambda_max = np.abs(targets).max() / max(l1_ratio, 1e-3) if len(targets) else 0.0
+        lambdas = lambda_max * np.logspace(0, np.log10(min_ratio), n_lambdas)
+    lambdas = np.asarray(lambdas, dtype='float64')
+    
+    coefficients = np.zeros(len(targets))
+    residual = targets.copy()
+    candidates = np.flatnonzero(usable)
+    tolerance = PATH_TOLERANCE * np.sqrt(max(centered[-1, -1], 0.0) / weight_sum)
+    
+    def coordinate_pass(indices, threshold, shrinkage):
+        max_delta = 0.0
+        for j in indices:
+            rho = residual[j] + coefficients[j]
+            if rho > threshold:
+                updated = (rho - threshold) / shrinkage
+            elif rho < -threshold:
+                updated = (rho + threshold) / shrinkage
+            else:
+                updated = 0.0
+            delta = updated - coefficients[j]
+            if delta != 0.0:
+                residual[:] -= correlations[j] * delta
+                coefficients[j] = updated
+                max_delta = max(max_delta, abs(delta))
+        return max_delta
+    
+    path = np.zeros((len(lambdas), len(targets)))
+    for i, penalty in enumerate(lambdas):
+        threshold = penalty * l1_ratio
+        shrinkage = 1 + penalty * (1 - l1_ratio)
+        # Conjunto activo: se itera sobre los coeficientes no nulos hasta
+        # converger y una pasada completa confirma que no entra ningún otro
+        for _ in range(PATH_MAX_ITER):
+            if coordinate_pass(candidates, threshold, shrinkage) < tolerance:
+                break
+            active = np.flatnonzero(coefficients)
+            for _ in range(PATH_MAX_ITER):
+                if coordinate_pass(active, threshold, shrinkage) < tolerance:
+                    break
+        path[i] = coefficients
+    
+    slopes = path / safe_scales
+    intercepts = gram[0, -1] / weight_sum - slopes @ (gram[0, 1:-1] / weight_sum)
+    return lambdas, np.column_stack([intercepts, slopes])
+
+def _penalized_selection(accumulator, l1_ratio, criterion):
+    """
+    Elige la penalización por validación cruzada con las Gram de cada
+    partición (entrena con el total menos la partición y evalúa con ella);
+    sin particiones, por el criterio de información
+    """
+    total = accumulator.gram()
+    lambdas, path = elastic_net_path(total, l1_ratio)
+    active = (np.abs(path[:, 1:]) > 0).sum(axis=1)
+    
+    if accumulator.n_folds >= 2 and np.all(accumulator.counts > 0):
+        errors = np.zeros(len(lambdas))
+        weight_sum = 0.0
+        for fold in range(accumulator.n_folds):
+            train = accumulator.gram([other for other in range(accumulator.n_folds) if other != fold])
+            _, fold_path = elastic_net_path(train, l1_ratio, lambdas=lambdas)
+            fold_gram = accumulator.gram([fold])
+            errors += [residual_squares(fold_gram, coefficients)[0] for coefficients in fold_path]
+            weight_sum += fold_gram[0, 0]
+        scores = np.sqrt(errors / weight_sum)
+        score_name = 'RMSE (validación cruzada)'
+    else:
+        n = int(accumulator.counts.sum())
+        scores = np.array([_information_criterion(residual_squares(total, coefficients)[0], n, total[0, 0], k + 1, criterion)
+                           for coefficients, k in zip(path, active)])
+        score_name = criterion.upper()
+    
+    best = int(np.argmin(scores))
+    table = pd.DataFrame({'Penalización (λ)': lambdas, 'Predictores activos': active, score_name: scores})
+    return best, path[best], table
+
+def select_predictors(accumulator, method='auto', criterion='bic', l1_ratio=ELASTICNET_L1_RATIO):
+    """
+    Selección automática de predictores sobre las estadísticas suficientes
+    de un OLSAccumulator: 'forward', 'backward', 'best_subset', 'lasso',
+    'elasticnet' o 'auto' (mejor subconjunto para pocos predictores, Lasso
+    para muchos). Devuelve los predictores elegidos, la tabla del proceso y
+    el ajuste completo (inferencia y validación cruzada) del modelo elegido
+    """
+    if method not in SELECTION_METHODS + ['auto']:
+        raise ValueError(f"Método de selección desconocido: {method}")
+    if accumulator.shift is None:
+        raise ValueError("No hay filas completas para la regresión")
+    
+    gram = accumulator.gram()
+    if method == 'auto':
+        n_candidates = len(_varying(_centered(gram)))
+        method = 'best_subset' if n_candidates <= BEST_SUBSET_MAX_PREDICTORS else 'lasso'
+    n = int(accumulator.counts.sum())
+    penalized = None
+    if method == 'forward':
+        positions, steps = forward_stepwise(gram, n, criterion)
+    elif method == 'backward':
+        positions, steps = backward_stepwise(gram, n, criterion)
+    elif method == 'best_subset':
+        positions, steps = best_subset(gram, n, criterion)
+        steps['Variables'] = [', '.join(accumulator.columns[j - 1] for j in subset) for subset in steps['Variables']]
+    else:
+        _, coefficients, steps = _penalized_selection(accumulator, 1.0 if method == 'lasso' else l1_ratio, criterion)
+        positions = [j + 1 for j in np.flatnonzero(coefficients[1:])]
+        penalized = pd.Series(accumulator.unshifted(coefficients), index=['Intercepto'] + accumulator.columns)
+    
+    if 'Variable' in steps:
+        steps['Variable'] = [None if j is None or pd.isna(j) else accumulator.columns[int(j) - 1] for j in steps['Variable']]
+    selected = [accumulator.columns[j - 1] for j in sorted(positions)]
+    subset = accumulator.subset(selected)
+    return {
+        'method': method,
+        'selected': selected,
+        'steps': steps,
+        'penalized_coefficients': penalized,
+        'accumulator': subset,
+        'fit': subset.fit()
+    }
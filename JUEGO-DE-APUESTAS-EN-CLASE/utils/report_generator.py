@@ -2,6 +2,12 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 
+from utils.row_index import count_duplicates
+from utils.dataset_profile import get_dataset_profile
+from utils.correlation_pairs import strongest_pair
+from utils.correlation_matrix import get_correlation_matrix
+from utils.outliers import get_outlier_masks
+
 def generate_report(data, analysis_results):
     """
     Genera un reporte completo del análisis de datos
@@ -31,7 +37,7 @@ def generate_executive_summary(data):
 
 Se analizó un dataset con {n_rows:,} registros y {n_cols} variables, compuesto por {numeric_cols} variables numéricas y {categorical_cols} variables categóricas. 
 
-**Calidad de los datos:** El dataset presenta un {completeness:.1f}% de completitud, con {data.isnull().sum().sum()} valores faltantes en total. Se identificaron {data.duplicated().sum()} registros duplicados.
+**Calidad de los datos:** El dataset presenta un {completeness:.1f}% de completitud, con {data.isnull().sum().sum()} valores faltantes en total. Se identificaron {count_duplicates(data)} registros duplicados.
 
 **Alcance del análisis:** Se realizó un análisis estadístico completo que incluye estadísticas descriptivas, detección de valores atípicos, análisis de correlaciones, visualizaciones interactivas y técnicas de análisis avanzado.
 
@@ -64,24 +70,17 @@ def generate_key_findings(data, analysis_results):
     # Hallazgos sobre variables numéricas
     if len(numeric_cols) > 0:
         # Variable con mayor variabilidad
-        cv_values = (data[numeric_cols].std() / data[numeric_cols].mean()) * 100
+        cv_values = get_dataset_profile(data).coefficient_of_variation()
         high_var_col = cv_values.idxmax()
         findings.append(f"La variable '{high_var_col}' presenta la mayor variabilidad (CV: {cv_values.max():.1f}%)")
         
         # Correlaciones fuertes
         if len(numeric_cols) > 1:
-            corr_matrix = data[numeric_cols].corr()
-            max_corr = 0
-            corr_vars = None
-            
-            for i in range(len(corr_matrix.columns)):
-                for j in range(i+1, len(corr_matrix.columns)):
-                    corr_val = abs(corr_matrix.iloc[i, j])
-                    if not np.isnan(corr_val) and corr_val > max_corr:
-                        max_corr = corr_val
-                        corr_vars = (corr_matrix.columns[i], corr_matrix.columns[j])
+            corr_matrix = get_correlation_matrix(data)
+            strongest = strongest_pair(corr_matrix)
             
-            if max_corr > 0.7:
+            if strongest is not None and strongest[2] > 0.7:
+                corr_vars, max_corr = strongest[:2], strongest[2]
                 findings.append(f"Se identificó una correlación fuerte ({max_corr:.3f}) entre '{corr_vars[0]}' y '{corr_vars[1]}'")
     
     # Hallazgos sobre variables categóricas
@@ -123,7 +122,7 @@ def generate_insights(data, analysis_results):
     # Insights sobre distribuciones
     if len(numeric_cols) > 0:
         # Detectar asimetría
-        skewness = data[numeric_cols].skew()
+        skewness = get_dataset_profile(data).stats['skew']
         highly_skewed = skewness[abs(skewness) > 1].index.tolist()
         
         if len(highly_skewed) > 0:
@@ -138,14 +137,8 @@ def generate_insights(data, analysis_results):
     
     # Insights sobre valores atípicos
     if len(numeric_cols) > 0:
-        outlier_info = []
-        for col in numeric_cols:
-            Q1 = data[col].quantile(0.25)
-            Q3 = data[col].quantile(0.75)
-            IQR = Q3 - Q1
-            outliers = data[(data[col] < Q1 - 1.5 * IQR) | (data[col] > Q3 + 1.5 * IQR)]
-            if len(outliers) > len(data) * 0.05:  # Más del 5% son outliers
-                outlier_info.append(col)
+        iqr_counts = get_outlier_masks(data).iqr_counts
+        outlier_info = iqr_counts[iqr_counts > len(data) * 0.05].index.tolist()  # Más del 5% son outliers
         
         if outlier_info:
             insights.append(f"Las variables {', '.join(outlier_info)} contienen una proporción significativa de valores atípicos")
@@ -170,7 +163,7 @@ def generate_insights(data, analysis_results):
     
     # Insights sobre escalas y rangos
     if len(numeric_cols) > 1:
-        ranges = data[numeric_cols].max() - data[numeric_cols].min()
+        ranges = get_dataset_profile(data).range()
         if ranges.max() / ranges.min() > 100:
             insights.append("Las variables numéricas operan en escalas muy diferentes, considerar normalización para análisis comparativos")
     
@@ -194,14 +187,8 @@ def generate_recommendations(data, analysis_results):
     
     # Recomendaciones sobre outliers
     if len(numeric_cols) > 0:
-        high_outlier_cols = []
-        for col in numeric_cols:
-            Q1 = data[col].quantile(0.25)
-            Q3 = data[col].quantile(0.75)
-            IQR = Q3 - Q1
-            outliers = data[(data[col] < Q1 - 1.5 * IQR) | (data[col] > Q3 + 1.5 * IQR)]
-            if len(outliers) > len(data) * 0.1:
-                high_outlier_cols.append(col)
+        iqr_counts = get_outlier_masks(data).iqr_counts
+        high_outlier_cols = iqr_counts[iqr_counts > len(data) * 0.1].index.tolist()
         
         if high_outlier_cols:
             recommendations.append("Investigar y tratar valores atípicos en variables clave para mejorar la robustez del análisis")
@@ -0,0 +1,155 @@
+import weakref
+import numpy as np
+import pandas as pd
+
+# Índices ya construidos, por identidad del DataFrame
+_index_cache = {}
+
+def hash_rows(data):
+    """
+    Hash vectorizado de 64 bits por fila (las filas iguales, incluidos NaN, tienen el mismo hash;
+    -0.0 se normaliza a 0.0 porque pandas los considera iguales)
+    """
+    floats = data.select_dtypes(include='float').columns
+    if len(floats) > 0:
+        data = data.copy(deep=False)
+        data[floats] = data[floats] + 0.0
+    return pd.util.hash_pandas_object(data, index=False).to_numpy()
+
+class RowHashIndex:
+    """
+    Índice de hashes de filas para detectar duplicados sin comparar todas las
+    filas: un hash repetido solo propone candidatas, que pandas confirma (el
+    hash trata igual 1 y '1' en columnas object). Se actualiza de forma
+    incremental al agregar o filtrar filas
+    """
+    
+    def __init__(self, data):
+        self.columns = list(data.columns)
+        self.hashes = pd.Series(hash_rows(data), index=data.index)
+        self._counts = self.hashes.value_counts()
+    
+    def __len__(self):
+        return len(self.hashes)
+    
+    def _candidates(self):
+        """
+        Posiciones de las filas cuyo hash se repite
+        """
+        if len(self._counts) == len(self.hashes):
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(self.hashes.duplicated(keep=False).to_numpy())
+    
+    def duplicate_count(self, data):
+        """
+        Número de filas duplicadas (igual que data.duplicated().sum())
+        """
+        return int(self.duplicated_mask(data).sum())
+    
+    def duplicated_mask(self, data, keep='first'):
+        """
+        Máscara de filas duplicadas alineada con el índice del dataset (igual
+        que data.duplicated(keep=keep)); solo se comparan las candidatas
+        """
+        mask = np.zeros(len(self.hashes), dtype=bool)
+        candidates = self._candidates()
+        if len(candidates) > 0:
+            mask[candidates] = data.iloc[candidates].duplicated(keep=keep).to_numpy()
+        return pd.Series(mask, index=self.hashes.index)
+    
+    def duplicate_groups(self, data, max_groups=20):
+        """
+        Grupos de filas idénticas, del más grande al más pequeño.
+        Devuelve un DataFrame con el número de grupo, su tamaño y las filas
+        """
+        candidates = self._candidates()
+        if len(candidates) > 0:
+            candidates = candidates[data.iloc[candidates].duplicated(keep=False).to_numpy()]
+        if len(candidates) == 0:
+            return pd.DataFrame(columns=['Grupo', 'Repeticiones'] + self.columns)
+        
+        # Conteos de las filas confirmadas (los de _counts no siguen el orden
+        # por frecuencia tras agregar o filtrar filas)
+        confirmed = self.hashes.iloc[candidates]
+        repeated = confirmed.value_counts().sort_values(ascending=False, kind='stable').head(max_groups)
+        group_numbers = pd.Series(np.arange(1, len(repeated) + 1), index=repeated.index)
+        in_groups = confirmed[confirmed.isin(repeated.index)]
+        
+        groups = data.loc[in_groups.index].copy()
+        groups.insert(0, 'Repeticiones', repeated.loc[in_groups.to_numpy()].to_numpy())
+        groups.insert(0, 'Grupo', group_numbers.loc[in_groups.to_numpy()].to_numpy())
+        
+        return groups.sort_values('Grupo', kind='stable')
+    
+    def drop_duplicates(self, data, keep='first'):
+        """
+        Elimina las filas duplicadas y registra el índice del resultado
+        """
+        keep_mask = ~self.duplicated_mask(data, keep=keep).to_numpy()
+        deduplicated = data[keep_mask]
+        register_row_index(deduplicated, self.filter(keep_mask))
+        return deduplicated
+    
+    def append(self, new_rows):
+        """
+        Nuevo índice con filas agregadas: solo se calcula el hash de las nuevas
+        """
+        new_hashes = pd.Series(hash_rows(new_rows[self.columns]), index=new_rows.index)
+        appended = RowHashIndex.__new__(RowHashIndex)
+        appended.columns = self.columns
+        appended.hashes = pd.concat([self.hashes, new_hashes])
+        appended._counts = self._counts.add(new_hashes.value_counts(), fill_value=0).astype('int64')
+        return appended
+    
+    def filter(self, keep_mask):
+        """
+        Nuevo índice con solo las filas indicadas por una máscara booleana
+        posicional, descontando las filas eliminadas de los conteos
+        """
+        keep_mask = np.asarray(keep_mask, dtype=bool)
+        removed_counts = self.hashes[~keep_mask].value_counts()
+        filtered = RowHashIndex.__new__(RowHashIndex)
+        filtered.columns = self.columns
+        filtered.hashes = self.hashes[keep_mask]
+        counts = self._counts.sub(removed_counts, fill_value=0).astype('int64')
+        filtered._counts = counts[counts > 0]
+        return filtered
+    
+    def filter_to(self, subset):
+        """
+        Nuevo índice para un subconjunto de filas del dataset (mismas etiquetas de índice)
+        """
+        return self.filter(self.hashes.index.isin(subset.index))
+
+def _purge_dead_entries():
+    """
+    Elimina de la caché los índices de DataFrames que ya no existen
+    """
+    for key in [key for key, (ref, _) in _index_cache.items() if ref() is None]:
+        del _index_cache[key]
+
+def register_row_index(data, index):
+    """
+    Asocia un índice ya construido a un DataFrame
+    """
+    _purge_dead_entries()
+    _index_cache[id(data)] = (weakref.ref(data), index)
+
+def get_row_index(data):
+    """
+    Devuelve el índice de hashes del DataFrame, construyéndolo solo la
+    primera vez. Supone que el DataFrame no se modifica en el lugar
+    """
+    entry = _index_cache.get(id(data))
+    if entry is not None and entry[0]() is data:
+        return entry[1]
+    
+    index = RowHashIndex(data)
+    register_row_index(data, index)
+    return index
+
+def count_duplicates(data):
+    """
+    Número de filas duplicadas usando el índice compartido
+    """
+    return get_row_index(data).duplicate_count(data)
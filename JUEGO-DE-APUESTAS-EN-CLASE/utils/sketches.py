@@ -0,0 +1,498 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.data_loader import iter_csv_chunks, number_to_text, DEFAULT_CHUNK_ROWS
+
+# Precisión del HyperLogLog: 2^12 registros -> error relativo ~1.6%
+HLL_PRECISION = 12
+
+# Parámetro k del sketch de cuantiles KLL: k=200 -> error de rango ~1.3%
+KLL_K = 200
+
+# Contadores del sketch de valores frecuentes (Misra-Gries)
+HEAVY_HITTERS_K = 64
+
+_HASH_MULTIPLIER = np.uint64(0x100000001B3)
+
+def hash_series(series):
+    """
+    Hash vectorizado de 64 bits de cada valor de una columna. Los números se
+    llevan a float64 (también los textos numéricos) para que 1, 1.0 y '1'
+    tengan el mismo hash aunque cada bloque haya inferido un tipo distinto
+    """
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return pd.util.hash_pandas_object(series.astype('float64'), index=False).to_numpy()
+    
+    hashes = pd.util.hash_pandas_object(series, index=False).to_numpy().copy()
+    if pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+        as_number = pd.to_numeric(series, errors='coerce')
+        numeric_mask = as_number.notna().to_numpy()
+        if numeric_mask.any():
+            hashes[numeric_mask] = pd.util.hash_pandas_object(as_number[numeric_mask].astype('float64'), index=False).to_numpy()
+    return hashes
+
+def combine_hashes(column_hashes):
+    """
+    Combina los hashes de varias columnas en un hash por fila
+    """
+    row_hashes = None
+    for hashes in column_hashes:
+        if row_hashes is None:
+            row_hashes = hashes.copy()
+        else:
+            row_hashes = (row_hashes * _HASH_MULTIPLIER) ^ hashes
+    return row_hashes
+
+def _leading_zeros64(values):
+    """
+    Cuenta los ceros a la izquierda de enteros de 64 bits sin signo
+    """
+    values = values.copy()
+    zeros = np.zeros(len(values), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        mask = values < (np.uint64(1) << np.uint64(64 - shift))
+        zeros[mask] += shift
+        values[mask] <<= np.uint64(shift)
+    zeros[values == 0] = 64
+    return zeros
+
+class HyperLogLog:
+    """
+    Estimador de valores distintos (HyperLogLog) que se puede fusionar
+    """
+    
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+    
+    def update_hashes(self, hashes):
+        """
+        Agrega hashes de 64 bits ya calculados
+        """
+        if len(hashes) == 0:
+            return
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        remainder = hashes << np.uint64(self.precision)
+        rank = np.minimum(_leading_zeros64(remainder) + 1, 64 - self.precision + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+    
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+    
+    def count(self):
+        """
+        Estimación del número de valores distintos
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        empty_registers = np.count_nonzero(self.registers == 0)
+        # Corrección para rangos pequeños (conteo lineal)
+        if estimate <= 2.5 * m and empty_registers > 0:
+            estimate = m * np.log(m / empty_registers)
+        return int(round(estimate))
+    
+    @property
+    def relative_error(self):
+        """
+        Error relativo típico (una desviación estándar)
+        """
+        return 1.04 / np.sqrt(len(self.registers))
+
+class KLLSketch:
+    """
+    Sketch de cuantiles KLL: niveles de buffers que se compactan conservando
+    uno de cada dos elementos ordenados, cada nivel con el doble de peso
+    """
+    
+    def __init__(self, k=KLL_K, seed=0):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+    
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+    
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(self.levels[level])
+                # Con una cantidad impar, un elemento se queda en el nivel
+                keep = items[-1:] if len(items) % 2 == 1 else items[:0]
+                items = items[:len(items) - len(keep)]
+                promoted = items[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+    
+    def update(self, values):
+        """
+        Agrega valores numéricos (los NaN se ignoran)
+        """
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+    
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+    
+    def quantile(self, q):
+        """
+        Cuantil aproximado; q puede ser un número o una lista
+        """
+        items = np.concatenate(self.levels)
+        if len(items) == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        weights = np.concatenate([np.full(len(level_items), 2.0 ** level) for level, level_items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items = items[order]
+        cumulative = np.cumsum(weights[order])
+        targets = np.asarray(q, dtype=np.float64) * cumulative[-1]
+        positions = np.minimum(np.searchsorted(cumulative, targets, side='left'), len(items) - 1)
+        return items[positions]
+    
+    @property
+    def rank_error(self):
+        """
+        Error de rango normalizado (aprox. 99% de confianza)
+        """
+        return 2.296 / self.k ** 0.9723
+
+class MomentSketch:
+    """
+    Conteo, media y momentos centrales M2..M4 que se fusionan con las
+    fórmulas de Chan/Pébay; también guarda mínimo y máximo exactos
+    """
+    
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+        self.min = np.nan
+        self.max = np.nan
+    
+    @classmethod
+    def from_values(cls, values):
+        sketch = cls()
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return sketch
+        deviations = values - values.mean()
+        squared = deviations ** 2
+        sketch.n = len(values)
+        sketch.mean = float(values.mean())
+        sketch.m2 = float(squared.sum())
+        sketch.m3 = float((squared * deviations).sum())
+        sketch.m4 = float((squared ** 2).sum())
+        sketch.min = float(values.min())
+        sketch.max = float(values.max())
+        return sketch
+    
+    def update(self, values):
+        return self.merge(MomentSketch.from_values(values))
+    
+    def merge(self, other):
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.__dict__.update(other.__dict__)
+            return self
+        
+        na, nb = self.n, other.n
+        n = na + nb
+        delta = other.mean - self.mean
+        m2 = self.m2 + other.m2 + delta ** 2 * na * nb / n
+        m3 = (self.m3 + other.m3 + delta ** 3 * na * nb * (na - nb) / n ** 2
+              + 3 * delta * (na * other.m2 - nb * self.m2) / n)
+        m4 = (self.m4 + other.m4 + delta ** 4 * na * nb * (na ** 2 - na * nb + nb ** 2) / n ** 3
+              + 6 * delta ** 2 * (na ** 2 * other.m2 + nb ** 2 * self.m2) / n ** 2
+              + 4 * delta * (na * other.m3 - nb * self.m3) / n)
+        
+        self.mean = self.mean + delta * nb / n
+        self.m2, self.m3, self.m4 = m2, m3, m4
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+    
+    def var(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else np.nan
+    
+    def std(self):
+        return np.sqrt(self.var()) if self.n > 1 else np.nan
+    
+    def skew(self):
+        """
+        Asimetría muestral ajustada, igual que pandas
+        """
+        n = self.n
+        if n < 3 or self.m2 == 0:
+            return np.nan if n < 3 else 0.0
+        return np.sqrt(n * (n - 1)) / (n - 2) * (self.m3 / n) / (self.m2 / n) ** 1.5
+    
+    def kurtosis(self):
+        """
+        Curtosis en exceso muestral ajustada, igual que pandas
+        """
+        n = self.n
+        if n < 4 or self.m2 == 0:
+            return np.nan if n < 4 else 0.0
+        adjustment = 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+        return n * (n + 1) * (n - 1) * self.m4 / ((n - 2) * (n - 3) * self.m2 ** 2) - adjustment
+
+class MisraGries:
+    """
+    Sketch de valores frecuentes (Misra-Gries). Cada conteo estimado
+    subestima el real como mucho en error_bound
+    """
+    
+    def __init__(self, k=HEAVY_HITTERS_K):
+        self.k = k
+        self.counts = {}
+        self.error_bound = 0
+    
+    def _reduce(self):
+        if len(self.counts) <= self.k:
+            return
+        ordered = sorted(self.counts.values(), reverse=True)
+        decrement = ordered[self.k]
+        self.error_bound += decrement
+        self.counts = {value: count - decrement for value, count in self.counts.items() if count > decrement}
+    
+    def update_counts(self, value_counts):
+        """
+        Agrega conteos ya agregados (por ejemplo value_counts de un bloque)
+        """
+        for value, count in value_counts.items():
+            self.counts[value] = self.counts.get(value, 0) + int(count)
+        self._reduce()
+    
+    def merge(self, other):
+        self.error_bound += other.error_bound
+        self.update_counts(other.counts)
+        return self
+    
+    def top(self, n=1):
+        """
+        Valores más frecuentes como lista de (valor, conteo estimado)
+        """
+        try:
+            # Entre empates, el menor valor, igual que mode()
+            return sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))[:n]
+        except TypeError:
+            return sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:n]
+
+class ColumnSketch:
+    """
+    Resumen aproximado y fusionable de una columna
+    """
+    
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.nulls = 0
+        self.dtypes = set()
+        self.is_numeric = True
+        self.memory_bytes = 0
+        self.distinct = HyperLogLog()
+        self.moments = MomentSketch()
+        self.quantiles = KLLSketch()
+        self.heavy_hitters = MisraGries()
+    
+    def update(self, series, hashes=None):
+        """
+        Agrega un bloque de valores de la columna
+        """
+        self.rows += len(series)
+        self.nulls += int(series.isna().sum())
+        self.dtypes.add(str(series.dtype))
+        self.memory_bytes += int(series.memory_usage(deep=True, index=False))
+        
+        if hashes is None:
+            hashes = hash_series(series)
+        self.distinct.update_hashes(hashes[series.notna().to_numpy()])
+        
+        numeric = pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+        # Una columna es numérica solo si lo fue en todos los bloques
+        self.is_numeric = self.is_numeric and numeric
+        if numeric:
+            values = series.to_numpy(dtype='float64', na_value=np.nan)
+            self.moments.update(values)
+            self.quantiles.update(values)
+        value_counts = series.value_counts(sort=False, dropna=True)
+        if numeric:
+            # Claves como texto para que coincidan con bloques donde la columna se leyó como texto
+            value_counts.index = value_counts.index.map(number_to_text)
+            value_counts = value_counts.groupby(level=0).sum()
+        self.heavy_hitters.update_counts(value_counts)
+    
+    def merge(self, other):
+        self.rows += other.rows
+        self.nulls += other.nulls
+        self.dtypes |= other.dtypes
+        self.is_numeric = self.is_numeric and other.is_numeric
+        self.memory_bytes += other.memory_bytes
+        self.distinct.merge(other.distinct)
+        self.moments.merge(other.moments)
+        self.quantiles.merge(other.quantiles)
+        self.heavy_hitters.merge(other.heavy_hitters)
+        return self
+    
+    @property
+    def dtype(self):
+        if len(self.dtypes) == 1:
+            return next(iter(self.dtypes))
+        return 'mixto (' + ', '.join(sorted(self.dtypes)) + ')'
+    
+    def distinct_count(self):
+        """
+        Valores distintos estimados (nunca más que los valores no nulos)
+        """
+        return min(self.distinct.count(), self.rows - self.nulls)
+
+class DatasetSketch:
+    """
+    Resumen aproximado de un dataset leído por bloques. Los sketches de
+    distintos bloques o archivos se combinan con merge()
+    """
+    
+    def __init__(self):
+        self.columns = {}
+        self.rows = 0
+        self.row_distinct = HyperLogLog()
+    
+    def update(self, chunk):
+        """
+        Agrega un bloque de filas
+        """
+        self.rows += len(chunk)
+        column_hashes = []
+        for col in chunk.columns:
+            if col not in self.columns:
+                self.columns[col] = ColumnSketch(col)
+            hashes = hash_series(chunk[col])
+            column_hashes.append(hashes)
+            self.columns[col].update(chunk[col], hashes)
+        
+        if column_hashes:
+            self.row_distinct.update_hashes(combine_hashes(column_hashes))
+        return self
+    
+    def merge(self, other):
+        for col, column_sketch in other.columns.items():
+            if col in self.columns:
+                self.columns[col].merge(column_sketch)
+            else:
+                self.columns[col] = column_sketch
+        self.rows += other.rows
+        self.row_distinct.merge(other.row_distinct)
+        return self
+    
+    def basic_info(self):
+        """
+        Equivalente aproximado de get_basic_info, con márgenes de error
+        """
+        distinct_rows = min(self.row_distinct.count(), self.rows)
+        duplicates_error = int(round(distinct_rows * self.row_distinct.relative_error))
+        numeric_columns = sum(1 for sketch in self.columns.values() if sketch.is_numeric)
+        
+        return {
+            'rows': self.rows,
+            'columns': len(self.columns),
+            'null_values': sum(sketch.nulls for sketch in self.columns.values()),
+            'duplicates': max(self.rows - distinct_rows, 0),
+            'duplicates_error': duplicates_error,
+            'memory_usage': f"{sum(sketch.memory_bytes for sketch in self.columns.values()) / 1024 / 1024:.2f} MB",
+            'numeric_columns': numeric_columns,
+            'categorical_columns': len(self.columns) - numeric_columns,
+            'approximate': True
+        }
+    
+    def column_info(self):
+        """
+        Equivalente aproximado de get_column_info. Incluye columnas con el
+        error de cada estimación: relativo para únicos, de rango para la
+        mediana y absoluto (por defecto) para el conteo del valor más frecuente
+        """
+        column_info = []
+        for col, sketch in self.columns.items():
+            unique_values = sketch.distinct_count()
+            info = {
+                'column': col,
+                'dtype': sketch.dtype,
+                'null_count': sketch.nulls,
+                'null_percentage': (sketch.nulls / sketch.rows) * 100 if sketch.rows > 0 else np.nan,
+                'unique_values': unique_values,
+                'unique_percentage': (unique_values / sketch.rows) * 100 if sketch.rows > 0 else np.nan,
+                'unique_error_pct': round(sketch.distinct.relative_error * 100, 2)
+            }
+            
+            if sketch.is_numeric:
+                info.update({
+                    'min': sketch.moments.min,
+                    'max': sketch.moments.max,
+                    'mean': sketch.moments.mean if sketch.moments.n > 0 else np.nan,
+                    'median': sketch.quantiles.quantile(0.5),
+                    'median_rank_error_pct': round(sketch.quantiles.rank_error * 100, 2),
+                    'std': sketch.moments.std(),
+                    'skew': sketch.moments.skew(),
+                    'kurtosis': sketch.moments.kurtosis()
+                })
+            else:
+                top = sketch.heavy_hitters.top(1)
+                info.update({
+                    'most_frequent': top[0][0] if top else None,
+                    'most_frequent_count': top[0][1] if top else 0,
+                    'most_frequent_count_error': sketch.heavy_hitters.error_bound
+                })
+            
+            column_info.append(info)
+        
+        return pd.DataFrame(column_info)
+
+def sketch_csv(uploaded_file, chunk_rows=DEFAULT_CHUNK_ROWS, dialect=None):
+    """
+    Recorre un CSV por bloques y construye su DatasetSketch sin cargarlo completo
+    """
+    sketch = DatasetSketch()
+    for chunk in iter_csv_chunks(uploaded_file, chunk_rows=chunk_rows, dialect=dialect):
+        sketch.update(chunk)
+    return sketch
+
+def _sketch_path(path, chunk_rows):
+    """
+    Construye el sketch de un archivo en disco (usado por el pool de procesos)
+    """
+    with open(path, 'rb') as file:
+        return sketch_csv(file, chunk_rows=chunk_rows)
+
+def sketch_csv_files(paths, chunk_rows=DEFAULT_CHUNK_ROWS, max_workers=None):
+    """
+    Construye los sketches de varios archivos en paralelo y los fusiona en uno
+    """
+    merged = DatasetSketch()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for sketch in executor.map(_sketch_path, paths, [chunk_rows] * len(paths)):
+            merged.merge(sketch)
+    return merged
@@ -0,0 +1,246 @@
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.linalg import LinearOperator, lsmr
+
+from utils.dataset_profile import dataset_fingerprint
+from utils.ols_engine import fold_ids, OLS_FOLDS, OLS_SEED, ALIAS_TOLERANCE
+
+# Máximo de niveles para usar una columna no numérica como predictor (más
+# niveles suelen ser identificadores)
+CATEGORICAL_MAX_LEVELS = 100
+
+# Nivel que reciben los valores faltantes o vacíos de una variable categórica
+MISSING_LEVEL = 'Sin dato'
+
+# Tolerancias de LSMR (residuo relativo y condición de optimalidad)
+SPARSE_TOLERANCE = 1e-10
+
+# Escala de las indicadoras en el clustering: dos filas con distinto nivel
+# quedan a distancia 1, como una desviación estándar en una variable numérica
+CLUSTER_DUMMY_SCALE = np.sqrt(0.5)
+
+# Número de versiones del dataset cuyas columnas categóricas se recuerdan
+CATEGORICAL_CACHE_SIZE = 4
+
+# Columnas categóricas ya detectadas, por huella del contenido y máximo de niveles
+_categorical_cache = OrderedDict()
+
+def _levels(series):
+    """
+    Códigos y niveles de una columna (texto sin espacios; vacío cuenta como faltante)
+    """
+    values = series.astype('string').str.strip()
+    values = values.mask(values == '')
+    codes, levels = pd.factorize(values, sort=True)
+    return codes, [str(level) for level in levels]
+
+def categorical_columns(data, max_levels=CATEGORICAL_MAX_LEVELS, exclude=()):
+    """
+    Columnas no numéricas utilizables como predictores categóricos: entre 2
+    y max_levels niveles (las constantes y los identificadores no aportan)
+    """
+    columns = []
+    for col in data.select_dtypes(include=['object', 'category', 'string', 'bool']).columns:
+        if col in exclude:
+            continue
+        codes, levels = _levels(data[col])
+        n_levels = len(levels) + int((codes < 0).any())
+        if 2 <= n_levels <= max_levels:
+            columns.append(col)
+    return columns
+
+def get_categorical_columns(data, max_levels=CATEGORICAL_MAX_LEVELS, exclude=()):
+    """
+    categorical_columns de la versión actual del dataset, calculada una sola
+    vez por huella del contenido (factorizar cada columna de texto en cada
+    recarga de la aplicación es costoso)
+    """
+    key = (dataset_fingerprint(data), max_levels)
+    columns = _categorical_cache.get(key)
+    if columns is not None:
+        _categorical_cache.move_to_end(key)
+    else:
+        columns = categorical_columns(data, max_levels)
+        _categorical_cache[key] = columns
+        while len(_categorical_cache) > CATEGORICAL_CACHE_SIZE:
+            _categorical_cache.popitem(last=False)
+    return [col for col in columns if col not in exclude]
+
+def one_hot_csr(data, columns, drop_first=True):
+    """
+    Codificación one-hot como matriz CSR construida directamente desde los
+    códigos de cada nivel, sin pasar por una matriz densa. Con drop_first el
+    primer nivel (orden alfabético) de cada variable queda como referencia;
+    los faltantes forman su propio nivel
+    """
+    row_blocks, column_blocks, names = [], [], []
+    offset = 0
+    first = 1 if drop_first else 0
+    for col in columns:
+        codes, levels = _levels(data[col])
+        if (codes < 0).any():
+            codes = np.where(codes < 0, len(levels), codes)
+            levels = levels + [MISSING_LEVEL]
+        present = codes >= first
+        row_blocks.append(np.flatnonzero(present))
+        column_blocks.append(offset + codes[present] - first)
+        names.extend(f"{col}={level}" for level in levels[first:])
+        offset += len(levels) - first
+    
+    rows = np.concatenate(row_blocks) if row_blocks else np.empty(0, dtype=np.int64)
+    cols = np.concatenate(column_blocks) if column_blocks else np.empty(0, dtype=np.int64)
+    encoded = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(data), offset))
+    return encoded, names
+
+def design_matrix(numeric_values, encoded):
+    """
+    Une el bloque numérico y el one-hot en una sola matriz CSR sin densificar
+    las variables indicadoras
+    """
+    return sparse.hstack([sparse.csr_matrix(numeric_values), encoded], format='csr')
+
+def _moments(design, weights):
+    """
+    Medias y desviaciones estándar ponderadas de las columnas de una matriz
+    CSR (cero en las columnas constantes)
+    """
+    weight_sum = weights.sum()
+    means = np.asarray(design.T @ weights).ravel() / weight_sum
+    squares = np.asarray(design.multiply(design).T @ weights).ravel() / weight_sum
+    return means, np.sqrt(np.clip(squares - means ** 2, 0, None))
+
+def _rank(design, weights):
+    """
+    Rango de la matriz de diseño centrada (sin contar el intercepto): las
+    columnas constantes, como una indicadora sin casos, y las combinaciones
+    lineales de otras no aportan. Se calcula con los autovalores de la Gram
+    estandarizada de la dimensión menor (columnas o filas). Devuelve también
+    las columnas constantes
+    """
+    weights = weights / weights.mean()
+    means, scales = _moments(design, weights)
+    used = np.flatnonzero(scales > 0)
+    constant = np.flatnonzero(scales == 0)
+    if len(used) == 0:
+        return 0, constant
+    
+    standardized = design[:, used] @ sparse.diags(1 / scales[used])
+    centers = means[used] / scales[used]
+    if len(used) <= design.shape[0]:
+        gram = (standardized.T @ standardized.multiply(weights[:, None])).toarray()
+        gram -= weights.sum() * np.outer(centers, centers)
+    else:
+        root = np.sqrt(weights)
+        rows = standardized.multiply(root[:, None]).tocsr()
+        shift = rows @ centers
+        gram = (rows @ rows.T).toarray()
+        gram -= np.outer(shift, root) + np.outer(root, shift) - (centers @ centers) * np.outer(root, root)
+    eigenvalues = np.linalg.eigvalsh(gram)
+    return int((eigenvalues > ALIAS_TOLERANCE * eigenvalues.max()).sum()), constant
+
+def _solve(design, y, weights, alpha):
+    """
+    Mínimos cuadrados ponderados (ridge si alpha > 0) con LSMR sobre un
+    operador que centra y estandariza las columnas al multiplicar: la matriz
+    centrada sería densa. alpha penaliza los coeficientes estandarizados y el
+    intercepto no se penaliza; los pesos se normalizan a media 1 para que
+    alpha tenga la misma escala con o sin factor de expansión
+    """
+    weights = weights / weights.mean()
+    weight_sum = weights.sum()
+    means, scales = _moments(design, weights)
+    scales[scales == 0] = 1.0
+    y_mean = weights @ y / weight_sum
+    root = np.sqrt(weights)
+    
+    def matvec(vector):
+        vector = np.ravel(vector) / scales
+        return root * (design @ vector - means @ vector)
+    
+    def rmatvec(vector):
+        vector = root * np.ravel(vector)
+        return (design.T @ vector - means * vector.sum()) / scales
+    
+    operator = LinearOperator(design.shape, matvec=matvec, rmatvec=rmatvec, dtype='float64')
+    result = lsmr(operator, root * (y - y_mean), damp=np.sqrt(alpha), atol=SPARSE_TOLERANCE, btol=SPARSE_TOLERANCE)
+    coef = result[0] / scales
+    return y_mean - means @ coef, coef, int(result[2])
+
+def fit_sparse_regression(design, y, columns, target, weights=None, alpha=0.0, n_folds=OLS_FOLDS, seed=OLS_SEED):
+    """
+    Regresión lineal (o ridge) sobre una matriz de diseño CSR con validación
+    cruzada k-fold (mismas particiones que OLSAccumulator). Devuelve las mismas
+    claves que OLSAccumulator.fit; sin errores estándar, que exigirían invertir
+    la matriz de todas las indicadoras, y con las predicciones fuera de la
+    partición en lugar de los coeficientes de cada partición. Los grados de
+    libertad usan el rango del diseño (las indicadoras vacías o colineales no
+    cuentan); con más parámetros que filas el modelo queda indeterminado y el
+    R² ajustado y sigma son NaN
+    """
+    design = sparse.csr_matrix(design, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    weights = np.ones(len(y)) if weights is None else np.asarray(weights, dtype='float64')
+    n_samples = design.shape[0]
+    
+    intercept, coef, iterations = _solve(design, y, weights, alpha)
+    residuals = y - intercept - design @ coef
+    weight_sum = weights.sum()
+    sse = weights @ residuals ** 2
+    sst = weights @ (y - weights @ y / weight_sum) ** 2
+    r2 = 1 - sse / sst if sst > 0 else np.nan
+    rank, constant = _rank(design, weights)
+    df_resid = n_samples - rank - 1
+    r2_adjusted = 1 - (1 - r2) * (n_samples - 1) / df_resid if df_resid > 0 else np.nan
+    
+    cv = None
+    if n_folds >= 2:
+        folds = fold_ids(np.arange(n_samples), n_folds, seed)
+        if np.all(np.bincount(folds, minlength=n_folds) > 0):
+            predictions = np.empty(n_samples)
+            rows = []
+            for fold in range(n_folds):
+                test = folds == fold
+                train = ~test
+                fold_intercept, fold_coef, _ = _solve(design[train], y[train], weights[train], alpha)
+                predictions[test] = fold_intercept + design[test] @ fold_coef
+                fold_weights = weights[test]
+                fold_sse = fold_weights @ (y[test] - predictions[test]) ** 2
+                fold_sst = fold_weights @ (y[test] - fold_weights @ y[test] / fold_weights.sum()) ** 2
+                rows.append({
+                    'Partición': fold + 1,
+                    'Filas': int(test.sum()),
+                    'R²': 1 - fold_sse / fold_sst if fold_sst > 0 else np.nan,
+                    'RMSE': np.sqrt(fold_sse / fold_weights.sum()),
+                    'SSE': fold_sse,
+                    'Peso': fold_weights.sum()
+                })
+            table = pd.DataFrame(rows)
+            cv = {
+                'folds': table[['Partición', 'Filas', 'R²', 'RMSE']],
+                'r2': float(table['R²'].mean()),
+                'rmse': float(np.sqrt(table['SSE'].sum() / table['Peso'].sum())),
+                'predictions': predictions
+            }
+    
+    return {
+        'solver': 'lsmr',
+        'target': target,
+        'coefficients': pd.DataFrame({'Coeficiente': np.r_[intercept, coef]}, index=['Intercepto'] + list(columns)),
+        'intercept': intercept,
+        'coef': coef,
+        'aliased': [columns[j] for j in constant],
+        'n_samples': n_samples,
+        'weight_sum': weight_sum,
+        'rank': rank + 1,
+        'df_resid': df_resid,
+        'sigma': np.sqrt(sse / df_resid) if df_resid > 0 else np.nan,
+        'r2': r2,
+        'r2_adjusted': r2_adjusted,
+        'rmse': np.sqrt(sse / weight_sum),
+        'alpha': alpha,
+        'iterations': iterations,
+        'nnz': design.nnz,
+        'cv': cv
+    }
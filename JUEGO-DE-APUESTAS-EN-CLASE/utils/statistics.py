@@ -1,35 +1,45 @@
 import pandas as pd
 import numpy as np
-from scipy import stats
 import streamlit as st
 
-def get_descriptive_stats(data):
+from utils.dataset_profile import get_dataset_profile, PROFILE_QUANTILES
+from utils.correlation_pairs import correlation_pairs
+from utils.correlation_matrix import get_correlation_matrix
+from utils.outliers import get_outlier_masks
+from utils.survey_weights import get_weighted_profile, get_weights, weighted_value_counts
+from utils.grouped_stats import get_grouped_stats
+from utils.distribution_tests import run_distribution_tests
+from utils.cleaning_plan import build_cleaning_plan, compile_cleaning_plan, apply_cleaning_plan, dry_run_cleaning_plan
+
+def get_descriptive_stats(data, weight_column=None):
     """
-    Calcula estadísticas descriptivas completas para el dataset
+    Calcula estadísticas descriptivas completas para el dataset. Con
+    weight_column (por ejemplo FACTOR07) todas las estadísticas se ponderan
+    por el factor de expansión
     """
     results = {}
     
-    # Variables numéricas
-    numeric_data = data.select_dtypes(include=[np.number])
-    if len(numeric_data.columns) > 0:
+    # Variables numéricas (del perfil compartido de esta versión del dataset)
+    profile = get_weighted_profile(data, weight_column) if weight_column else get_dataset_profile(data)
+    if len(profile.numeric_columns) > 0:
         # Estadísticas básicas
-        basic_stats = numeric_data.describe()
+        basic_stats = profile.describe()
         
         # Estadísticas adicionales
         additional_stats = pd.DataFrame({
-            'Media': numeric_data.mean(),
-            'Mediana': numeric_data.median(),
-            'Moda': numeric_data.mode().iloc[0] if len(numeric_data.mode()) > 0 else np.nan,
-            'Desviación Estándar': numeric_data.std(),
-            'Varianza': numeric_data.var(),
-            'Rango': numeric_data.max() - numeric_data.min(),
-            'Coef. Variación': (numeric_data.std() / numeric_data.mean()) * 100,
-            'Asimetría': numeric_data.skew(),
-            'Curtosis': numeric_data.kurtosis()
+            'Media': profile.stats['mean'],
+            'Mediana': profile.quantile(0.50),
+            'Moda': profile.stats['mode'],
+            'Desviación Estándar': profile.stats['std'],
+            'Varianza': profile.stats['var'],
+            'Rango': profile.range(),
+            'Coef. Variación': profile.coefficient_of_variation(),
+            'Asimetría': profile.stats['skew'],
+            'Curtosis': profile.stats['kurtosis']
         })
         
         # Percentiles
-        percentiles = numeric_data.quantile([0.05, 0.10, 0.25, 0.50, 0.75, 0.90, 0.95])
+        percentiles = profile.quantiles.loc[PROFILE_QUANTILES]
         
         results['numeric_stats'] = pd.concat([basic_stats, additional_stats.T])
         results['percentiles'] = percentiles
@@ -37,7 +47,20 @@ def get_descriptive_stats(data):
     
     # Variables categóricas
     categorical_data = data.select_dtypes(include=['object', 'category'])
-    if len(categorical_data.columns) > 0:
+    if len(categorical_data.columns) > 0 and weight_column:
+        weights = get_weights(data, weight_column)
+        cat_stats = {}
+        for col in categorical_data.columns:
+            value_counts = weighted_value_counts(categorical_data[col], weights)
+            cat_stats[col] = {
+                'unique_values': len(value_counts),
+                'most_frequent': value_counts.index[0] if len(value_counts) > 0 else None,
+                'most_frequent_count': value_counts.iloc[0] if len(value_counts) > 0 else 0,
+                'value_counts': value_counts,
+                'percentages': value_counts / value_counts.sum() * 100
+            }
+        results['categorical_stats'] = cat_stats
+    elif len(categorical_data.columns) > 0:
         cat_stats = {}
         for col in categorical_data.columns:
             cat_stats[col] = {
@@ -49,125 +72,70 @@ def get_descriptive_stats(data):
             }
         results['categorical_stats'] = cat_stats
     
+    results['weight_column'] = weight_column
     return results
 
+def get_grouped_descriptive_stats(data, by, columns=None):
+    """
+    Estadísticas descriptivas por grupos (por ejemplo DOMINIO, ESTRATO, MES
+    o DEPARTAMENTO), con una o varias llaves de agrupación
+    """
+    return get_grouped_stats(data, by, columns=columns)
+
 def detect_outliers(data, column, methods=['iqr', 'zscore']):
     """
-    Detecta valores atípicos usando diferentes métodos
+    Detecta valores atípicos usando diferentes métodos.
+    Las máscaras de todas las columnas se calculan una sola vez por versión del dataset
     """
     if column not in data.columns:
         raise ValueError(f"Columna '{column}' no encontrada en el dataset")
     
-    col_data = data[column].dropna()
+    masks = get_outlier_masks(data)
+    if column not in masks.columns:
+        raise ValueError(f"La columna '{column}' no es numérica")
     outliers_info = {}
     
     if 'iqr' in methods:
         # Método IQR
-        Q1 = col_data.quantile(0.25)
-        Q3 = col_data.quantile(0.75)
-        IQR = Q3 - Q1
-        lower_bound = Q1 - 1.5 * IQR
-        upper_bound = Q3 + 1.5 * IQR
-        
-        iqr_outliers = data[(data[column] < lower_bound) | (data[column] > upper_bound)].index.tolist()
-        outliers_info['iqr_outliers'] = iqr_outliers
-        outliers_info['iqr_bounds'] = {'lower': lower_bound, 'upper': upper_bound}
+        outliers_info['iqr_outliers'] = masks.iqr_rows(column).tolist()
+        outliers_info['iqr_bounds'] = {'lower': masks.lower[column], 'upper': masks.upper[column]}
     
     if 'zscore' in methods:
         # Método Z-score
-        z_scores = np.abs(stats.zscore(col_data))
-        zscore_outliers = data[np.abs(stats.zscore(data[column].fillna(col_data.mean()))) > 3].index.tolist()
-        outliers_info['zscore_outliers'] = zscore_outliers
-        outliers_info['z_threshold'] = 3
+        outliers_info['zscore_outliers'] = masks.zscore_rows(column).tolist()
+        outliers_info['z_threshold'] = masks.z_threshold
     
     return outliers_info
 
-def clean_data(data, null_strategy="No aplicar", outlier_strategy="No aplicar"):
+def clean_data(data, null_strategy="No aplicar", outlier_strategy="No aplicar", drop_duplicates=False, dry_run=False):
     """
-    Aplica estrategias de limpieza de datos
+    Aplica estrategias de limpieza de datos.
+    Las estrategias se compilan en un plan cuyas estadísticas se calculan una
+    sola vez; con dry_run=True devuelve el resumen del plan sin aplicarlo
     """
-    cleaned_data = data.copy()
-    
-    # Tratamiento de valores nulos
-    if null_strategy == "Eliminar filas":
-        cleaned_data = cleaned_data.dropna()
-    elif null_strategy == "Imputar con media":
-        numeric_cols = cleaned_data.select_dtypes(include=[np.number]).columns
-        for col in numeric_cols:
-            cleaned_data[col].fillna(cleaned_data[col].mean(), inplace=True)
-    elif null_strategy == "Imputar con mediana":
-        numeric_cols = cleaned_data.select_dtypes(include=[np.number]).columns
-        for col in numeric_cols:
-            cleaned_data[col].fillna(cleaned_data[col].median(), inplace=True)
-    elif null_strategy == "Imputar con moda":
-        for col in cleaned_data.columns:
-            if cleaned_data[col].isnull().sum() > 0:
-                mode_value = cleaned_data[col].mode()
-                if len(mode_value) > 0:
-                    cleaned_data[col].fillna(mode_value.iloc[0], inplace=True)
-    
-    # Tratamiento de valores atípicos
-    if outlier_strategy != "No aplicar":
-        numeric_cols = cleaned_data.select_dtypes(include=[np.number]).columns
-        
-        for col in numeric_cols:
-            if outlier_strategy == "Eliminar valores atípicos":
-                # Usar método IQR para eliminar
-                Q1 = cleaned_data[col].quantile(0.25)
-                Q3 = cleaned_data[col].quantile(0.75)
-                IQR = Q3 - Q1
-                lower_bound = Q1 - 1.5 * IQR
-                upper_bound = Q3 + 1.5 * IQR
-                
-                cleaned_data = cleaned_data[
-                    (cleaned_data[col] >= lower_bound) & 
-                    (cleaned_data[col] <= upper_bound)
-                ]
-            
-            elif outlier_strategy == "Transformar con log":
-                if (cleaned_data[col] > 0).all():  # Solo si todos los valores son positivos
-                    cleaned_data[col] = np.log1p(cleaned_data[col])
-            
-            elif outlier_strategy == "Winsorización":
-                # Winsorización al 5% y 95%
-                lower_percentile = cleaned_data[col].quantile(0.05)
-                upper_percentile = cleaned_data[col].quantile(0.95)
-                
-                cleaned_data[col] = np.clip(
-                    cleaned_data[col], 
-                    lower_percentile, 
-                    upper_percentile
-                )
-    
-    return cleaned_data
+    plan = build_cleaning_plan(data, null_strategy, outlier_strategy, drop_duplicates)
+    compiled = compile_cleaning_plan(data, plan)
+    
+    if dry_run:
+        return dry_run_cleaning_plan(data, compiled)
+    
+    return apply_cleaning_plan(data, compiled)
 
-def correlation_analysis(data):
+def correlation_analysis(data, weight_column=None):
     """
-    Realiza análisis de correlación detallado
+    Realiza análisis de correlación detallado (ponderado si se indica weight_column)
     """
-    numeric_data = data.select_dtypes(include=[np.number])
+    numeric_data = data.select_dtypes(include=[np.number]).drop(columns=[weight_column] if weight_column else [])
     
     if len(numeric_data.columns) < 2:
         return None
     
     # Matriz de correlación
-    corr_matrix = numeric_data.corr()
+    corr_matrix = get_correlation_matrix(data, weight_column=weight_column)
     
     # Correlaciones significativas (filtrar las más altas)
-    corr_pairs = []
-    for i in range(len(corr_matrix.columns)):
-        for j in range(i+1, len(corr_matrix.columns)):
-            corr_value = corr_matrix.iloc[i, j]
-            if not np.isnan(corr_value):
-                corr_pairs.append({
-                    'Variable 1': corr_matrix.columns[i],
-                    'Variable 2': corr_matrix.columns[j],
-                    'Correlación': corr_value,
-                    'Interpretación': interpret_correlation(corr_value)
-                })
-    
-    corr_df = pd.DataFrame(corr_pairs)
-    corr_df = corr_df.sort_values('Correlación', key=abs, ascending=False)
+    corr_df = correlation_pairs(corr_matrix)
+    corr_df['Interpretación'] = corr_df['Correlación'].map(interpret_correlation)
     
     return {
         'correlation_matrix': corr_matrix,
@@ -204,16 +172,17 @@ def statistical_tests(data):
     results = {}
     numeric_cols = data.select_dtypes(include=[np.number]).columns.tolist()
     
-    # Prueba de normalidad (Shapiro-Wilk) para variables numéricas
+    # Prueba de normalidad (Shapiro-Wilk) para todas las variables numéricas;
+    # las columnas grandes se prueban sobre una submuestra reproducible
     if len(numeric_cols) > 0:
         normality_tests = {}
-        for col in numeric_cols[:5]:  # Limitar a 5 variables para evitar sobrecarga
-            if len(data[col].dropna()) > 3:  # Mínimo de datos requerido
-                statistic, p_value = stats.shapiro(data[col].dropna()[:5000])  # Máximo 5000 datos
+        for col, test in run_distribution_tests(data, numeric_cols).items():
+            if test['n'] > 3 and not np.isnan(test['shapiro_p_value']):  # Mínimo de datos requerido
                 normality_tests[col] = {
-                    'statistic': statistic,
-                    'p_value': p_value,
-                    'is_normal': p_value > 0.05
+                    'statistic': test['shapiro_statistic'],
+                    'p_value': test['shapiro_p_value'],
+                    'is_normal': test['shapiro_p_value'] > 0.05,
+                    'sampled': test['sampled']
                 }
         results['normality_tests'] = normality_tests
     
@@ -0,0 +1,239 @@
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from utils.data_loader import PROFILE_BLOCK_COLUMNS
+from utils.dataset_profile import dataset_fingerprint, PROFILE_QUANTILES
+
+# Factor de expansión de ENAHO
+DEFAULT_WEIGHT_COLUMN = 'FACTOR07'
+
+# Número de perfiles ponderados (versión del dataset y factor) que se mantienen en memoria
+WEIGHTED_CACHE_SIZE = 8
+
+# Perfiles ya calculados, por huella del contenido y columna de pesos
+_weighted_cache = OrderedDict()
+
+def detect_weight_column(data):
+    """
+    Columna de pesos por defecto: FACTOR07 si existe y es numérica
+    """
+    if DEFAULT_WEIGHT_COLUMN in data.columns and pd.api.types.is_numeric_dtype(data[DEFAULT_WEIGHT_COLUMN]):
+        return DEFAULT_WEIGHT_COLUMN
+    return None
+
+def get_weights(data, weight_column):
+    """
+    Pesos como arreglo float; pesos nulos, negativos o no numéricos valen 0
+    (la fila no participa en las estadísticas ponderadas)
+    """
+    if weight_column not in data.columns:
+        raise KeyError(f"La columna de pesos '{weight_column}' no existe")
+    weights = pd.to_numeric(data[weight_column], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    return np.where(np.isfinite(weights) & (weights > 0), weights, 0.0)
+
+def _weighted_modes(sorted_values, sorted_weights, counts):
+    """
+    Valor con mayor peso total de cada columna ya ordenada; entre empates, el menor
+    """
+    modes = np.full(sorted_values.shape[1], np.nan)
+    for j, count in enumerate(counts):
+        if count == 0:
+            continue
+        values = sorted_values[:count, j]
+        starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+        run_weights = np.add.reduceat(sorted_weights[:count, j], starts)
+        modes[j] = values[starts[np.argmax(run_weights)]]
+    return modes
+
+def _weighted_profile_block(values, weights, quantiles):
+    """
+    Momentos, extremos, moda y percentiles ponderados de un bloque de
+    columnas con un único ordenamiento. Los momentos tratan los pesos como
+    pesos de frecuencia (con pesos 1 coinciden con el perfil sin ponderar); los
+    percentiles interpolan entre los puntos medios del peso acumulado, que con
+    pesos iguales, sean cuales sean, reproducen los percentiles sin ponderar
+    """
+    values = np.where(weights[:, None] > 0, values, np.nan)
+    n_columns = values.shape[1]
+    columns_index = np.arange(n_columns)
+    
+    # Al ordenar, los NaN quedan al final de cada columna
+    order = np.argsort(values, axis=0)
+    sorted_values = np.take_along_axis(values, order, axis=0)
+    valid = ~np.isnan(sorted_values)
+    sorted_weights = np.where(valid, weights[order], 0.0)
+    counts = valid.sum(axis=0)
+    has_values = counts > 0
+    safe_counts = np.where(has_values, counts, 1)
+    
+    if values.shape[0] == 0:
+        sorted_values = np.full((1, n_columns), np.nan)
+        sorted_weights = np.zeros((1, n_columns))
+    
+    weight_sums = sorted_weights.sum(axis=0)
+    safe_weight_sums = np.where(has_values, weight_sums, 1.0)
+    mean = np.where(has_values, (sorted_weights * np.where(valid, sorted_values, 0.0)).sum(axis=0) / safe_weight_sums, np.nan)
+    deviations = np.where(valid, sorted_values - mean, 0.0)
+    squared = deviations ** 2
+    m2 = (sorted_weights * squared).sum(axis=0)
+    m3 = (sorted_weights * squared * deviations).sum(axis=0)
+    m4 = (sorted_weights * squared ** 2).sum(axis=0)
+    
+    minimum = np.where(has_values, sorted_values[0], np.nan)
+    maximum = np.where(has_values, sorted_values[safe_counts - 1, columns_index], np.nan)
+    constant = minimum == maximum
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        n = weight_sums
+        var = np.where((counts > 1) & (n > 1), m2 / (n - 1), np.nan)
+        skew = np.sqrt(n * (n - 1)) / (n - 2) * (m3 / n) / (m2 / n) ** 1.5
+        skew = np.where(counts < 3, np.nan, np.where(constant, 0.0, skew))
+        kurtosis = (n * (n + 1) * (n - 1) * m4 / ((n - 2) * (n - 3) * m2 ** 2)
+                    - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3)))
+        kurtosis = np.where(counts < 4, np.nan, np.where(constant, 0.0, kurtosis))
+    
+    # Percentiles ponderados con interpolación lineal: cada valor ordenado se
+    # ubica en el punto medio de su peso acumulado, reescalado para que el
+    # primero quede en 0 y el último en 1. Con pesos iguales son las posiciones
+    # i / (n - 1) de la interpolación lineal de pandas
+    midpoints = np.cumsum(sorted_weights, axis=0) - sorted_weights / 2
+    quantile_rows = np.full((len(quantiles), n_columns), np.nan)
+    for j in np.flatnonzero(has_values):
+        count = counts[j]
+        column_midpoints = midpoints[:count, j]
+        span = column_midpoints[-1] - column_midpoints[0]
+        if span <= 0:
+            quantile_rows[:, j] = sorted_values[count - 1, j]
+            continue
+        positions = (column_midpoints - column_midpoints[0]) / span
+        quantile_rows[:, j] = np.interp(quantiles, positions, sorted_values[:count, j])
+    
+    return {
+        'count': counts,
+        'weight_sum': weight_sums,
+        'mean': mean,
+        'std': np.sqrt(var),
+        'var': var,
+        'min': minimum,
+        'max': maximum,
+        'skew': skew,
+        'kurtosis': kurtosis,
+        'mode': _weighted_modes(sorted_values, sorted_weights, counts) if values.shape[0] > 0 else np.full(n_columns, np.nan)
+    }, quantile_rows
+
+class WeightedProfile:
+    """
+    Perfil numérico ponderado de una versión del dataset, con la misma
+    interfaz que DatasetProfile. La columna de pesos no se perfila
+    """
+    
+    def __init__(self, data, weight_column, fingerprint=None):
+        self.fingerprint = dataset_fingerprint(data) if fingerprint is None else fingerprint
+        self.weight_column = weight_column
+        weights = get_weights(data, weight_column)
+        numeric_data = data.select_dtypes(include=[np.number]).drop(columns=[weight_column], errors='ignore')
+        self.numeric_columns = list(numeric_data.columns)
+        
+        stats_blocks = []
+        quantile_blocks = []
+        for start in range(0, len(self.numeric_columns), PROFILE_BLOCK_COLUMNS):
+            block = numeric_data.iloc[:, start:start + PROFILE_BLOCK_COLUMNS]
+            values = block.to_numpy(dtype='float64', na_value=np.nan)
+            block_stats, block_quantiles = _weighted_profile_block(values, weights, PROFILE_QUANTILES)
+            stats_blocks.append(pd.DataFrame(block_stats, index=block.columns))
+            quantile_blocks.append(pd.DataFrame(block_quantiles, index=PROFILE_QUANTILES, columns=block.columns))
+        
+        if stats_blocks:
+            self.stats = pd.concat(stats_blocks)
+            self.quantiles = pd.concat(quantile_blocks, axis=1)
+        else:
+            self.stats = pd.DataFrame(columns=['count', 'weight_sum', 'mean', 'std', 'var', 'min', 'max', 'skew', 'kurtosis', 'mode'], dtype='float64')
+            self.quantiles = pd.DataFrame(index=PROFILE_QUANTILES, dtype='float64')
+    
+    def quantile(self, q):
+        """
+        Percentil ponderado q de cada columna numérica (q en PROFILE_QUANTILES)
+        """
+        return self.quantiles.loc[q]
+    
+    def range(self):
+        return self.stats['max'] - self.stats['min']
+    
+    def coefficient_of_variation(self):
+        """
+        Coeficiente de variación en porcentaje
+        """
+        return self.stats['std'] / self.stats['mean'] * 100
+    
+    def describe(self):
+        """
+        Tabla con el mismo formato que DataFrame.describe() (count es el número de
+        observaciones; weight_sum, la población representada)
+        """
+        return pd.DataFrame({
+            'count': self.stats['count'].astype('float64'),
+            'weight_sum': self.stats['weight_sum'],
+            'mean': self.stats['mean'],
+            'std': self.stats['std'],
+            'min': self.stats['min'],
+            '25%': self.quantile(0.25),
+            '50%': self.quantile(0.50),
+            '75%': self.quantile(0.75),
+            'max': self.stats['max']
+        }).T
+
+def get_weighted_profile(data, weight_column):
+    """
+    Perfil ponderado de la versión actual del dataset, calculado una sola
+    vez por huella del contenido y columna de pesos
+    """
+    key = (dataset_fingerprint(data), weight_column)
+    profile = _weighted_cache.get(key)
+    if profile is not None:
+        _weighted_cache.move_to_end(key)
+        return profile
+    
+    profile = WeightedProfile(data, weight_column, fingerprint=key[0])
+    _weighted_cache[key] = profile
+    while len(_weighted_cache) > WEIGHTED_CACHE_SIZE:
+        _weighted_cache.popitem(last=False)
+    return profile
+
+def weighted_value_counts(series, weights, normalize=False):
+    """
+    Frecuencias ponderadas (suma de pesos por categoría), de mayor a menor
+    """
+    weight_series = pd.Series(weights, index=series.index)
+    present = series.notna() & (weight_series > 0)
+    counts = weight_series[present].groupby(series[present], observed=True, sort=True).sum()
+    counts = counts.sort_values(ascending=False, kind='stable')
+    counts.index.name = series.name
+    if normalize:
+        total = counts.sum()
+        return counts / total if total > 0 else counts
+    return counts
+
+def weighted_crosstab(rows, columns, weights):
+    """
+    Tabla de contingencia ponderada (suma de pesos por celda)
+    """
+    return pd.crosstab(rows, columns, values=weights, aggfunc='sum').fillna(0.0)
+
+def weighted_chi2(rows, columns, weights):
+    """
+    Chi-cuadrado de independencia con pesos: las proporciones son las
+    ponderadas y la tabla se escala al número de observaciones (corrección
+    de primer orden; sin información del diseño muestral no se ajusta el
+    efecto de diseño). Devuelve chi2, p-valor, grados de libertad y tabla
+    """
+    weights = pd.Series(weights, index=rows.index)
+    present = rows.notna() & columns.notna() & (weights > 0)
+    table = weighted_crosstab(rows[present], columns[present], weights[present])
+    total = table.to_numpy().sum()
+    if table.size <= 1 or total <= 0:
+        return np.nan, np.nan, 0, table
+    scaled = table * (int(present.sum()) / total)
+    chi2, p_value, dof, _ = stats.chi2_contingency(scaled)
+    return chi2, p_value, dof, table
@@ -5,6 +5,9 @@ import pandas as pd
 import numpy as np
 import seaborn as sns
 
+from utils.correlation_pairs import strongest_pair
+from utils.correlation_matrix import get_correlation_matrix
+
 def create_visualizations(data):
     """
     Crea un conjunto completo de visualizaciones para el dataset
@@ -110,7 +113,7 @@ def create_correlation_heatmap(data, numeric_cols):
     """
     Crea mapa de calor de correlaciones
     """
-    corr_matrix = data[numeric_cols].corr()
+    corr_matrix = get_correlation_matrix(data).loc[numeric_cols, numeric_cols]
     
     fig = px.imshow(
         corr_matrix,
@@ -131,18 +134,13 @@ def create_scatter_plots(data, numeric_cols):
     Crea gráficos de dispersión para pares de variables
     """
     # Seleccionar las dos variables con mayor correlación
-    corr_matrix = data[numeric_cols].corr()
+    corr_matrix = get_correlation_matrix(data).loc[numeric_cols, numeric_cols]
     
     # Encontrar el par con mayor correlación absoluta
-    max_corr = 0
     best_pair = (numeric_cols[0], numeric_cols[1]) if len(numeric_cols) >= 2 else None
-    
-    for i in range(len(numeric_cols)):
-        for j in range(i+1, len(numeric_cols)):
-            corr_val = abs(corr_matrix.iloc[i, j])
-            if not np.isnan(corr_val) and corr_val > max_corr:
-                max_corr = corr_val
-                best_pair = (numeric_cols[i], numeric_cols[j])
+    strongest = strongest_pair(corr_matrix)
+    if strongest is not None and strongest[2] > 0:
+        best_pair = strongest[:2]
     
     if best_pair:
         fig = px.scatter(